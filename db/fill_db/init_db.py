@@ -1148,6 +1148,43 @@ for parity, days in schedule.items():
             )
 
 conn.commit()
+
+# ======================
+# 📗 attendance_json -> attendance_mark (одна строка на ячейку)
+# ======================
+cursor.execute("""
+    INSERT INTO attendance_mark (attendance_id, student_id, lesson_date, present)
+    SELECT a.id, s.value->>'student_id', d.key::date, d.value::boolean
+    FROM attendance a
+    CROSS JOIN LATERAL jsonb_array_elements(a.attendance_json) AS s(value)
+    CROSS JOIN LATERAL jsonb_each_text(s.value->'attendance') AS d(key, value)
+    ON CONFLICT DO NOTHING;
+""")
+conn.commit()
+print("✅ Таблица attendance_mark успешно заполнена.")
+
+# ======================
+# 📙 rating_json -> rating_mark / rating_grade
+# ======================
+cursor.execute("""
+    INSERT INTO rating_mark (rating_id, student_id, control_point, value)
+    SELECT r.id, s.value->>'student_id', k.key, (k.value #>> '{}')::integer
+    FROM rating r
+    CROSS JOIN LATERAL jsonb_array_elements(r.rating_json) AS s(value)
+    CROSS JOIN LATERAL jsonb_each(COALESCE(s.value->'rating', '{}'::jsonb)) AS k(key, value)
+    ON CONFLICT DO NOTHING;
+""")
+cursor.execute("""
+    INSERT INTO rating_grade (rating_id, student_id, grade)
+    SELECT r.id, s.value->>'student_id', s.value->>'grade'
+    FROM rating r
+    CROSS JOIN LATERAL jsonb_array_elements(r.rating_json) AS s(value)
+    WHERE s.value->>'grade' IS NOT NULL
+    ON CONFLICT DO NOTHING;
+""")
+conn.commit()
+print("✅ Таблицы rating_mark и rating_grade успешно заполнены.")
+
 cursor.close()
 conn.close()
 print("✅ Таблица attendance успешно заполнена.")
\ No newline at end of file
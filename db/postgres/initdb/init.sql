@@ -2,6 +2,9 @@
 -- SCHEMA INIT (PostgreSQL)
 -- ========================
 
+DROP TABLE IF EXISTS attendance_mark CASCADE;
+DROP TABLE IF EXISTS rating_mark CASCADE;
+DROP TABLE IF EXISTS rating_grade CASCADE;
 DROP TABLE IF EXISTS rating CASCADE;
 DROP TABLE IF EXISTS attendance_table CASCADE;
 DROP TABLE IF EXISTS teacher_timetable CASCADE;
@@ -28,6 +31,8 @@ CREATE TABLE group_timetable (
     timetable JSONB NOT NULL
 );
 
+CREATE INDEX ix_group_timetable_group_id ON group_timetable (group_id);
+
 -- ------------------------
 -- TABLE: student_info
 -- ------------------------
@@ -37,6 +42,8 @@ CREATE TABLE student_info (
     group_id BIGINT REFERENCES groups(id)
 );
 
+CREATE INDEX ix_student_info_group_id ON student_info (group_id);
+
 -- ------------------------
 -- TABLE: teacher_timetable
 -- ------------------------
@@ -69,6 +76,10 @@ CREATE TABLE users (
     passwd VARCHAR(255)
 );
 
+CREATE INDEX ix_users_max_id ON users (max_id) INCLUDE (teacher_info_id, student_info_id);
+CREATE INDEX ix_users_student_info_id ON users (student_info_id);
+CREATE INDEX ix_users_last_name_first_name ON users (last_name, first_name);
+
 -- ------------------------
 -- TABLE: attendance_table
 -- ------------------------
@@ -83,6 +94,25 @@ CREATE TABLE attendance (
     created_at TIMESTAMP NOT NULL DEFAULT NOW()
 );
 
+CREATE INDEX ix_attendance_group_teacher_subject
+    ON attendance (group_id, teacher_id, subject_name, subject_type);
+
+-- ------------------------
+-- TABLE: attendance_mark
+-- Одна строка на ячейку ведомости (студент × дата занятия)
+-- ------------------------
+CREATE TABLE attendance_mark (
+    attendance_id INTEGER NOT NULL REFERENCES attendance(id) ON DELETE CASCADE,
+    student_id VARCHAR(255) NOT NULL,
+    lesson_date DATE NOT NULL,
+    present BOOLEAN NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (attendance_id, student_id, lesson_date)
+);
+
+CREATE INDEX ix_attendance_mark_student_attendance
+    ON attendance_mark (student_id, attendance_id) INCLUDE (lesson_date, present);
+
 -- ------------------------
 -- TABLE: rating
 -- ------------------------
@@ -95,4 +125,37 @@ CREATE TABLE rating (
     group_id BIGINT REFERENCES groups(id),
     rating_json JSONB,
     created_at TIMESTAMP NOT NULL DEFAULT NOW()
-);
\ No newline at end of file
+);
+
+CREATE INDEX ix_rating_group_subject ON rating (group_id, subject_name);
+
+-- ------------------------
+-- TABLE: rating_mark
+-- Одна строка на контрольную точку студента (kt1..kt5)
+-- ------------------------
+CREATE TABLE rating_mark (
+    rating_id INTEGER NOT NULL REFERENCES rating(id) ON DELETE CASCADE,
+    student_id VARCHAR(255) NOT NULL,
+    control_point VARCHAR(50) NOT NULL,
+    value INTEGER NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (rating_id, student_id, control_point)
+);
+
+CREATE INDEX ix_rating_mark_student_rating
+    ON rating_mark (student_id, rating_id) INCLUDE (control_point, value);
+
+-- ------------------------
+-- TABLE: rating_grade
+-- Итоговая оценка студента (практика, курсовая работа)
+-- ------------------------
+CREATE TABLE rating_grade (
+    rating_id INTEGER NOT NULL REFERENCES rating(id) ON DELETE CASCADE,
+    student_id VARCHAR(255) NOT NULL,
+    grade VARCHAR(50) NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (rating_id, student_id)
+);
+
+CREATE INDEX ix_rating_grade_student_rating
+    ON rating_grade (student_id, rating_id) INCLUDE (grade);
\ No newline at end of file
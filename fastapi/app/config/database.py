@@ -1,21 +1,51 @@
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from app.config.settings import settings
 import redis.asyncio as aioredis
 from fastapi import Depends
 import asyncio
+from pathlib import Path
 import redis.asyncio as aioredis
 from app.config.settings import settings
 from app.services.qr_service import QRService
+from app.services.session_hub import SessionHub
+from app.utils.json_codec import json_dumps, json_loads
 
 
 # Create database engine
-engine = create_engine(settings.database_url)
+engine = create_engine(
+    settings.database_url,
+    json_serializer=json_dumps,
+    json_deserializer=json_loads,
+)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный engine на asyncpg для репозиториев.
+# prepared_statement_cache_size — кэш подготовленных выражений на каждое соединение asyncpg,
+# повторяющиеся запросы репозиториев не парсятся/планируются Postgres заново.
+async_engine = create_async_engine(
+    settings.async_database_url,
+    pool_size=settings.db_pool_size,
+    max_overflow=settings.db_max_overflow,
+    pool_pre_ping=True,
+    connect_args={"prepared_statement_cache_size": settings.db_statement_cache_size},
+    # JSON/JSONB-колонки (де)сериализуются тем же быстрым кодеком, что и ответы API
+    json_serializer=json_dumps,
+    json_deserializer=json_loads,
+)
+
+# expire_on_commit=False: после commit объекты не перечитываются лениво (в async это невозможно)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False,
+)
+
 # Create base class for models
 Base = declarative_base()
 
@@ -28,13 +58,23 @@ def get_db():
     finally:
         db.close()
 
-# Функция для создания сессии DB внутри init_redis
-def get_db_sync():
-    db = SessionLocal()
-    try:
+
+async def get_async_db():
+    """Dependency to get async database session"""
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+
+def run_migrations():
+    """Приводит схему БД к последней ревизии Alembic (alembic upgrade head) при старте приложения."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config(str(Path(__file__).resolve().parents[2] / "alembic.ini"))
+    # логированием приложения управляет uvicorn, fileConfig из alembic.ini его не трогает
+    config.attributes["configure_logger"] = False
+    command.upgrade(config, "head")
 
 
 
@@ -43,6 +83,7 @@ def get_db_sync():
 redis_client: aioredis.Redis | None = None
 qr_service: QRService | None = None
 _token_update_task: asyncio.Task | None = None
+session_hub: SessionHub | None = None
 
 
 async def init_redis():
@@ -56,12 +97,12 @@ async def init_redis():
         )
     
     if qr_service is None:
-        db = next(get_db_sync())
-        qr_service = QRService(redis_client, db)
+        # Ротатору сессия БД не нужна: закрытие просроченных сессий открывает свою на каждый проход
+        qr_service = QRService(redis_client, None)
     
     # запуск фоновой задачи, если она ещё не запущена
     if _token_update_task is None:
-        _token_update_task = asyncio.create_task(qr_service.update_tokens_loop(interval=10)) #вот тут ставится интервал
+        _token_update_task = asyncio.create_task(qr_service.update_tokens_loop(interval=settings.qr_token_interval))
     
     return redis_client
 
@@ -72,11 +113,27 @@ async def get_redis() -> aioredis.Redis:
     return redis_client
 
 
+async def get_session_hub() -> SessionHub:
+    """Общая на процесс подписка на события QR-сессий (для WebSocket)."""
+    global session_hub
+    if session_hub is None:
+        session_hub = SessionHub(await get_redis())
+    return session_hub
+
+
 async def close_redis():
     """Закрытие соединения Redis"""
-    global redis_client, qr_service, _token_update_task
+    global redis_client, qr_service, _token_update_task, session_hub
+    if session_hub:
+        await session_hub.close()
+        session_hub = None
     if _token_update_task:
+        # дожидаемся отмены: ротатор успевает освободить аренду, пока соединение ещё открыто
         _token_update_task.cancel()
+        try:
+            await _token_update_task
+        except (asyncio.CancelledError, Exception):
+            pass
         _token_update_task = None
     if redis_client:
         await redis_client.close()
@@ -1,7 +1,8 @@
 from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.config.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_async_db
 from app.models.pydantic_models.pydantic_models import LoginRequest, LoginResponse, ErrorResponse, MaxIdRequest
 from app.services.auth_service import AuthService
 from app.dto.exceptions import InvalidCredentialsException
@@ -24,7 +25,7 @@ auth_router = APIRouter(prefix="/api/auth", tags=["auth"])
 @auth_router.post("/login_max_id", response_model=Dict[str, str])
 async def login_by_max_id_token_only(
     request: MaxIdRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, str]:
     """
     Эндпоинт для входа с использованием POST-запроса и max_id в теле.
@@ -33,7 +34,7 @@ async def login_by_max_id_token_only(
     try:
         auth_service = AuthService(db)
         # Используем max_id из тела запроса
-        response = auth_service.login_by_max_id_token_only(request.max_id) 
+        response = await auth_service.login_by_max_id_token_only(request.max_id) 
         return response
     except InvalidCredentialsException as e:
         raise HTTPException(
@@ -56,7 +57,7 @@ async def login_by_max_id_token_only(
 )
 async def login_by_name_password(
     request: NamePasswordAuthRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> NamePasswordAuthResponse:
     """
     Эндпоинт для входа по имени, фамилии и паролю.
@@ -64,7 +65,7 @@ async def login_by_name_password(
     """
     try:
         auth_service = AuthService(db)
-        user_info = auth_service.login_by_name_password(
+        user_info = await auth_service.login_by_name_password(
             first_name=request.first_name,
             last_name=request.last_name,
             password=request.password
@@ -93,7 +94,7 @@ async def login_by_name_password(
 )
 async def update_max_id(
     request: UpdateMaxIdRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, str]:
     """
     Обновляет MAX_id для пользователя по имени, фамилии и паролю.
@@ -101,14 +102,15 @@ async def update_max_id(
     try:
         # Ищем пользователя
         user = (
-            db.query(User)
-            .filter(
-                User.first_name == request.first_name,
-                User.last_name == request.last_name,
-                User.passwd == request.password
+            await db.execute(
+                select(User)
+                .where(
+                    User.first_name == request.first_name,
+                    User.last_name == request.last_name,
+                    User.passwd == request.password
+                )
             )
-            .first()
-        )
+        ).scalars().first()
 
         user.max_id = request.max_id
 
@@ -120,7 +122,7 @@ async def update_max_id(
 
         # Обновляем max_id
         user.MAX_id = request.max_id
-        db.commit()
+        await db.commit()
 
         return {"message": "MAX_id updated successfully", "max_id": request.max_id}
 
@@ -143,17 +145,15 @@ async def update_max_id(
 )
 async def check_user_by_max_id(
     request: CheckMaxIdRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Проверяет наличие пользователя по max_id.
     """
     try:
         user = (
-            db.query(User)
-            .filter(User.max_id == request.max_id)
-            .first()
-        )
+            await db.execute(select(User).where(User.max_id == request.max_id))
+        ).scalars().first()
 
         if not user:
             raise HTTPException(
@@ -1,7 +1,7 @@
 from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_async_db
 from app.models.pydantic_models.pydantic_models import LoginRequest, LoginResponse, ErrorResponse, MaxIdRequest
 from app.services.auth_service import AuthService
 from app.dto.exceptions import InvalidCredentialsException
@@ -15,14 +15,14 @@ groups_router = APIRouter(prefix="/api/groups", tags=["groups"])
 @groups_router.get("/students/{group_name}", summary="Возвращает имя+фамилия+зачетка всех студентов шруппы по названию")
 async def get_studens_info_by_group_name(
     group_name: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     max_id: str = Depends(get_current_user_id)
 ):
     """
     ----
     """
     service = GroupsService(db)
-    result = service.get_students_by_group_name(group_name=group_name)
+    result = await service.get_students_by_group_name(group_name=group_name)
     return result
    
 
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import StreamingResponse
 from redis import Redis
-from sqlalchemy.orm import Session
-from typing import List, Dict, Any
-from app.config.database import get_db, get_redis
-from app.services.qr_service import QRService
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import AsyncIterator, List, Dict, Any, Optional
+import asyncio
+import time
+from app.config.database import get_async_db, get_redis, get_session_hub
+from app.config.settings import settings
+from app.services.qr_service import QRService, TOKEN_MODE_HMAC
+from app.services.session_hub import SessionHub
+from app.utils.json_codec import json_dumps
 from app.utils.jwt import get_current_user_id, require_role
+from app.utils.qr_tokens import current_token
+
+# Через сколько мс EventSource переподключается после обрыва
+SSE_RETRY_MS = 1000
 
 
 
@@ -25,7 +35,7 @@ async def generate_qr_session(
     subject_type: str,
     date: str,
     lesson_start_time: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(require_role("teacher")),
     redis: Redis = Depends(get_redis)
 ):
@@ -35,7 +45,8 @@ async def generate_qr_session(
         subject_name=subject_name,
         subject_type=subject_type,
         date=date,
-        lesson_start_time=lesson_start_time
+        lesson_start_time=lesson_start_time,
+        teacher_max_id=user["max_id"]
     )
 
     return session_info
@@ -48,7 +59,7 @@ async def generate_qr_session(
 )
 async def close_qr_session(
     session_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     user=Depends(require_role("teacher")),
     redis: Redis = Depends(get_redis)
 ):  
@@ -85,7 +96,7 @@ async def close_qr_session(
 async def scan_qr(
     session_id: str,
     token: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     max_id: str = Depends(get_current_user_id),
     redis: Redis = Depends(get_redis)
 ):
@@ -114,7 +125,7 @@ async def scan_qr(
 @qr_router.get("/session-students", summary="Список студентов отметившихся с помощью QR")
 async def get_session_students(
     session_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     redis: Redis = Depends(get_redis),
     user=Depends(require_role("teacher"))
 ):
@@ -128,7 +139,112 @@ async def get_session_students(
     return result
 
 
+@qr_router.get(
+    "/session-tokens",
+    summary="Поток токенов сессии (Server-Sent Events) — замена WebSocket за прокси и в мобильных сетях",
+    response_class=StreamingResponse,
+)
+async def stream_session_tokens(
+    session_id: str,
+    last_event_id: Optional[str] = Header(None),
+    redis: Redis = Depends(get_redis),
+    hub: SessionHub = Depends(get_session_hub),
+):
+    """
+    События: `token` — {"token": ..., ("expires_at": ... в режиме hmac)}, id события — сам токен;
+    `closed` — сессия закрыта, поток завершается. Раз в sse_keepalive_interval секунд без событий
+    приходит комментарий keep-alive. При переподключении EventSource присылает Last-Event-ID —
+    если токен с тех пор не сменился, он не отправляется повторно.
+    Использует ту же общую подписку процесса, что и WebSocket сессии.
+    """
+    active, token_mode, secret, interval = await redis.hmget(
+        f"session:{session_id}", "active_status", "token_mode", "token_secret", "token_interval"
+    )
+
+    # Статус не 200 — EventSource не переподключается к закрытой сессии
+    if active is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Сессия не найдена")
+    if int(active) == 0:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Сессия закрыта")
+
+    hmac_interval = int(interval) if token_mode == TOKEN_MODE_HMAC else None
+    return StreamingResponse(
+        _token_events(redis, hub, session_id, secret, hmac_interval, last_event_id),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            # nginx и подобные прокси не должны буферизовать поток
+            "X-Accel-Buffering": "no",
+        },
+    )
 
 
+def _sse(event: str, data: Dict[str, Any], event_id: Optional[str] = None) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    lines += [f"event: {event}", f"data: {json_dumps(data)}"]
+    return "\n".join(lines) + "\n\n"
 
 
+async def _token_events(
+    redis: Redis,
+    hub: SessionHub,
+    session_id: str,
+    secret: Optional[str],
+    hmac_interval: Optional[int],
+    last_event_id: Optional[str],
+) -> AsyncIterator[str]:
+    """
+    Тело потока: токены по событиям общей подписки (или по окнам времени в режиме hmac) и keep-alive.
+    Подпиской владеет только генератор: подписка в начале потока, отписка в finally.
+    """
+    keepalive = settings.sse_keepalive_interval
+    sent = last_event_id
+    # Подписка до чтения состояния: токен, сменившийся между чтением и подпиской, не потеряется
+    queue = hub.subscribe(session_id)
+    try:
+        await hub.wait_ready()
+        active, token = await redis.hmget(f"session:{session_id}", "active_status", "current_token")
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        # сессию закрыли между проверкой в эндпоинте и подпиской
+        if not active or int(active) == 0:
+            yield _sse("closed", {"error": "Сессия закрыта"})
+            return
+        last_write = time.monotonic()
+        while True:
+            expires_at = None
+            if hmac_interval:
+                token, expires_at = current_token(secret, session_id, hmac_interval)
+
+            if token and token != sent:
+                data = {"token": token}
+                if expires_at:
+                    data["expires_at"] = expires_at
+                yield _sse("token", data, token)
+                sent = token
+                last_write = time.monotonic()
+            elif time.monotonic() - last_write >= keepalive:
+                yield ": keep-alive\n\n"
+                last_write = time.monotonic()
+
+            timeout = max(0.0, keepalive - (time.monotonic() - last_write))
+            if expires_at:
+                timeout = min(timeout, max(0.0, expires_at - time.time()))
+            try:
+                kind, data = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                continue
+
+            if kind == "token" and not hmac_interval:
+                token = data
+            elif kind == "resync":
+                active, current = await redis.hmget(f"session:{session_id}", "active_status", "current_token")
+                if not active or int(active) == 0:
+                    kind = "closed"
+                elif not hmac_interval:
+                    token = current
+
+            if kind == "closed":
+                yield _sse("closed", {"error": "Сессия закрыта"})
+                return
+    finally:
+        hub.unsubscribe(session_id, queue)
@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict, Any
-from app.config.database import get_db
+from app.config.database import get_async_db
 from app.services.rating_service import RatingService
 from app.models.pydantic_models.pydantic_models import RatingUpdateRequest
 from app.utils.jwt import get_current_user_id, require_role
+from app.utils.raw_json import RawJSON, RawJSONResponse, raw_json_object
 
 
 class RatingController:
@@ -42,13 +43,13 @@ class RatingController:
     async def get_student_rating(
         self,
         zach_number: str,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         current_user_id: str = Depends(get_current_user_id)
     ) -> Dict[str, Any]:
         """Получить все рейтинги студента (включая практику и курсовую)"""
         try:
             rating_service = RatingService(db)
-            ratings = rating_service.get_student_ratings(zach_number)
+            ratings = await rating_service.get_student_ratings(zach_number)
 
             if not ratings:
                 raise HTTPException(
@@ -70,23 +71,28 @@ class RatingController:
         self,
         group_name: str,
         subject_name: str,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         user=Depends(require_role("teacher"))
     ) -> Dict[str, Any]:
         current_user_id = user["max_id"]
         """Получить ведомость рейтинга группы по предмету"""
         try:
             rating_service = RatingService(db)
-            rating_data = rating_service.get_group_rating(group_name, subject_name)
+            # ratings собираются в Postgres и вклеиваются в ответ без разбора и повторной сериализации
+            ratings = await rating_service.get_group_ratings_raw(group_name, subject_name)
 
-            if not rating_data.get("ratings"):
+            if ratings is None or ratings == "[]":
                 raise HTTPException(
                     status_code=404,
                     detail=f"Рейтинг для группы {group_name} по предмету {subject_name} не найден"
                 )
 
-            rating_data["requested_by"] = current_user_id
-            return rating_data
+            return RawJSONResponse(content=raw_json_object(
+                group_name=group_name,
+                subject_name=subject_name,
+                ratings=RawJSON(ratings),
+                requested_by=current_user_id
+            ))
 
         except HTTPException:
             raise
@@ -96,7 +102,7 @@ class RatingController:
     async def update_student_mark(
         self,
         request: RatingUpdateRequest,
-        db: Session = Depends(get_db),
+        db: AsyncSession = Depends(get_async_db),
         user=Depends(require_role("teacher"))
     ) -> Dict[str, Any]:
         current_user_id = user["max_id"]
@@ -111,7 +117,7 @@ class RatingController:
             else:
                 mark_value = request.mark  # обычная дисциплина
 
-            success = rating_service.update_student_mark(
+            success = await rating_service.update_student_mark(
                 zach_number=request.zach_number,
                 subject_name=request.subject_name,
                 control_point=request.control_point,
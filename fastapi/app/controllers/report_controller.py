@@ -0,0 +1,81 @@
+# app/controllers/report_controller.py
+import logging
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import FileResponse
+from redis.asyncio import Redis
+from app.config.database import get_redis
+from app.dto.requests import CreateReportJobRequest
+from app.services.report_job_service import ReportJobService
+from app.utils.json_codec import FastJSONResponse
+from app.utils.jwt import require_role
+
+logger = logging.getLogger(__name__)
+
+class ReportController:
+    def __init__(self):
+        self.router = APIRouter(prefix="/api/reports", tags=["reports"])
+        self._register_routes()
+
+    def _register_routes(self):
+        self.router.add_api_route(
+            "/jobs",
+            self.create_job,
+            methods=["POST"],
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+        self.router.add_api_route(
+            "/jobs/{job_id}",
+            self.get_job,
+            methods=["GET"]
+        )
+
+        self.router.add_api_route(
+            "/jobs/{job_id}/result",
+            self.get_job_result,
+            methods=["GET"],
+            response_class=FileResponse
+        )
+
+    async def create_job(
+        self,
+        request: CreateReportJobRequest,
+        redis: Redis = Depends(get_redis),
+        user=Depends(require_role("teacher"))
+    ) -> FastJSONResponse:
+        """Поставить в очередь формирование набора ведомостей (ZIP с PDF)"""
+        job = await ReportJobService(redis).create_job(
+            owner_max_id=user["max_id"],
+            items=[item.model_dump(exclude_none=True) for item in request.items]
+        )
+        status_url = f"{self.router.prefix}/jobs/{job['job_id']}"
+        return FastJSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={**job, "status_url": status_url, "result_url": f"{status_url}/result"},
+            headers={"Location": status_url}
+        )
+
+    async def get_job(
+        self,
+        job_id: str,
+        redis: Redis = Depends(get_redis),
+        user=Depends(require_role("teacher"))
+    ) -> Dict[str, Any]:
+        """Статус задания: сколько ведомостей готово и какие не удалось сформировать"""
+        return await ReportJobService(redis).get_job(job_id, user["max_id"])
+
+    async def get_job_result(
+        self,
+        job_id: str,
+        redis: Redis = Depends(get_redis),
+        user=Depends(require_role("teacher"))
+    ) -> FileResponse:
+        """Скачать архив готового задания"""
+        path = await ReportJobService(redis).get_result_path(job_id, user["max_id"])
+        return FileResponse(path, media_type="application/zip", filename=f"vedomosti_{job_id}.zip")
+
+
+# Экспорт роутера для подключения в main.py
+report_controller = ReportController()
+report_router = report_controller.router
@@ -1,8 +1,8 @@
 from typing import Any, Dict, List
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.config.database import get_db
+from app.config.database import get_async_db
 from app.utils.jwt import get_current_user_id
 from app.services.student_info_service import StudentInfoService
 
@@ -13,13 +13,13 @@ student_info_router = APIRouter(prefix="/api/student_info", tags=["student_info"
 async def login_by_max_id_token_only(
     zach: str,
     max_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, str]:
     """
     Преподаватель по зачетке получает имя и фамилию студента
     """
     service = StudentInfoService(db)
-    result = service.get_student_name_by_zach_number(zach)
+    result = await service.get_student_name_by_zach_number(zach)
 
     if not result:
         raise HTTPException(status_code=404, detail=f"Студент с номером зачетки {zach} не найден")
@@ -33,7 +33,7 @@ async def login_by_max_id_token_only(
 )
 async def subjects_by_zach(
     zach_number: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, List[Dict[str, str]]]:
     """
     Возвращает список предметов студента в формате:
@@ -45,7 +45,7 @@ async def subjects_by_zach(
     }
     """
     service = StudentInfoService(db)
-    result = service.get_subjects_by_zach_number(zach_number)
+    result = await service.get_subjects_by_zach_number(zach_number)
 
     if not result:
         raise HTTPException(status_code=404, detail=f"Студент с номером зачетки {zach_number} не найден или не имеет предметов")
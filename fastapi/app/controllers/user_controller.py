@@ -1,7 +1,7 @@
 from typing import Any, Dict
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.config.database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_async_db
 from app.models.pydantic_models.pydantic_models import LoginRequest, LoginResponse, ErrorResponse, MaxIdRequest
 from app.services.auth_service import AuthService
 from app.dto.exceptions import InvalidCredentialsException
@@ -16,7 +16,7 @@ user_router = APIRouter(prefix="/api/user", tags=["user"])
 @user_router.get("/me", response_model=Dict[str, Any])
 async def user_me(
     max_id: str = Depends(get_current_user_id),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Dict[str, Any]:
     """
     Получает информацию о текущем авторизованном пользователе.
@@ -24,7 +24,7 @@ async def user_me(
     """
     try:
         auth_service = AuthService(db)
-        user_data = auth_service.get_user_me_info(max_id) 
+        user_data = await auth_service.get_user_me_info(max_id) 
         return user_data
     
     
@@ -1,11 +1,14 @@
 # app/controllers/vedomosti_controller.py
 import logging
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.config.database import get_db
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.config.database import get_async_db
+from app.services.vedomosti_export_service import VedomostiExportService
 from app.services.vedomosti_service import VedomostiService
+from app.utils.pdf_executor import metrics as pdf_render_metrics
 from app.utils.jwt import require_role
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse
 
 logger = logging.getLogger(__name__)
 
@@ -36,13 +39,41 @@ class VedomostiController:
             response_class=Response
         )
 
+        self.router.add_api_route(
+            "/attendance/{group_name}/{subject_type}/{subject_name}/export",
+            self.export_attendance,
+            methods=["GET"],
+            response_class=StreamingResponse
+        )
+
+        self.router.add_api_route(
+            "/rating/{group_name}/{subject_name}/export",
+            self.export_rating,
+            methods=["GET"],
+            response_class=StreamingResponse
+        )
+
+        self.router.add_api_route(
+            "/average/{group_name}/export",
+            self.export_average_rating,
+            methods=["GET"],
+            response_class=StreamingResponse
+        )
+
+        self.router.add_api_route(
+            "/metrics",
+            self.get_render_metrics,
+            methods=["GET"]
+        )
+
     async def get_attendance_report(
         self,
         group_name: str,
         subject_type: str,
         subject_name: str,
-        db: Session = Depends(get_db),
-        user=Depends(require_role("teacher"))
+        db: AsyncSession = Depends(get_async_db),
+        user=Depends(require_role("teacher")),
+        if_none_match: Optional[str] = Header(None)
     ) -> Response:
         """Получить ведомость посещаемости группы по предмету"""
         current_user_id = user["max_id"]
@@ -54,7 +85,8 @@ class VedomostiController:
                 teacher_max_id=current_user_id,
                 group_name=group_name, 
                 subject_type=subject_type, 
-                subject_name=subject_name
+                subject_name=subject_name,
+                if_none_match=if_none_match
             )
         except HTTPException:
             raise
@@ -69,8 +101,9 @@ class VedomostiController:
         self,
         group_name: str,
         subject_name: str,
-        db: Session = Depends(get_db),
-        user=Depends(require_role("teacher"))
+        db: AsyncSession = Depends(get_async_db),
+        user=Depends(require_role("teacher")),
+        if_none_match: Optional[str] = Header(None)
     ) -> Response:
         """Получить ведомость рейтинга группы по предмету"""
         current_user_id = user["max_id"]
@@ -80,7 +113,8 @@ class VedomostiController:
             vedomosti_service = VedomostiService(db)
             return await vedomosti_service.generate_rating_report(
                 group_name=group_name, 
-                subject_name=subject_name
+                subject_name=subject_name,
+                if_none_match=if_none_match
             )
         except HTTPException:
             raise
@@ -94,8 +128,9 @@ class VedomostiController:
     async def get_average_rating_report(
         self,
         group_name: str,
-        db: Session = Depends(get_db),
-        user=Depends(require_role("teacher"))
+        db: AsyncSession = Depends(get_async_db),
+        user=Depends(require_role("teacher")),
+        if_none_match: Optional[str] = Header(None)
     ) -> Response:
         """Получить ведомость среднего балла группы"""
         current_user_id = user["max_id"]
@@ -103,7 +138,7 @@ class VedomostiController:
         
         try:
             vedomosti_service = VedomostiService(db)
-            return await vedomosti_service.generate_average_rating_report(group_name)
+            return await vedomosti_service.generate_average_rating_report(group_name, if_none_match=if_none_match)
         except HTTPException:
             raise
         except Exception as e:
@@ -113,6 +148,52 @@ class VedomostiController:
                 detail=f"Внутренняя ошибка сервера: {str(e)}"
             )
 
+    async def export_attendance(
+        self,
+        group_name: str,
+        subject_type: str,
+        subject_name: str,
+        export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+        db: AsyncSession = Depends(get_async_db),
+        user=Depends(require_role("teacher"))
+    ) -> StreamingResponse:
+        """Выгрузить посещаемость группы по предмету (матрица по датам) в CSV/XLSX"""
+        logger.info(f"Выгрузка посещаемости от пользователя {user['max_id']} для группы {group_name}")
+        return await VedomostiExportService(db).export_attendance(
+            teacher_max_id=user["max_id"],
+            group_name=group_name,
+            subject_type=subject_type,
+            subject_name=subject_name,
+            export_format=export_format
+        )
+
+    async def export_rating(
+        self,
+        group_name: str,
+        subject_name: str,
+        export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+        db: AsyncSession = Depends(get_async_db),
+        user=Depends(require_role("teacher"))
+    ) -> StreamingResponse:
+        """Выгрузить рейтинг группы по предмету в CSV/XLSX"""
+        logger.info(f"Выгрузка рейтинга от пользователя {user['max_id']} для группы {group_name}, предмет {subject_name}")
+        return await VedomostiExportService(db).export_rating(group_name, subject_name, export_format)
+
+    async def export_average_rating(
+        self,
+        group_name: str,
+        export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$"),
+        db: AsyncSession = Depends(get_async_db),
+        user=Depends(require_role("teacher"))
+    ) -> StreamingResponse:
+        """Выгрузить средний балл студентов группы в CSV/XLSX"""
+        logger.info(f"Выгрузка среднего балла от пользователя {user['max_id']} для группы {group_name}")
+        return await VedomostiExportService(db).export_average(group_name, export_format)
+
+    async def get_render_metrics(self, user=Depends(require_role("teacher"))) -> Dict[str, Any]:
+        """Метрики рендера ведомостей в этом процессе: ожидание в очереди и время рендера"""
+        return pdf_render_metrics.snapshot()
+
 
 # Экспорт роутера для подключения в main.py
 vedomosti_controller = VedomostiController()
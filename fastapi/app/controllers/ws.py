@@ -1,23 +1,34 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status, Depends
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status, Depends, HTTPException, Query
 from redis.asyncio import Redis
+from typing import Optional
 import asyncio
+import re
+import time
 import traceback
-from app.config.database import get_redis  # функция Depends, возвращающая Redis
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status, Depends
-from redis.asyncio import Redis
-import asyncio
-import traceback
-from app.config.database import get_redis
+from app.config.database import get_redis, get_session_hub  # функции Depends: Redis и общая подписка процесса
+from app.services.qr_service import TOKEN_MODE_HMAC, read_scan_feed
+from app.services.session_hub import Event, SessionHub
+from app.utils.jwt import decode_access_token
+from app.utils.qr_tokens import current_token
+
+FEED_CURSOR_PATTERN = re.compile(r"^\d+-\d+$")
+# Код закрытия WebSocket «доступ запрещён» (диапазон 4000–4999 — коды приложения)
+WS_FORBIDDEN = 4403
 
 ws_router = APIRouter(prefix="/ws/api", tags=["ws"])
 
 
 @ws_router.websocket("/session/{session_id}")
-async def session_ws(websocket: WebSocket, session_id: str, redis: Redis = Depends(get_redis)):
+async def session_ws(
+    websocket: WebSocket,
+    session_id: str,
+    redis: Redis = Depends(get_redis),
+    hub: SessionHub = Depends(get_session_hub),
+):
     await websocket.accept()
     session_key = f"session:{session_id}"
-    pubsub = None
-    channel = None
+    queue = None
+    receiver = None
 
     try:
         # Проверка активного клиента Redis
@@ -26,10 +37,15 @@ async def session_ws(websocket: WebSocket, session_id: str, redis: Redis = Depen
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
             return
 
+        # Подписка до чтения состояния: токен, сменившийся между чтением и подпиской, не потеряется
+        queue = hub.subscribe(session_id)
+        await hub.wait_ready()
+
         # Проверяем активность сессии
         try:
-            active = await redis.hget(session_key, "active_status")
-            print(f"[DEBUG] active_status for {session_key}: {active}")
+            active, token_mode, secret, interval, token = await redis.hmget(
+                session_key, "active_status", "token_mode", "token_secret", "token_interval", "current_token"
+            )
         except Exception as e:
             await websocket.send_json({"error": f"Ошибка при чтении Redis: {str(e)}"})
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
@@ -40,63 +56,42 @@ async def session_ws(websocket: WebSocket, session_id: str, redis: Redis = Depen
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
 
-        # Подписка на канал обновления токена
-        pubsub = redis.pubsub()
-        channel = f"token_updates:{session_key}"
-        await pubsub.subscribe(channel)
-        print(f"[DEBUG] Подписан на канал {channel}")
-
-        # 🔥 Отправляем текущий токен сразу при подключении
-        current_token = await redis.hget(session_key, "current_token")
-        if current_token:
-            try:
-                await websocket.send_json({"token": current_token})
-                print(f"[DEBUG] Отправлен текущий токен клиенту: {current_token}")
-            except Exception as e:
-                print(f"[WARN] Не удалось отправить токен при подключении: {e}")
-                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
-                return
+        # Отключение клиента замечаем сразу, а не при следующей отправке токена
+        receiver = asyncio.create_task(_receive_until_disconnect(websocket))
+
+        # Токены по HMAC меняются по часам: токен считается на границе окна
+        if token_mode == TOKEN_MODE_HMAC:
+            await _send_window_tokens(websocket, redis, queue, receiver, session_id, secret, int(interval))
+            return
+
+        # Отправляем текущий токен сразу при подключении
+        if token:
+            await websocket.send_json({"token": token})
 
-        # Основной цикл прослушивания новых токенов
+        # Новые токены и закрытие сессии приходят событиями, без опроса Redis
         while True:
-            try:
-                # Проверяем статус активности
-                active = await redis.hget(session_key, "active_status")
+            kind, data = await _next_event(queue, receiver)
+            if kind == "resync":
+                active, data = await redis.hmget(session_key, "active_status", "current_token")
                 if not active or int(active) == 0:
-                    try:
-                        await websocket.send_json({"error": "Сессия закрыта"})
-                    except Exception:
-                        pass
-                    await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
-                    break
-
-                # Проверяем новые сообщения
-                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                if message and "data" in message:
-                    try:
-                        await websocket.send_json({"token": message["data"]})
-                        print(f"[DEBUG] Отправлен новый токен: {message['data']}")
-                    except Exception as e:
-                        print(f"[WARN] WebSocket закрыт при отправке токена: {e}")
-                        break
-
-                await asyncio.sleep(0.1)
-
-            except WebSocketDisconnect:
-                print(f"[INFO] Клиент отключился: {session_id}")
-                break
-
-            except asyncio.CancelledError:
-                print(f"[INFO] Цикл WebSocket отменён для {session_id}")
-                break
+                    kind = "closed"
+                elif data == token:
+                    continue
+                else:
+                    kind = "token"
 
-            except Exception as e:
-                print(f"[ERROR] Ошибка в основном цикле WebSocket: {e}")
-                traceback.print_exc()
+            if kind == "closed":
+                await _session_closed(websocket)
                 break
+            if kind == "token" and data:
+                token = data
+                await websocket.send_json({"token": token})
 
     except WebSocketDisconnect:
-        print(f"[INFO] Клиент отключился (вне цикла): {session_id}")
+        print(f"[INFO] Клиент отключился: {session_id}")
+
+    except asyncio.CancelledError:
+        print(f"[INFO] WebSocket отменён для {session_id}")
 
     except Exception as e:
         print(f"[ERROR] Общая ошибка WebSocket: {e}")
@@ -111,17 +106,184 @@ async def session_ws(websocket: WebSocket, session_id: str, redis: Redis = Depen
             pass
 
     finally:
-        # Безопасная отписка от Redis-канала
-        if pubsub and channel:
-            try:
-                await pubsub.unsubscribe(channel)
-                print(f"[DEBUG] Отписан от канала {channel}")
-                await pubsub.close()
-            except Exception as e:
-                print(f"[ERROR] Ошибка при отписке от канала {channel}: {e}")
+        if receiver is not None:
+            receiver.cancel()
+        if queue is not None:
+            hub.unsubscribe(session_id, queue)
 
         # Безопасное закрытие WebSocket
         try:
             await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
-        except Exception as e:
-            print(f"[ERROR] Ошибка при закрытии WebSocket: {e}")
+        except Exception:
+            pass
+
+
+@ws_router.websocket("/session/{session_id}/attendees")
+async def session_attendees_ws(
+    websocket: WebSocket,
+    session_id: str,
+    access_token: str = Query(..., description="JWT преподавателя (браузер не передаёт заголовки в WebSocket)"),
+    cursor: Optional[str] = Query(None, description="id последней полученной отметки — при переподключении"),
+    redis: Redis = Depends(get_redis),
+    hub: SessionHub = Depends(get_session_hub),
+):
+    """
+    Лента отметок сессии для преподавателя: {"type": "scan", "id", "student_id", "scanned_at"}
+    по мере сканирования QR. Без cursor сначала приходят все отметки сессии, с cursor — только
+    пропущенные после него. Когда сессия закрыта — {"type": "closed"} и закрытие сокета.
+
+    JWT передаётся в строке запроса (access_token): браузерный WebSocket не умеет задавать
+    заголовок Authorization. Ленту получает только преподаватель, создавший сессию
+    (teacher_max_id в хэше сессии), остальным — закрытие с кодом 4403.
+    """
+    await websocket.accept()
+    queue = None
+    receiver = None
+
+    try:
+        try:
+            payload = decode_access_token(access_token)
+        except HTTPException as e:
+            payload = {}
+            print(f"[INFO] Лента отметок {session_id}: {e.detail}")
+        if payload.get("role") != "teacher":
+            await websocket.send_json({"error": "Доступ запрещен. Требуется роль: teacher"})
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        if cursor is not None and not FEED_CURSOR_PATTERN.match(cursor):
+            await websocket.send_json({"error": "Некорректный cursor"})
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+
+        active, owner = await redis.hmget(f"session:{session_id}", "active_status", "teacher_max_id")
+        if active is None:
+            await websocket.send_json({"error": "Сессия не найдена"})
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        # Чужую сессию не отдаём, даже если её id известен
+        if owner is None or owner != payload.get("sub"):
+            await websocket.send_json({"error": "Доступ запрещен: сессия создана другим преподавателем"})
+            await websocket.close(code=WS_FORBIDDEN)
+            return
+
+        # Подписка до чтения ленты: отметка между чтением и подпиской не потеряется
+        queue = hub.subscribe(session_id)
+        await hub.wait_ready()
+        active = await redis.hget(f"session:{session_id}", "active_status")
+
+        receiver = asyncio.create_task(_receive_until_disconnect(websocket))
+        # хэш мог истечь между проверкой и подпиской
+        closed = not active or int(active) == 0
+
+        # События из подписки только будят чтение: сами отметки берутся из потока после курсора,
+        # поэтому пропущенные или слитые события не теряют отметок
+        while True:
+            for event in await read_scan_feed(redis, session_id, cursor):
+                await websocket.send_json(event)
+                cursor = event["id"]
+
+            if closed:
+                await websocket.send_json({"type": "closed"})
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+                break
+
+            kind, _ = await _next_event(queue, receiver)
+            while kind == "token":  # смена токена ленту не касается
+                kind, _ = await _next_event(queue, receiver)
+            if kind == "closed":
+                closed = True
+            elif kind == "resync":
+                active = await redis.hget(f"session:{session_id}", "active_status")
+                closed = not active or int(active) == 0
+
+    except WebSocketDisconnect:
+        print(f"[INFO] Преподаватель отключился от ленты: {session_id}")
+
+    except asyncio.CancelledError:
+        print(f"[INFO] Лента отметок отменена для {session_id}")
+
+    except Exception as e:
+        print(f"[ERROR] Ошибка ленты отметок: {e}")
+        traceback.print_exc()
+        try:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        except Exception:
+            pass
+
+    finally:
+        if receiver is not None:
+            receiver.cancel()
+        if queue is not None:
+            hub.unsubscribe(session_id, queue)
+        try:
+            await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+        except Exception:
+            pass
+
+
+async def _receive_until_disconnect(websocket: WebSocket):
+    """Читает входящие сообщения (клиент ничего не шлёт) до отключения."""
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+
+
+async def _next_event(queue: asyncio.Queue, receiver: asyncio.Task, timeout: Optional[float] = None) -> Optional[Event]:
+    """
+    Следующее событие сессии из общей подписки процесса.
+    None — истёк timeout; WebSocketDisconnect — клиент отключился.
+    """
+    getter = asyncio.ensure_future(queue.get())
+    done, _ = await asyncio.wait({getter, receiver}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+    if getter in done:
+        return getter.result()
+    getter.cancel()
+    if receiver in done:
+        raise WebSocketDisconnect()
+    return None
+
+
+async def _session_closed(websocket: WebSocket):
+    try:
+        await websocket.send_json({"error": "Сессия закрыта"})
+    except Exception:
+        pass
+    await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+
+
+async def _send_window_tokens(
+    websocket: WebSocket,
+    redis: Redis,
+    queue: asyncio.Queue,
+    receiver: asyncio.Task,
+    session_id: str,
+    secret: str,
+    interval: int,
+):
+    """
+    Отправка токенов сессии в режиме hmac: новый токен — в момент смены окна времени,
+    вместе с expires_at, чтобы клиент мог обновить QR по часам. Между окнами ждём только
+    события закрытия сессии.
+    """
+    sent = None
+    while True:
+        token, expires_at = current_token(secret, session_id, interval)
+        if token != sent:
+            await websocket.send_json({"token": token, "expires_at": expires_at})
+            sent = token
+
+        event = await _next_event(queue, receiver, timeout=max(0.0, expires_at - time.time()))
+        if event is None:
+            continue
+
+        kind, _ = event
+        if kind == "resync":
+            active = await redis.hget(f"session:{session_id}", "active_status")
+            if active and int(active):
+                continue
+            kind = "closed"
+        if kind == "closed":
+            await _session_closed(websocket)
+            return
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Literal, Optional
 from datetime import date as date_type
 
 
@@ -28,25 +28,60 @@ class MarkAttendanceToOneRequest(BaseModel):
         }
 
 
-'''запрос для ручки /api/attendance/teacher/mark-to-many'''
+'''запрос для ручки /api/attendance/teacher/mark-to-many (преподаватель берётся из jwt)'''
 class MarkAttendanceToManyRequest(BaseModel):
-    teacher_first_name: str = Field(..., description="Имя преподавателя")
-    teacher_last_name: str = Field(..., description="Фамилия преподавателя")
     group_name: str = Field(..., description="Название группы")
     subject_name: str = Field(..., description="Название предмета")
+    subject_type: str = Field(..., description="Тип предмета")
     date: str = Field(..., description="Дата в формате строки")
     zach_list: List[str] = Field(..., description="Список с номерами зачеток.")
-    # status: bool = Field(..., description="Статус посещения (True/False)") --> всегда передаём true
+    status: bool = Field(True, description="Статус посещения (True/False), по умолчанию True")
 
     class Config:
         schema_extra = {
             "example": {
-                "teacher_first_name": "Иван",
-                "teacher_last_name": "Петров",
                 "group_name": "ИТ-21",
                 "subject_name": "Математика",
+                "subject_type": "лекция",
                 "date": "2024-01-15",
-                "zach": ["123456", "123457"],
+                "zach_list": ["123456", "123457"],
                 "status": True
             }
-        }
\ No newline at end of file
+        }
+
+
+'''элемент задания для ручки /api/reports/jobs'''
+class ReportJobItem(BaseModel):
+    kind: Literal["attendance", "rating", "average"] = Field(..., description="Тип ведомости")
+    group_name: str = Field(..., description="Название группы")
+    subject_name: Optional[str] = Field(None, description="Название предмета (attendance, rating)")
+    subject_type: Optional[str] = Field(None, description="Тип предмета (attendance)")
+
+    @model_validator(mode="after")
+    def check_subject(self):
+        if self.kind in ("attendance", "rating") and not self.subject_name:
+            raise ValueError(f"Для ведомости {self.kind} нужен subject_name")
+        if self.kind == "attendance" and not self.subject_type:
+            raise ValueError("Для ведомости attendance нужен subject_type")
+        # поля, которые ведомость этого типа не использует, не должны делать одинаковые ведомости разными
+        if self.kind != "attendance":
+            self.subject_type = None
+        if self.kind == "average":
+            self.subject_name = None
+        return self
+
+
+'''запрос для ручки /api/reports/jobs'''
+class CreateReportJobRequest(BaseModel):
+    items: List[ReportJobItem] = Field(..., min_length=1, description="Ведомости, которые нужно сформировать")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "items": [
+                    {"kind": "average", "group_name": "УБ-41"},
+                    {"kind": "rating", "group_name": "УБ-41", "subject_name": "Математика"},
+                    {"kind": "attendance", "group_name": "УБ-41", "subject_name": "Математика", "subject_type": "лекция"}
+                ]
+            }
+        }
@@ -12,7 +12,10 @@ __all__ = [
     "TeacherInfo",
     "DeanInfo",
     "Attendance",
+    "AttendanceMark",
     "Rating",
+    "RatingMark",
+    "RatingGrade",
     "GroupTimetable",
     "TeacherTimetable",
     "UserCreate",
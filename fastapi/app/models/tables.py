@@ -1,7 +1,7 @@
 # database.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, ForeignKey, Index, Text, func
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import deferred, relationship
 from sqlalchemy.dialects.postgresql import JSONB
 from datetime import datetime
 
@@ -31,6 +31,10 @@ class GroupTimetable(Base):
     # Relationships
     group = relationship("Groups", back_populates="group_timetables")
 
+    __table_args__ = (
+        Index("ix_group_timetable_group_id", "group_id"),
+    )
+
 
 class StudentInfo(Base):
     __tablename__ = "student_info"
@@ -43,6 +47,11 @@ class StudentInfo(Base):
     group = relationship("Groups", back_populates="student_infos")
     users = relationship("User", back_populates="student_info")
 
+    __table_args__ = (
+        # Студенты группы (ведомости, список группы)
+        Index("ix_student_info_group_id", "group_id"),
+    )
+
 
 class TeacherTimetable(Base):
     __tablename__ = "teacher_timetable"
@@ -85,6 +94,13 @@ class User(Base):
     student_info = relationship("StudentInfo", back_populates="users")
     passwd = Column(String(255))
 
+    __table_args__ = (
+        # max_id ищется на каждом авторизованном запросе
+        Index("ix_users_max_id", "max_id", postgresql_include=["teacher_info_id", "student_info_id"]),
+        Index("ix_users_student_info_id", "student_info_id"),
+        Index("ix_users_last_name_first_name", "last_name", "first_name"),
+    )
+
 
 class Attendance(Base):
     __tablename__ = "attendance"
@@ -95,12 +111,44 @@ class Attendance(Base):
     semestr = Column(String(50))
     teacher_id = Column(Integer, ForeignKey("teacher_info.id"))
     group_id = Column(Integer, ForeignKey("groups.id"))
-    attendance_json = Column(JSONB)
+    # Устаревшее хранение всей матрицы ведомости одним документом.
+    # Источник истины — attendance_mark, колонка читается только миграцией.
+    attendance_json = deferred(Column(JSONB))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
     teacher = relationship("TeacherInfo", back_populates="attendances")
     group = relationship("Groups", back_populates="attendances")
+    marks = relationship("AttendanceMark", back_populates="attendance", passive_deletes=True)
+
+    __table_args__ = (
+        # Поиск ведомости преподавателя: группа + преподаватель + предмет
+        Index("ix_attendance_group_teacher_subject", "group_id", "teacher_id", "subject_name", "subject_type"),
+    )
+
+
+class AttendanceMark(Base):
+    """Одна ячейка ведомости посещаемости: студент × дата занятия."""
+    __tablename__ = "attendance_mark"
+
+    attendance_id = Column(Integer, ForeignKey("attendance.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(String(255), primary_key=True)  # номер зачётки
+    lesson_date = Column(Date, primary_key=True)
+    present = Column(Boolean, nullable=False)
+    # Время последней записи ячейки: по count и сумме updated_at считается версия ведомости (ключ кэша PDF)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Relationships
+    attendance = relationship("Attendance", back_populates="marks")
+
+    __table_args__ = (
+        # Покрывающий индекс для выборок «все ведомости студента»
+        Index(
+            "ix_attendance_mark_student_attendance",
+            "student_id", "attendance_id",
+            postgresql_include=["lesson_date", "present"],
+        ),
+    )
 
 
 class Rating(Base):
@@ -112,9 +160,63 @@ class Rating(Base):
     semestr = Column(String(50))
     teacher_id = Column(Integer, ForeignKey("teacher_info.id"))
     group_id = Column(Integer, ForeignKey("groups.id"))
-    rating_json = Column(JSONB)
+    # Устаревшее хранение рейтинга группы одним документом.
+    # Источник истины — rating_mark/rating_grade, колонка читается только миграцией.
+    rating_json = deferred(Column(JSONB))
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
 
     # Relationships
     teacher = relationship("TeacherInfo", back_populates="ratings")
-    group = relationship("Groups", back_populates="ratings")
\ No newline at end of file
+    group = relationship("Groups", back_populates="ratings")
+    marks = relationship("RatingMark", back_populates="rating", passive_deletes=True)
+    grades = relationship("RatingGrade", back_populates="rating", passive_deletes=True)
+
+    __table_args__ = (
+        Index("ix_rating_group_subject", "group_id", "subject_name"),
+    )
+
+
+class RatingMark(Base):
+    """Оценка студента за одну контрольную точку (kt1..kt5) ведомости рейтинга."""
+    __tablename__ = "rating_mark"
+
+    rating_id = Column(Integer, ForeignKey("rating.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(String(255), primary_key=True)  # номер зачётки
+    control_point = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False)
+    # Время последней записи ячейки: по count и сумме updated_at считается версия ведомости (ключ кэша PDF)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Relationships
+    rating = relationship("Rating", back_populates="marks")
+
+    __table_args__ = (
+        # Покрывающий индекс для выборок «все оценки студента»
+        Index(
+            "ix_rating_mark_student_rating",
+            "student_id", "rating_id",
+            postgresql_include=["control_point", "value"],
+        ),
+    )
+
+
+class RatingGrade(Base):
+    """Итоговая оценка студента по ведомости (практика, курсовая работа)."""
+    __tablename__ = "rating_grade"
+
+    rating_id = Column(Integer, ForeignKey("rating.id", ondelete="CASCADE"), primary_key=True)
+    student_id = Column(String(255), primary_key=True)  # номер зачётки
+    grade = Column(String(50), nullable=False)
+    # Время последней записи ячейки: по count и сумме updated_at считается версия ведомости (ключ кэша PDF)
+    updated_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    # Relationships
+    rating = relationship("Rating", back_populates="grades")
+
+    __table_args__ = (
+        Index(
+            "ix_rating_grade_student_rating",
+            "student_id", "rating_id",
+            postgresql_include=["grade"],
+        ),
+    )
\ No newline at end of file
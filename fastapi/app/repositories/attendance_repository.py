@@ -1,36 +1,44 @@
+from datetime import date
 from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from app.models.tables import Attendance, Groups, TeacherInfo, User
-from .base_repository import BaseRepository
+from sqlalchemy import JSON, Boolean, Date, String, Text, and_, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY, aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.tables import Attendance, AttendanceMark, Groups, StudentInfo, TeacherInfo, User
+from .base_repository import BaseRepository, rows_version
 from app.dto.attendance_ved_dto import AttendanceDTO
-from sqlalchemy.orm.attributes import flag_modified
 
+# Сколько строк за раз забирается из серверного курсора при потоковой выгрузке
+STREAM_BATCH_SIZE = 1000
 
 
 class AttendanceRepository(BaseRepository[Attendance]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(Attendance, db)
 
 
-    def get_student_attendance(self, group_id: int, zach_number: str, subject_type: str, subject_name: str) -> Dict:
+    async def get_student_attendance(self, group_id: int, zach_number: str, subject_type: str, subject_name: str) -> Dict:
         """Возвращает все ведомости посещаемости студента по номеру зачетки и названию группы."""
-        
-
-        attendances = (
-            self.db.query(Attendance)
-                .filter(
+        rows = (
+            await self.db.execute(
+                select(AttendanceMark.lesson_date, AttendanceMark.present)
+                .join(Attendance, AttendanceMark.attendance_id == Attendance.id)
+                .where(
                     Attendance.group_id == group_id,
                     Attendance.subject_name == subject_name,
-                    Attendance.subject_type == subject_type
-                ).first().attendance_json
+                    Attendance.subject_type == subject_type,
+                    AttendanceMark.student_id == zach_number
+                )
+                .order_by(AttendanceMark.lesson_date)
             )
-        
-        student_attendance = {}
+        ).all()
 
-        for attendance_record in attendances:
-            if attendance_record["student_id"] == zach_number:
-                student_attendance = attendance_record
-                break
+        student_attendance = {}
+        if rows:
+            student_attendance = {
+                "student_id": zach_number,
+                "attendance": {lesson_date.isoformat(): present for lesson_date, present in rows}
+            }
 
         return {
             "subject_name": subject_name,
@@ -41,30 +49,211 @@ class AttendanceRepository(BaseRepository[Attendance]):
 
 
 
-    def get_ved_for_teacher(self, group_id: int, teacher_id: int, subject_name: str, subject_type: str):
+    async def get_student_subjects(self, zach_number: str) -> Optional[List[Dict[str, str]]]:
+        """
+        Предметы студента одним запросом: ведомости его группы, в которых у него есть хотя бы одна отметка.
+        None — если студента с такой зачеткой нет.
+        """
+        has_marks = (
+            select(AttendanceMark.attendance_id)
+            .where(
+                AttendanceMark.attendance_id == Attendance.id,
+                AttendanceMark.student_id == zach_number
+            )
+            .exists()
+        )
+        rows = (
+            await self.db.execute(
+                select(StudentInfo.id, Attendance.subject_name, Attendance.subject_type)
+                .outerjoin(Attendance, and_(Attendance.group_id == StudentInfo.group_id, has_marks))
+                .where(StudentInfo.zach_number == zach_number)
+                .order_by(Attendance.id)
+            )
+        ).all()
+
+        if not rows:
+            return None
+
+        return [
+            {"subject_name": row.subject_name, "subject_type": row.subject_type}
+            for row in rows
+            if row.subject_name is not None
+        ]
+
+
+
+
+    async def get_ved_for_teacher(self, group_id: int, teacher_id: int, subject_name: str, subject_type: str):
         """
         Возвращает ведомость, которую должен заполнять конкретный учитель,
         по названию группы, названию предмета, типу предмета и teacher_info_id.
         """
         ved = (
-            self.db.query(Attendance)
-               .filter(
+            await self.db.execute(
+                select(Attendance)
+               .where(
                    Attendance.group_id == group_id,
                    Attendance.teacher_id == teacher_id,
                    Attendance.subject_name == subject_name,
                    Attendance.subject_type == subject_type
-               ).first()
+               )
+               .order_by(Attendance.id)
             )
+        ).scalars().first()
         
         return ved
 
 
+    async def get_ved_marks(self, attendance_id: int, until: Optional[date] = None):
+        """Отметки ведомости в виде строк (student_id, lesson_date, present); until — по эту дату включительно."""
+        query = (
+            select(AttendanceMark.student_id, AttendanceMark.lesson_date, AttendanceMark.present)
+            .where(AttendanceMark.attendance_id == attendance_id)
+            .order_by(AttendanceMark.student_id, AttendanceMark.lesson_date)
+        )
+        if until is not None:
+            query = query.where(AttendanceMark.lesson_date <= until)
+        result = await self.db.execute(query)
+        return result.all()
+
+
+    async def get_ved_dates(self, attendance_id: int, until: date) -> List[date]:
+        """Даты занятий ведомости по until включительно — столбцы выгрузки посещаемости."""
+        result = await self.db.execute(
+            select(AttendanceMark.lesson_date)
+            .where(
+                AttendanceMark.attendance_id == attendance_id,
+                AttendanceMark.lesson_date <= until
+            )
+            .distinct()
+            .order_by(AttendanceMark.lesson_date)
+        )
+        return list(result.scalars().all())
+
+
+    async def stream_ved_marks(self, attendance_id: int, until: date):
+        """
+        Отметки ведомости (student_id, lesson_date, present) по until включительно, упорядоченные по студенту,
+        через серверный курсор: в памяти только текущая пачка строк.
+        """
+        return await self.db.stream(
+            select(AttendanceMark.student_id, AttendanceMark.lesson_date, AttendanceMark.present)
+            .where(
+                AttendanceMark.attendance_id == attendance_id,
+                AttendanceMark.lesson_date <= until
+            )
+            .order_by(AttendanceMark.student_id, AttendanceMark.lesson_date)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
 
+    async def get_ved_for_teacher_json(
+        self, max_id: str, group_name: str, subject_name: str, subject_type: str
+    ) -> Optional[str]:
+        """
+        Ведомость преподавателя вместе с attendance_json, собранная в Postgres и возвращённая текстом JSON —
+        в Python не разбирается и уходит в ответ как есть. None — если ведомости нет.
+        """
+        per_student = (
+            select(
+                AttendanceMark.student_id,
+                func.json_object_agg(
+                    AttendanceMark.lesson_date,
+                    aggregate_order_by(AttendanceMark.present, AttendanceMark.lesson_date)
+                ).label("attendance")
+            )
+            .where(AttendanceMark.attendance_id == Attendance.id)
+            .group_by(AttendanceMark.student_id)
+            .correlate(Attendance)
+            .subquery()
+        )
+        attendance_json = (
+            select(func.coalesce(
+                func.json_agg(aggregate_order_by(
+                    func.json_build_object(
+                        "student_id", per_student.c.student_id,
+                        "attendance", per_student.c.attendance
+                    ),
+                    per_student.c.student_id
+                )),
+                literal("[]").cast(JSON)
+            ))
+            .scalar_subquery()
+        )
+        return await self.db.scalar(
+            select(func.json_build_object(
+                "id", Attendance.id,
+                "subject_name", Attendance.subject_name,
+                "subject_type", Attendance.subject_type,
+                "semestr", Attendance.semestr,
+                "teacher_id", Attendance.teacher_id,
+                "group_id", Attendance.group_id,
+                "created_at", Attendance.created_at,
+                "attendance_json", attendance_json
+            ).cast(Text))
+            .join(User, User.teacher_info_id == Attendance.teacher_id)
+            .join(Groups, Groups.id == Attendance.group_id)
+            .where(
+                User.max_id == max_id,
+                Groups.group_name == group_name,
+                Attendance.subject_name == subject_name,
+                Attendance.subject_type == subject_type
+            )
+            .order_by(Attendance.id)
+            .limit(1)
+        )
+
+
+    @staticmethod
+    def _ved_id_select(teacher_info_id: int, group_id: int, subject_name: str, subject_type: str):
+        """SELECT id ведомости преподавателя по группе и предмету."""
+        return (
+            select(Attendance.id)
+            .where(
+                Attendance.teacher_id == teacher_info_id,
+                Attendance.group_id == group_id,
+                Attendance.subject_name == subject_name,
+                Attendance.subject_type == subject_type
+            )
+            .order_by(Attendance.id)
+            .limit(1)
+        )
+
+
+    async def get_ved_id(self, teacher_info_id: int, group_id: int, subject_name: str, subject_type: str) -> Optional[int]:
+        """id ведомости без загрузки самой строки."""
+        return await self.db.scalar(self._ved_id_select(teacher_info_id, group_id, subject_name, subject_type))
+
+
+    async def get_ved_version(self, max_id: str, group_name: str, subject_name: str, subject_type: str):
+        """
+        (id, версия отметок) ведомости преподавателя одним запросом — для ключа кэша PDF.
+        Версия считается по строкам attendance_mark (rows_version): запись ячейки не трогает
+        строку ведомости, и параллельные отметки не ждут друг друга на её блокировке.
+        """
+        marks_version = (
+            select(rows_version(AttendanceMark.updated_at))
+            .where(AttendanceMark.attendance_id == Attendance.id)
+            .scalar_subquery()
+        )
+        result = await self.db.execute(
+            select(Attendance.id, marks_version)
+            .join(User, User.teacher_info_id == Attendance.teacher_id)
+            .join(Groups, Groups.id == Attendance.group_id)
+            .where(
+                User.max_id == max_id,
+                Groups.group_name == group_name,
+                Attendance.subject_name == subject_name,
+                Attendance.subject_type == subject_type
+            )
+            .order_by(Attendance.id)
+            .limit(1)
+        )
+        return result.first()
 
-   
 
     """меняет статус по зачетке для одного студента."""
-    def mark_attendance_to_one(
+    async def mark_attendance_to_one(
         self,
         teacher_info_id: int,
         group_id: int,
@@ -74,106 +263,105 @@ class AttendanceRepository(BaseRepository[Attendance]):
         zach: str,
         status: bool
     ) -> dict:
-        # 3. Ищем ведомость
-        attendance_record = (
-            self.db.query(Attendance)
-            .filter(
+        try:
+            lesson_date = date.fromisoformat(date_str)
+        except ValueError:
+            return {"error": f"Некорректная дата: {date_str}"}
+
+        # Одна команда: id ведомости ищется в самом INSERT ... SELECT,
+        # наружу возвращается только изменённая ячейка
+        ved = (
+            select(
+                Attendance.id,
+                literal(zach, String),
+                literal(lesson_date, Date),
+                literal(status, Boolean)
+            )
+            .where(
                 Attendance.teacher_id == teacher_info_id,
                 Attendance.group_id == group_id,
                 Attendance.subject_name == subject_name,
                 Attendance.subject_type == subject_type
             )
-            .first()
+            .order_by(Attendance.id)
+            .limit(1)
+        )
+        stmt = pg_insert(AttendanceMark).from_select(
+            ["attendance_id", "student_id", "lesson_date", "present"], ved
         )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttendanceMark.attendance_id, AttendanceMark.student_id, AttendanceMark.lesson_date],
+            set_={"present": stmt.excluded.present, "updated_at": func.now()},
+        ).returning(
+            AttendanceMark.attendance_id, AttendanceMark.student_id, AttendanceMark.lesson_date, AttendanceMark.present
+        )
+
+        cell = (await self.db.execute(stmt)).first()
 
         # !!! КРИТИЧЕСКАЯ ПРОВЕРКА: Если ведомость не найдена, возвращаем ошибку.
-        if attendance_record is None:
+        if cell is None:
+            await self.db.rollback()
             return {"error": f"Ведомость не найдена для: Группа ID={group_id}, Преподаватель ID={teacher_info_id}, Предмет='{subject_name}' ({subject_type})"}
-        
-        # 4. Загружаем существующую посещаемость
-        attendance_data = attendance_record.attendance_json or []
-
-        # 5. Обновляем или добавляем студента
-        for std_attendance in attendance_data:
-            if std_attendance["student_id"] == zach:
-                std_attendance["attendance"][date_str] = status
-                break
-        else:
-            attendance_data.append({"student_id": zach, "attendance": {date_str: status}})
-
-        # 6. Сохраняем изменения
-        attendance_record.attendance_json = attendance_data
-        flag_modified(attendance_record, "attendance_json")
-        self.db.commit()
-
-        return {"message": f"Посещаемость обновлена"}
+
+        await self.db.commit()
+
+        return {
+            "message": f"Посещаемость обновлена",
+            "cell": {"student_id": cell.student_id, "date": cell.lesson_date.isoformat(), "status": cell.present}
+        }
     
 
 
 
-    """меняет статус по зачетке для одного студента."""
-    def mark_attendance_to_many(
+    """меняет статус сразу для списка зачеток: одна команда и один commit."""
+    async def mark_many(
         self,
-        teacher_first_name: str,
-        teacher_last_name: str,
-        group_name: str,
+        teacher_info_id: int,
+        group_id: int,
         subject_name: str,
         subject_type: str,
         date_str: str,
-        zach_list: List[str]
+        zach_list: List[str],
+        status: bool = True
     ) -> dict:
-    # 1. Ищем преподавателя
-        teacher_user = (
-            self.db.query(User)
-            .filter(
-                User.first_name == teacher_first_name,
-                User.last_name == teacher_last_name,
-                User.role == "teacher"
-            )
-            .first()
-        )
+        try:
+            lesson_date = date.fromisoformat(date_str)
+        except ValueError:
+            return {"error": f"Некорректная дата: {date_str}"}
 
-        if not teacher_user or not teacher_user.teacher_info:
-            return {"error": f"Преподаватель {teacher_first_name} {teacher_last_name} не найден"}
+        # ON CONFLICT DO UPDATE не может изменить одну строку дважды — убираем повторы, сохраняя порядок
+        zach_list = list(dict.fromkeys(zach_list))
+        if not zach_list:
+            return {"message": "Посещаемость обновлена", "marked": []}
 
-        teacher_info = teacher_user.teacher_info
-
-        # 2. Ищем группу
-        group = self.db.query(Groups).filter(Groups.group_name == group_name).first()
-        if not group:
-            return {"error": f"Группа '{group_name}' не найдена"}
-
-        # 3. Ищем ведомость
-        attendance_record = (
-            self.db.query(Attendance)
-            .filter(
-                Attendance.teacher_id == teacher_info.id,
-                Attendance.group_id == group.id,
-                Attendance.subject_name == subject_name,
-                Attendance.subject_type == subject_type 
+        # id ведомости ищется в самом INSERT ... SELECT, зачетки разворачиваются из массива через unnest
+        ved = (
+            select(
+                Attendance.id,
+                func.unnest(literal(zach_list, ARRAY(String))),
+                literal(lesson_date, Date),
+                literal(status, Boolean)
+            )
+            .where(
+                Attendance.id == self._ved_id_select(
+                    teacher_info_id, group_id, subject_name, subject_type
+                ).scalar_subquery()
             )
-            .first()
         )
+        stmt = pg_insert(AttendanceMark).from_select(
+            ["attendance_id", "student_id", "lesson_date", "present"], ved
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AttendanceMark.attendance_id, AttendanceMark.student_id, AttendanceMark.lesson_date],
+            set_={"present": stmt.excluded.present, "updated_at": func.now()},
+        ).returning(AttendanceMark.attendance_id, AttendanceMark.student_id)
 
-        if not attendance_record:
-            return {"error": f"Ведомость по предмету '{subject_name}' не найдена для преподавателя {teacher_last_name} и группы {group_name}"}
-
-        # 4. Загружаем существующую посещаемость
-        attendance_data = attendance_record.attendance_json or []
+        rows = (await self.db.execute(stmt)).all()
 
-        # 5. Обновляем 
-        for std_attendance in attendance_data:
-            for zach in zach_list:
-                if std_attendance["student_id"] == zach:
-                    std_attendance["attendance"][date_str] = True
-                
-        else:
-            attendance_data.append({"student_id": zach, "attendance": {date_str: True}})
+        if not rows:
+            await self.db.rollback()
+            return {"error": f"Ведомость не найдена для: Группа ID={group_id}, Преподаватель ID={teacher_info_id}, Предмет='{subject_name}' ({subject_type})"}
 
-        # 6. Сохраняем изменения
-        attendance_record.attendance_json = attendance_data
-        flag_modified(attendance_record, "attendance_json")
-        self.db.commit()
+        await self.db.commit()
 
-        return {"message": f"Посещаемость обновлена для предмета '{subject_name}' и группы '{group_name}'"}
-    
+        return {"message": f"Посещаемость обновлена для предмета '{subject_name}'", "marked": [row.student_id for row in rows]}
@@ -1,48 +1,61 @@
 from typing import TypeVar, Generic, Type, Optional, List, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import BigInteger, cast, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.tables import Base
 
 ModelType = TypeVar("ModelType", bound=Base)
 
 
+def rows_version(updated_at):
+    """
+    Версия набора строк для ключа кэша: "число строк:сумма updated_at в микросекундах".
+    Меняется при вставке, удалении и перезаписи любой строки, в том числе если транзакции
+    зафиксировались не в порядке своих now(), — в отличие от max(updated_at).
+    """
+    micros = cast(func.extract("epoch", updated_at) * 1000000, BigInteger)
+    return func.concat(func.count(), ":", func.coalesce(func.sum(micros), 0))
+
+
 class BaseRepository(Generic[ModelType]):
-    def __init__(self, model: Type[ModelType], db: Session):
+    def __init__(self, model: Type[ModelType], db: AsyncSession):
         self.model = model
         self.db = db
 
-    def get(self, id: Any) -> Optional[ModelType]:
-        return self.db.query(self.model).filter(self.model.id == id).first()
+    async def get(self, id: Any) -> Optional[ModelType]:
+        result = await self.db.execute(select(self.model).where(self.model.id == id))
+        return result.scalars().first()
 
-    def get_multi(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
-        return self.db.query(self.model).offset(skip).limit(limit).all()
+    async def get_multi(self, skip: int = 0, limit: int = 100) -> List[ModelType]:
+        result = await self.db.execute(select(self.model).offset(skip).limit(limit))
+        return list(result.scalars().all())
 
-    def create(self, obj_in: dict) -> ModelType:
+    async def create(self, obj_in: dict) -> ModelType:
         db_obj = self.model(**obj_in)
         self.db.add(db_obj)
-        self.db.commit()
-        self.db.refresh(db_obj)
+        await self.db.commit()
+        await self.db.refresh(db_obj)
         return db_obj
 
-    def update(self, db_obj: ModelType, obj_in: dict) -> ModelType:
+    async def update(self, db_obj: ModelType, obj_in: dict) -> ModelType:
         for field, value in obj_in.items():
             setattr(db_obj, field, value)
-        self.db.commit()
-        self.db.refresh(db_obj)
+        await self.db.commit()
+        await self.db.refresh(db_obj)
         return db_obj
 
-    def delete(self, id: Any) -> Optional[ModelType]:
-        obj = self.get(id)
+    async def delete(self, id: Any) -> Optional[ModelType]:
+        obj = await self.get(id)
         if obj:
-            self.db.delete(obj)
-            self.db.commit()
+            await self.db.delete(obj)
+            await self.db.commit()
         return obj
 
-    def exists(self, **filters) -> bool:
-        query = self.db.query(self.model)
+    async def exists(self, **filters) -> bool:
+        query = select(self.model)
         for field, value in filters.items():
-            query = query.filter(getattr(self.model, field) == value)
-        return query.first() is not None
+            query = query.where(getattr(self.model, field) == value)
+        result = await self.db.execute(query.limit(1))
+        return result.scalars().first() is not None
 
 
 
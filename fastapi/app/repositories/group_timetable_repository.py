@@ -1,16 +1,19 @@
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.tables import GroupTimetable
 from .base_repository import BaseRepository
 
 
 class GroupTimetableRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.base_repo = BaseRepository(GroupTimetable, db)
 
-    def get_by_group_id(self, group_id: int) -> Optional[GroupTimetable]:
+    async def get_by_group_id(self, group_id: int) -> Optional[GroupTimetable]:
         """Получить расписание по ID группы"""
-        return self.db.query(GroupTimetable)\
-            .filter(GroupTimetable.group_id == group_id)\
-            .first()
\ No newline at end of file
+        result = await self.db.execute(
+            select(GroupTimetable)
+            .where(GroupTimetable.group_id == group_id)
+        )
+        return result.scalars().first()
\ No newline at end of file
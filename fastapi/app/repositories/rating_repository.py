@@ -1,135 +1,378 @@
 # app/repositories/rating_repository.py
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from sqlalchemy.orm.attributes import flag_modified
-from app.models.tables import Rating, StudentInfo, Groups
-from .base_repository import BaseRepository
+from typing import List, Dict, Any, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import JSON, Integer, String, Text, and_, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from app.models.tables import Rating, RatingMark, RatingGrade, StudentInfo, Groups
+from .base_repository import BaseRepository, rows_version
+
+# Сколько строк за раз забирается из серверного курсора при потоковой выгрузке
+STREAM_BATCH_SIZE = 1000
 
 class RatingRepository(BaseRepository[Rating]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(Rating, db)
 
-    def get_student_ratings(self, zach_number: str) -> List[Rating]:
-        return self.db.query(Rating).join(
+    async def get_student_ratings(self, zach_number: str) -> List[Rating]:
+        result = await self.db.execute(select(Rating).join(
             StudentInfo, Rating.group_id == StudentInfo.group_id
-        ).filter(
+        ).where(
             StudentInfo.zach_number == zach_number
-        ).all()
+        ))
+        return list(result.scalars().all())
+
+    async def get_student_marks(self, zach_number: str) -> List[Tuple[str, str, str, int]]:
+        """Оценки КТ студента по всем предметам его группы: (subject_name, subject_type, control_point, value)."""
+        result = await self.db.execute(
+            select(Rating.subject_name, Rating.subject_type, RatingMark.control_point, RatingMark.value)
+            .join(RatingMark, RatingMark.rating_id == Rating.id)
+            .join(StudentInfo, and_(
+                StudentInfo.zach_number == RatingMark.student_id,
+                StudentInfo.group_id == Rating.group_id
+            ))
+            .where(RatingMark.student_id == zach_number)
+            .order_by(Rating.id, RatingMark.control_point)
+        )
+        return result.all()
+
+    async def get_student_grades(self, zach_number: str) -> List[Tuple[str, str, str]]:
+        """Итоговые оценки студента по предметам его группы: (subject_name, subject_type, grade)."""
+        result = await self.db.execute(
+            select(Rating.subject_name, Rating.subject_type, RatingGrade.grade)
+            .join(RatingGrade, RatingGrade.rating_id == Rating.id)
+            .join(StudentInfo, and_(
+                StudentInfo.zach_number == RatingGrade.student_id,
+                StudentInfo.group_id == Rating.group_id
+            ))
+            .where(RatingGrade.student_id == zach_number)
+            .order_by(Rating.id)
+        )
+        return result.all()
 
-    def get_group_rating(self, group_name: str, subject_name: str) -> Optional[Rating]:
-        return self.db.query(Rating).join(
+    async def get_group_rating(self, group_name: str, subject_name: str) -> Optional[Rating]:
+        result = await self.db.execute(select(Rating).join(
             Groups, Rating.group_id == Groups.id
-        ).filter(
+        ).where(
             and_(
                 Groups.group_name == group_name,
                 Rating.subject_name == subject_name
             )
-        ).first()
+        ).order_by(Rating.id))
+        return result.scalars().first()
 
-    def get_student_rating_by_subject(self, zach_number: str, subject_name: str) -> Optional[Dict]:
-        student = self.db.query(StudentInfo).filter(
-            StudentInfo.zach_number == zach_number
-        ).first()
-        if not student:
-            return None
+    @staticmethod
+    def _group_average_select(group_name: str):
+        """
+        SELECT (zach_number, average) по всем КТ всех предметов для каждого студента группы.
 
-        rating = self.db.query(Rating).filter(
-            and_(
-                Rating.group_id == student.group_id,
+        Оценки берутся как в get_student_ratings: по предмету одна запись на КТ, при нескольких
+        ведомостях с одним subject_name — из последней (DISTINCT ON по наибольшему Rating.id).
+        """
+        marks = (
+            select(RatingMark.student_id, RatingMark.value)
+            .join(Rating, Rating.id == RatingMark.rating_id)
+            .join(Groups, Groups.id == Rating.group_id)
+            .where(Groups.group_name == group_name, RatingMark.control_point.startswith("kt"))
+            .distinct(RatingMark.student_id, Rating.subject_name, RatingMark.control_point)
+            .order_by(RatingMark.student_id, Rating.subject_name, RatingMark.control_point, Rating.id.desc())
+            .subquery()
+        )
+        return (
+            select(
+                StudentInfo.zach_number,
+                func.avg(marks.c.value).label("average")
+            )
+            .join(Groups, Groups.id == StudentInfo.group_id)
+            .outerjoin(marks, marks.c.student_id == StudentInfo.zach_number)
+            .where(Groups.group_name == group_name)
+            .group_by(StudentInfo.id, StudentInfo.zach_number)
+            .order_by(StudentInfo.id)
+        )
+
+    @staticmethod
+    def round_average(average) -> Optional[float]:
+        # округление как в прежнем расчёте на Python (round по float), а не numeric round в Postgres
+        return round(float(average), 2) if average is not None else None
+
+    async def get_group_average_marks(self, group_name: str) -> List[Tuple[str, Optional[float]]]:
+        """
+        Средний балл по всем КТ всех предметов для каждого студента группы одним агрегатным запросом:
+        (zach_number, average) — average = None, если у студента нет оценок.
+        """
+        result = await self.db.execute(self._group_average_select(group_name))
+        return [
+            (zach_number, self.round_average(average))
+            for zach_number, average in result.all()
+        ]
+
+    async def stream_group_average_marks(self, group_name: str):
+        """То же, что get_group_average_marks, но через серверный курсор; average не округлён (см. round_average)."""
+        return await self.db.stream(
+            self._group_average_select(group_name).execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
+    @staticmethod
+    def _rating_version(rating_id):
+        """
+        Версия оценок ведомости по строкам rating_mark и rating_grade (rows_version): запись оценки
+        не трогает строку ведомости, и параллельные записи не ждут друг друга на её блокировке.
+        """
+        marks = select(rows_version(RatingMark.updated_at)).where(RatingMark.rating_id == rating_id).scalar_subquery()
+        grades = select(rows_version(RatingGrade.updated_at)).where(RatingGrade.rating_id == rating_id).scalar_subquery()
+        return func.concat(marks, "/", grades)
+
+    async def get_group_rating_version(self, group_name: str, subject_name: str):
+        """(id, версия оценок) ведомости рейтинга группы по предмету — для ключа кэша PDF."""
+        result = await self.db.execute(
+            select(Rating.id, self._rating_version(Rating.id))
+            .join(Groups, Rating.group_id == Groups.id)
+            .where(
+                Groups.group_name == group_name,
                 Rating.subject_name == subject_name
             )
-        ).first()
-        if not rating or not rating.rating_json:
+            .order_by(Rating.id)
+            .limit(1)
+        )
+        return result.first()
+
+    async def get_group_ratings_version(self, group_name: str) -> Optional[str]:
+        """
+        Версия всех данных отчёта среднего балла группы: md5 от (id, версия оценок) её ведомостей
+        рейтинга и числа студентов. None — если группы нет.
+        """
+        ratings = (
+            select(func.string_agg(
+                func.concat(Rating.id, ":", self._rating_version(Rating.id)), aggregate_order_by(literal(","), Rating.id)
+            ))
+            .where(Rating.group_id == Groups.id)
+            .scalar_subquery()
+        )
+        students = (
+            select(func.count(StudentInfo.id))
+            .where(StudentInfo.group_id == Groups.id)
+            .scalar_subquery()
+        )
+        return await self.db.scalar(
+            select(func.md5(func.concat(ratings, "|", students)))
+            .where(Groups.group_name == group_name)
+        )
+
+    async def get_group_rating_json(self, group_name: str, subject_name: str) -> Optional[str]:
+        """
+        ratings ведомости группы по предмету (формат RatingService._build_rating_json), собранные в Postgres
+        и возвращённые текстом JSON без разбора в Python. None — если ведомости нет.
+        """
+        rating_id = (
+            select(Rating.id)
+            .join(Groups, Rating.group_id == Groups.id)
+            .where(Groups.group_name == group_name, Rating.subject_name == subject_name)
+            .order_by(Rating.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        marks = (
+            select(
+                RatingMark.student_id,
+                func.json_build_object(
+                    "student_id", RatingMark.student_id,
+                    "rating", func.json_object_agg(
+                        RatingMark.control_point,
+                        aggregate_order_by(RatingMark.value, RatingMark.control_point)
+                    )
+                ).label("entry")
+            )
+            .where(RatingMark.rating_id == rating_id)
+            .group_by(RatingMark.student_id)
+        )
+        # итоговая оценка — только у студентов без оценок КТ
+        grades = (
+            select(
+                RatingGrade.student_id,
+                func.json_build_object("student_id", RatingGrade.student_id, "grade", RatingGrade.grade).label("entry")
+            )
+            .where(
+                RatingGrade.rating_id == rating_id,
+                ~select(RatingMark.student_id).where(
+                    RatingMark.rating_id == RatingGrade.rating_id,
+                    RatingMark.student_id == RatingGrade.student_id
+                ).exists()
+            )
+        )
+        entries = union_all(marks, grades).subquery()
+
+        return await self.db.scalar(
+            select(func.coalesce(
+                select(func.json_agg(aggregate_order_by(entries.c.entry, entries.c.student_id.collate("C"))))
+                .scalar_subquery(),
+                literal("[]").cast(JSON)
+            ).cast(Text))
+            .where(rating_id.isnot(None))
+        )
+
+    async def get_rating_marks(self, rating_id: int) -> List[Tuple[str, str, int]]:
+        """Все оценки КТ ведомости: (student_id, control_point, value)."""
+        result = await self.db.execute(
+            select(RatingMark.student_id, RatingMark.control_point, RatingMark.value)
+            .where(RatingMark.rating_id == rating_id)
+            .order_by(RatingMark.student_id, RatingMark.control_point)
+        )
+        return result.all()
+
+    async def get_rating_grades(self, rating_id: int) -> List[Tuple[str, str]]:
+        """Все итоговые оценки ведомости: (student_id, grade)."""
+        result = await self.db.execute(
+            select(RatingGrade.student_id, RatingGrade.grade)
+            .where(RatingGrade.rating_id == rating_id)
+            .order_by(RatingGrade.student_id)
+        )
+        return result.all()
+
+    async def has_rating_marks(self, rating_id: int) -> bool:
+        """Есть ли в ведомости оценки КТ (иначе — только итоговые оценки)."""
+        return bool(await self.db.scalar(
+            select(select(RatingMark.rating_id).where(RatingMark.rating_id == rating_id).exists())
+        ))
+
+    async def stream_rating_marks(self, rating_id: int):
+        """Оценки КТ ведомости (student_id, control_point, value), упорядоченные по студенту, через серверный курсор."""
+        return await self.db.stream(
+            select(RatingMark.student_id, RatingMark.control_point, RatingMark.value)
+            .where(RatingMark.rating_id == rating_id)
+            .order_by(RatingMark.student_id, RatingMark.control_point)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
+    async def stream_rating_grades(self, rating_id: int):
+        """Итоговые оценки ведомости (student_id, grade) через серверный курсор."""
+        return await self.db.stream(
+            select(RatingGrade.student_id, RatingGrade.grade)
+            .where(RatingGrade.rating_id == rating_id)
+            .order_by(RatingGrade.student_id)
+            .execution_options(yield_per=STREAM_BATCH_SIZE)
+        )
+
+    async def get_by_subject_name(self, subject_name: str) -> Optional[Rating]:
+        result = await self.db.execute(select(Rating).where(Rating.subject_name == subject_name))
+        return result.scalars().first()
+
+    async def _get_student_rating_id(self, zach_number: str, subject_name: str) -> Optional[int]:
+        """id ведомости рейтинга группы студента по предмету."""
+        return await self.db.scalar(
+            select(Rating.id)
+            .join(StudentInfo, StudentInfo.group_id == Rating.group_id)
+            .where(
+                StudentInfo.zach_number == zach_number,
+                Rating.subject_name == subject_name
+            )
+            .order_by(Rating.id)
+            .limit(1)
+        )
+
+    async def get_student_rating_by_subject(
+        self, zach_number: str, subject_name: str
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        Тип предмета и оценки студента в ведомости его группы одним запросом:
+        (subject_type, {"kt1": ..., ...}) или (subject_type, {"grade": ...}).
+        """
+        rows = (await self.db.execute(
+            select(Rating.id, Rating.subject_type, RatingMark.control_point, RatingMark.value, RatingGrade.grade)
+            .join(StudentInfo, and_(
+                StudentInfo.group_id == Rating.group_id,
+                StudentInfo.zach_number == zach_number
+            ))
+            .outerjoin(RatingMark, and_(
+                RatingMark.rating_id == Rating.id,
+                RatingMark.student_id == zach_number
+            ))
+            .outerjoin(RatingGrade, and_(
+                RatingGrade.rating_id == Rating.id,
+                RatingGrade.student_id == zach_number
+            ))
+            .where(Rating.subject_name == subject_name)
+            .order_by(Rating.id, RatingMark.control_point)
+        )).all()
+        if not rows:
             return None
 
-        for student_rating in rating.rating_json:
-            if student_rating.get("student_id") == zach_number:
-                return student_rating.get("rating", {}) or {"grade": student_rating.get("grade")}
+        # Как и раньше, берём первую ведомость группы по предмету
+        rating_id, subject_type = rows[0].id, rows[0].subject_type
+        marks = {
+            row.control_point: row.value
+            for row in rows
+            if row.id == rating_id and row.control_point is not None
+        }
+        if marks:
+            return subject_type, marks
+        if rows[0].grade is not None:
+            return subject_type, {"grade": rows[0].grade}
 
         return None
 
-    def update_student_rating(
+    def _student_rating_select(self, zach_number: str, subject_name: str, *values):
+        """SELECT id ведомости группы студента вместе с записываемыми значениями — для INSERT ... SELECT."""
+        return (
+            select(Rating.id, literal(zach_number, String), *values)
+            .join(StudentInfo, StudentInfo.group_id == Rating.group_id)
+            .where(
+                StudentInfo.zach_number == zach_number,
+                Rating.subject_name == subject_name
+            )
+            .order_by(Rating.id)
+            .limit(1)
+        )
+
+    async def update_student_rating(
         self, zach_number: str, subject_name: str, control_point: Optional[str], mark: Any
     ) -> bool:
-        """Обновить оценку студента и сделать изменения видимыми сразу в любой сессии"""
+        """Обновить оценку студента: одна строка rating_mark (или rating_grade без control_point)"""
+        if not control_point:
+            return await self.update_student_grade(zach_number, subject_name, mark)
+
         try:
-            student = self.db.query(StudentInfo).filter(StudentInfo.zach_number == zach_number).first()
-            if not student:
-                return False
-
-            rating = self.db.query(Rating).filter(
-                and_(Rating.group_id == student.group_id, Rating.subject_name == subject_name)
-            ).first()
-            if not rating:
-                return False
-
-            rating_data = rating.rating_json or []
-
-            student_found = False
-            for student_rating in rating_data:
-                if student_rating["student_id"] == zach_number:
-                    if control_point:
-                        student_rating.setdefault("rating", {})[control_point] = mark
-                    else:
-                        student_rating["grade"] = mark
-                    student_found = True
-                    break
-
-            if not student_found:
-                new_student = {"student_id": zach_number}
-                if control_point:
-                    new_student["rating"] = {control_point: mark}
-                else:
-                    new_student["grade"] = mark
-                rating_data.append(new_student)
-
-            # Обновляем JSON
-            rating.rating_json = list(rating_data)
-            flag_modified(rating, "rating_json")
-
-            self.db.commit()
-            self.db.expire_all()    # 🔹 сброс кеша всех объектов в сессии
-            self.db.refresh(rating) # 🔹 объект сразу обновлён для текущей сессии
-
-            return True
+            # Одна команда: ведомость ищется в самом INSERT ... SELECT, наружу — только изменённая ячейка
+            stmt = pg_insert(RatingMark).from_select(
+                ["rating_id", "student_id", "control_point", "value"],
+                self._student_rating_select(
+                    zach_number, subject_name, literal(control_point, String), literal(mark, Integer)
+                )
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[RatingMark.rating_id, RatingMark.student_id, RatingMark.control_point],
+                set_={"value": stmt.excluded.value, "updated_at": func.now()},
+            ).returning(RatingMark.rating_id, RatingMark.control_point, RatingMark.value)
+
+            cell = (await self.db.execute(stmt)).first()
+            await self.db.commit()
+
+            return cell is not None
 
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             print(f"Ошибка обновления: {e}")
             import traceback
             print(traceback.format_exc())
             return False
 
-    def update_student_grade(self, zach_number: str, subject_name: str, grade: str) -> bool:
-        """Обновить итоговую оценку и сделать её видимой сразу"""
-        rating = self.db.query(Rating).filter(
-            Rating.subject_name == subject_name
-        ).first()
-        if not rating:
-            return False
-
-        updated = False
-        for student_data in rating.rating_json or []:
-            if student_data.get("student_id") == zach_number:
-                student_data["grade"] = grade
-                updated = True
-                break
-
-        if updated:
-            rating.rating_json = rating.rating_json
-            flag_modified(rating, "rating_json")
-            self.db.commit()
-            self.db.expire_all()
-            self.db.refresh(rating)
-            return True
+    async def update_student_grade(self, zach_number: str, subject_name: str, grade: Any) -> bool:
+        """Обновить итоговую оценку студента в ведомости его группы"""
+        stmt = pg_insert(RatingGrade).from_select(
+            ["rating_id", "student_id", "grade"],
+            self._student_rating_select(zach_number, subject_name, literal(str(grade), String))
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RatingGrade.rating_id, RatingGrade.student_id],
+            set_={"grade": stmt.excluded.grade, "updated_at": func.now()},
+        ).returning(RatingGrade.rating_id, RatingGrade.grade)
 
-        return False
+        cell = (await self.db.execute(stmt)).first()
+        await self.db.commit()
+        return cell is not None
 
-    def create_rating(self, rating_data: Dict[str, Any]) -> Rating:
+    async def create_rating(self, rating_data: Dict[str, Any]) -> Rating:
         """Создать новую запись рейтинга"""
         rating = Rating(**rating_data)
         self.db.add(rating)
-        self.db.commit()
-        self.db.refresh(rating)
+        await self.db.commit()
+        await self.db.refresh(rating)
         return rating
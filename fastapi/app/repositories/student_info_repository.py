@@ -1,44 +1,50 @@
 from typing import Optional, List
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.tables import StudentInfo, User
 from .base_repository import BaseRepository
 
 
 class StudentInfoRepository(BaseRepository[StudentInfo]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(StudentInfo, db)
 
-    def get_by_id(self, student_id: int) -> Optional[StudentInfo]:
-        return self.db.query(StudentInfo).filter(StudentInfo.id == student_id).first()
+    async def get_by_id(self, student_id: int) -> Optional[StudentInfo]:
+        result = await self.db.execute(select(StudentInfo).where(StudentInfo.id == student_id))
+        return result.scalars().first()
 
-    def get_by_student_name(self, student_name: str) -> Optional[StudentInfo]:
-        return self.db.query(StudentInfo).filter(StudentInfo.student_name == student_name).first()
+    async def get_by_student_name(self, student_name: str) -> Optional[StudentInfo]:
+        result = await self.db.execute(select(StudentInfo).where(StudentInfo.student_name == student_name))
+        return result.scalars().first()
 
-    def get_by_zach_number(self, zach_number: str) -> Optional[StudentInfo]:
-        return self.db.query(StudentInfo).filter(StudentInfo.zach_number == zach_number).first()
+    async def get_by_zach_number(self, zach_number: str) -> Optional[StudentInfo]:
+        result = await self.db.execute(select(StudentInfo).where(StudentInfo.zach_number == zach_number))
+        return result.scalars().first()
 
-    def get_by_group_id(self, group_id: int) -> List[StudentInfo]:
-        return self.db.query(StudentInfo).filter(StudentInfo.group_id == group_id).all()
+    async def get_by_group_id(self, group_id: int) -> List[StudentInfo]:
+        result = await self.db.execute(select(StudentInfo).where(StudentInfo.group_id == group_id))
+        return list(result.scalars().all())
 
 
-    def get_by_group_name(self, group_name: str) -> List[StudentInfo]:
-        return (
-            self.db.query(StudentInfo)
+    async def get_by_group_name(self, group_name: str) -> List[StudentInfo]:
+        result = await self.db.execute(
+            select(StudentInfo)
             .join(StudentInfo.group)
-            .filter(StudentInfo.group.has(group_name=group_name))
-            .all()
+            .where(StudentInfo.group.has(group_name=group_name))
         )
+        return list(result.scalars().all())
     
-    def get_student_name_by_zach_number(self, zach_number: str):
+    async def get_student_name_by_zach_number(self, zach_number: str):
         """
         Возвращает имя и фамилию студента по его зачетке.
         """
         result = (
-            self.db.query(User)
-            .join(StudentInfo, User.student_info_id == StudentInfo.id)
-            .filter(StudentInfo.zach_number == zach_number)
-            .first()
-        )
+            await self.db.execute(
+                select(User)
+                .join(StudentInfo, User.student_info_id == StudentInfo.id)
+                .where(StudentInfo.zach_number == zach_number)
+            )
+        ).scalars().first()
 
         if result:
             return {"first_name": result.first_name, "last_name": result.last_name}
@@ -1,24 +1,27 @@
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.tables import TeacherInfo, TeacherTimetable
 from .base_repository import BaseRepository
 
 
 class TeacherInfoRepository(BaseRepository[TeacherInfo]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(TeacherInfo, db)
 
-    def get_by_teacher_name(self, teacher_name: str) -> Optional[TeacherInfo]:
-        return self.db.query(TeacherInfo).filter(TeacherInfo.teacher_name == teacher_name).first()
+    async def get_by_teacher_name(self, teacher_name: str) -> Optional[TeacherInfo]:
+        result = await self.db.execute(select(TeacherInfo).where(TeacherInfo.teacher_name == teacher_name))
+        return result.scalars().first()
 
-    def get_timetable_by_teacher_name(self, teacher_name: str) -> Optional[TeacherTimetable]:
-        return (
-            self.db.query(TeacherTimetable)
+    async def get_timetable_by_teacher_name(self, teacher_name: str) -> Optional[TeacherTimetable]:
+        result = await self.db.execute(
+            select(TeacherTimetable)
             .join(TeacherInfo)
-            .filter(TeacherInfo.teacher_name == teacher_name)
-            .first()
+            .where(TeacherInfo.teacher_name == teacher_name)
         )
+        return result.scalars().first()
     
-    def get_by_id(self, teacher_id: int) -> Optional[TeacherInfo]:
+    async def get_by_id(self, teacher_id: int) -> Optional[TeacherInfo]:
         """Получить преподавателя по его ID"""
-        return self.db.query(TeacherInfo).filter(TeacherInfo.id == teacher_id).first()
\ No newline at end of file
+        result = await self.db.execute(select(TeacherInfo).where(TeacherInfo.id == teacher_id))
+        return result.scalars().first()
\ No newline at end of file
@@ -1,19 +1,22 @@
 from typing import Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.tables import TeacherInfo, TeacherTimetable
 from .base_repository import BaseRepository
 
 
 class TeacherTimetableRepository:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.base_repo = BaseRepository(TeacherTimetable, db)
 
-    def get_by_teacher_info_id(self, teacher_info_id: int) -> Optional[TeacherTimetable]:
+    async def get_by_teacher_info_id(self, teacher_info_id: int) -> Optional[TeacherTimetable]:
         """Получить расписание преподавателя через связь с TeacherInfo"""
-        return self.db.query(TeacherTimetable)\
-            .join(TeacherInfo, TeacherTimetable.id == TeacherInfo.timetable_id)\
-            .filter(TeacherInfo.id == teacher_info_id)\
-            .first()
+        result = await self.db.execute(
+            select(TeacherTimetable)
+            .join(TeacherInfo, TeacherTimetable.id == TeacherInfo.timetable_id)
+            .where(TeacherInfo.id == teacher_info_id)
+        )
+        return result.scalars().first()
 
-    
\ No newline at end of file
+    
@@ -1,5 +1,6 @@
 from typing import Any, Dict, Optional, List, Tuple
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from app.models.tables import StudentInfo, User
 from app.models.enums import Role
@@ -7,103 +8,117 @@ from .base_repository import BaseRepository
 
 
 class UserRepository(BaseRepository[User]):
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         super().__init__(User, db)
 
 
-    def get_by_username(self, username: str) -> Optional[User]:
-        return self.db.query(User).filter(User.username == username).first()
+    async def get_by_username(self, username: str) -> Optional[User]:
+        result = await self.db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
 
 
 
 
-    def get_by_username_with_relations(self, username: str) -> Optional[User]:
-        return (
-            self.db.query(User)
+    async def get_by_username_with_relations(self, username: str) -> Optional[User]:
+        result = await self.db.execute(
+            select(User)
             .options(
                 joinedload(User.student_info),
                 joinedload(User.teacher_info)
             )
-            .filter(User.username == username)
-            .first()
+            .where(User.username == username)
         )
+        return result.scalars().first()
     
 
 
 
 
-    def get_by_role(self, role: Role) -> List[User]:
-        return self.db.query(User).filter(User.role == role).all()
+    async def get_by_role(self, role: Role) -> List[User]:
+        result = await self.db.execute(select(User).where(User.role == role))
+        return list(result.scalars().all())
 
 
 
 
-    def exists_by_username(self, username: str) -> bool:
-        return self.exists(username=username)
+    async def exists_by_username(self, username: str) -> bool:
+        return await self.exists(username=username)
 
 
 
 
-    def get_by_max_id(self, max_id: str) -> Optional[User]:
+    async def get_by_max_id(self, max_id: str) -> Optional[User]:
         """Получить пользователя по его max_id (из MAX Init Data)."""
-        return self.db.query(User).filter(User.max_id == max_id).first()
+        result = await self.db.execute(select(User).where(User.max_id == max_id))
+        return result.scalars().first()
     
 
 
 
-    def get_by_max_id_with_relations(self, max_id: str) -> Optional[User]:
+    async def get_by_max_id_with_relations(self, max_id: str) -> Optional[User]:
         """Получить пользователя по его max_id с загрузкой всех связанных данных."""
-        return (
-            self.db.query(User)
+        result = await self.db.execute(
+            select(User)
             .options(
                 # Загружаем StudentInfo, а затем вложенно его Group
                 joinedload(User.student_info).joinedload(StudentInfo.group), 
                 joinedload(User.teacher_info)
                 # Добавьте другие нужные отношения здесь
             )
-            .filter(User.max_id == max_id)
-            .first()
+            .where(User.max_id == max_id)
         )
+        return result.scalars().first()
     
-    def get_by_name_password(self, first_name: str, last_name: str, password: str):
+    async def get_by_name_password(self, first_name: str, last_name: str, password: str):
         """
         Поиск пользователя по имени, фамилии и паролю.
         """
-        return self.db.query(User).filter(
+        result = await self.db.execute(select(User).where(
             User.first_name == first_name,
             User.last_name == last_name, 
             User.passwd == password
-        ).first()
+        ))
+        return result.scalars().first()
 
 
 
-    def get_by_max_id_teacher_info_id(self, max_id: str):
+    async def get_by_max_id_teacher_info_id(self, max_id: str):
         """Получить teacher_info_id по его max_id."""
-        return (
-            self.db.query(User.teacher_info_id)
-            .filter(User.max_id == max_id)
-            .first()
+        result = await self.db.execute(
+            select(User.teacher_info_id)
+            .where(User.max_id == max_id)
         )
+        return result.first()
     
-    def get_student_zach_number_by_max_id(self, max_id: str) -> Optional[str]:
+    async def get_student_zach_number_by_max_id(self, max_id: str) -> Optional[str]:
         """
         Получить номер зачетки студента по его max_id.
         """
-        result = (
-            self.db.query(StudentInfo.zach_number)
+        result = await self.db.scalar(
+            select(StudentInfo.zach_number)
             .select_from(User)  # явно указываем левую таблицу
             .join(StudentInfo, User.student_info_id == StudentInfo.id)
-            .filter(User.max_id == max_id)
-            .scalar()
+            .where(User.max_id == max_id)
         )
         return result
 
 
 
-    def get_by_max_id_student_info_id(self, max_id: str):
+    async def get_by_max_id_student_info_id(self, max_id: str):
         """Получить student_info_id по его max_id."""
-        return (
-            self.db.query(User.student_info_id)
-            .filter(User.max_id == max_id)
-            .first()
+        result = await self.db.execute(
+            select(User.student_info_id)
+            .where(User.max_id == max_id)
         )
+        return result.first()
+
+
+    async def get_student_zach_group_by_max_id(self, max_id: str):
+        """Получить (zach_number, group_id) студента по его max_id одним запросом."""
+        result = await self.db.execute(
+            select(StudentInfo.zach_number, StudentInfo.group_id)
+            .select_from(User)
+            .join(StudentInfo, User.student_info_id == StudentInfo.id)
+            .where(User.max_id == max_id)
+        )
+        return result.first()
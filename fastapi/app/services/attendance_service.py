@@ -1,5 +1,6 @@
-from typing import List, Dict, Any
-from sqlalchemy.orm import Session
+from datetime import date
+from typing import List, Dict, Any, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 import json
 from app.models.pydantic_models.pydantic_models import TimetableDto, AttendanceReportDTO, StudentAttendanceDTO
 from app.models.enums import AttendanceStatus
@@ -8,10 +9,11 @@ from app.repositories.teacher_info_repository import TeacherInfoRepository
 from app.repositories.student_info_repository import StudentInfoRepository
 from app.repositories.user_repository import UserRepository
 from app.repositories.groups_repository import GroupsRepository
+from app.utils.attendance_matrix import AttendanceMatrix
 
 
 class AttendanceService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.attendance_repository = AttendanceRepository(db)
         self.teacher_info_repository = TeacherInfoRepository(db)
@@ -20,26 +22,84 @@ class AttendanceService:
         self.group_repository = GroupsRepository(db)
     
 
-    def get_teacher_attendance(self, max_id: str, group_name: str, subject_type: str, subject_name: str):
+    async def get_teacher_attendance(
+        self,
+        max_id: str,
+        group_name: str,
+        subject_type: str,
+        subject_name: str,
+        compact: bool = False
+    ):
         """
         Возвращает ведомости посещаемости студента по группе и номеру зачетки.
+        compact=True — отметки в компактной форме (attendance_bitset, см. AttendanceMatrix.to_compact)
+        вместо attendance_json.
         """
-        teacher_info_id = self.user_repository.get_by_max_id_teacher_info_id(max_id)[0] # почему-то возвращает кортеж поэтому [0]
-        group_id = self.group_repository.get_by_group_name(group_name).id
-        result = self.attendance_repository.get_ved_for_teacher(group_id, teacher_info_id, subject_name, subject_type)
+        teacher_info_id = (await self.user_repository.get_by_max_id_teacher_info_id(max_id))[0] # почему-то возвращает кортеж поэтому [0]
+        group_id = (await self.group_repository.get_by_group_name(group_name)).id
+        ved = await self.attendance_repository.get_ved_for_teacher(group_id, teacher_info_id, subject_name, subject_type)
+        if ved is None:
+            return None
+
+        marks = await self.attendance_repository.get_ved_marks(ved.id)
+        result = {
+            "id": ved.id,
+            "subject_name": ved.subject_name,
+            "subject_type": ved.subject_type,
+            "semestr": ved.semestr,
+            "teacher_id": ved.teacher_id,
+            "group_id": ved.group_id,
+            "created_at": ved.created_at,
+        }
+        if compact:
+            result["attendance_bitset"] = AttendanceMatrix.from_marks(marks).to_compact()
+        else:
+            result["attendance_json"] = self._build_attendance_json(marks)
         return result
+
+    async def get_teacher_attendance_raw(
+        self,
+        max_id: str,
+        group_name: str,
+        subject_type: str,
+        subject_name: str
+    ) -> Optional[str]:
+        """То же, что get_teacher_attendance, но готовым JSON-текстом из Postgres (без разбора в Python)."""
+        return await self.attendance_repository.get_ved_for_teacher_json(max_id, group_name, subject_name, subject_type)
+
+    async def get_teacher_attendance_matrix(
+        self,
+        attendance_id: int,
+        until: Optional[date] = None
+    ) -> AttendanceMatrix:
+        """Ведомость посещаемости в виде матрицы (ось дат + битсеты), отметки по until включительно."""
+        marks = await self.attendance_repository.get_ved_marks(attendance_id, until)
+        return AttendanceMatrix.from_marks(marks)
+
+    async def get_ved_version(self, max_id: str, group_name: str, subject_type: str, subject_name: str):
+        """(id, версия отметок) ведомости преподавателя или None — без чтения самих отметок."""
+        return await self.attendance_repository.get_ved_version(max_id, group_name, subject_name, subject_type)
+
+    @staticmethod
+    def _build_attendance_json(marks) -> List[Dict[str, Any]]:
+        """
+        Собирает строки attendance_mark в прежний формат ведомости:
+        [{"student_id": ..., "attendance": {"YYYY-MM-DD": bool}}, ...]
+        """
+        students: Dict[str, Dict[str, bool]] = {}
+        for student_id, lesson_date, present in marks:
+            students.setdefault(student_id, {})[lesson_date.isoformat()] = present
+        return [{"student_id": student_id, "attendance": attendance} for student_id, attendance in students.items()]
     
 
 
 
-    def get_student_attendance(self, max_id: str, subject_name: str, subject_type: str) -> Dict:
+    async def get_student_attendance(self, max_id: str, subject_name: str, subject_type: str) -> Dict:
         """
         Возвращает ведомости посещаемости студента по группе и номеру зачетки.
         """
-        student_info_id = self.user_repository.get_by_max_id_student_info_id(max_id=max_id)[0] #почему-то кортеж возвращает поэтому [0]
-        zach = self.student_info_repository.get_by_id(student_id=student_info_id).zach_number 
-        group_id = self.student_info_repository.get_by_id(student_id=student_info_id).group_id
-        result = self.attendance_repository.get_student_attendance(group_id=group_id, zach_number=zach, subject_name=subject_name, subject_type=subject_type)
+        zach, group_id = await self.user_repository.get_student_zach_group_by_max_id(max_id=max_id)
+        result = await self.attendance_repository.get_student_attendance(group_id=group_id, zach_number=zach, subject_name=subject_name, subject_type=subject_type)
         if "error" in result:
             # Можно бросить исключение или вернуть результат как есть
             return {"status": "error", "detail": result["error"]}
@@ -48,11 +108,11 @@ class AttendanceService:
 
 
 
-    def mark_to_one(self, max_id: str, group_name: str, subject_name: str, subject_type: str, date: str, zach: str, status: bool):
-        teacher_info_id = self.user_repository.get_by_max_id_teacher_info_id(max_id)[0] # почему-то возвращает кортеж поэтому [0]
-        group_id = self.group_repository.get_by_group_name(group_name).id
+    async def mark_to_one(self, max_id: str, group_name: str, subject_name: str, subject_type: str, date: str, zach: str, status: bool):
+        teacher_info_id = (await self.user_repository.get_by_max_id_teacher_info_id(max_id))[0] # почему-то возвращает кортеж поэтому [0]
+        group_id = (await self.group_repository.get_by_group_name(group_name)).id
 
-        result = self.attendance_repository.mark_attendance_to_one(
+        result = await self.attendance_repository.mark_attendance_to_one(
             teacher_info_id=teacher_info_id,
             subject_name=subject_name,
             subject_type=subject_type,
@@ -65,23 +125,32 @@ class AttendanceService:
         if "error" in result:
             return {"status": "error", "detail": result["error"]}
 
-        return {"status": "success", "message": result["message"]}
+        return {"status": "success", "message": result["message"], "cell": result["cell"]}
     
 
 
 
-    def mark_to_many(self, teacher_first_name: str, teacher_last_name: str, group_name: str, subject_name: str, subject_type: str, date: str, zach_list: List[str]):
-        result = self.attendance_repository.mark_attendance_to_many(
-            teacher_first_name=teacher_first_name,
-            teacher_last_name=teacher_last_name,
+    async def mark_many(self, max_id: str, group_name: str, subject_name: str, subject_type: str, date: str, zach_list: List[str], status: bool = True):
+        """
+        Выставляет один статус сразу списку студентов.
+        Преподаватель и группа ищутся один раз, все отметки пишутся одной командой.
+        """
+        teacher_info_id = (await self.user_repository.get_by_max_id_teacher_info_id(max_id))[0] # почему-то возвращает кортеж поэтому [0]
+        group = await self.group_repository.get_by_group_name(group_name)
+        if group is None:
+            return {"status": "error", "detail": f"Группа '{group_name}' не найдена"}
+
+        result = await self.attendance_repository.mark_many(
+            teacher_info_id=teacher_info_id,
+            group_id=group.id,
             subject_name=subject_name,
+            subject_type=subject_type,
             date_str=date,
             zach_list=zach_list,
-            group_name=group_name,
-            subject_type=subject_type
+            status=status
         )
 
         if "error" in result:
             return {"status": "error", "detail": result["error"]}
 
-        return {"status": "success", "message": result["message"]}
\ No newline at end of file
+        return {"status": "success", "message": result["message"], "marked": result["marked"]}
@@ -1,5 +1,5 @@
 from typing import Any, Dict, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from app.models.pydantic_models.pydantic_models import LoginRequest, LoginResponse
 from app.models.enums import Role
@@ -13,19 +13,19 @@ from app.repositories.teacher_info_repository import TeacherInfoRepository
 
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.user_repository = UserRepository(db)
         self.student_info_repository = StudentInfoRepository(db)
         self.group_repository = GroupsRepository(db)
         self.teacher_info_repository = TeacherInfoRepository(db)
 
-    def login_by_max_id_token_only(self, max_id: str) -> Dict[str, str]:
+    async def login_by_max_id_token_only(self, max_id: str) -> Dict[str, str]:
         """
         Находит пользователя по max_id и возвращает только JWT токен.
         """
         
         # 1. Поиск пользователя по max_id
-        user = self.user_repository.get_by_max_id(max_id) 
+        user = await self.user_repository.get_by_max_id(max_id) 
         if not user:
             raise InvalidCredentialsException(f"Пользователь с max_id '{max_id}' не найден")
         
@@ -43,11 +43,11 @@ class AuthService:
         
         return response
 
-    def get_user_me_info(self, max_id: str) -> Dict[str, Any]:
+    async def get_user_me_info(self, max_id: str) -> Dict[str, Any]:
         """Собирает всю информацию о пользователе по его max_id."""
         
         # 1. Загрузка пользователя с отношениями
-        user = self.user_repository.get_by_max_id_with_relations(max_id)
+        user = await self.user_repository.get_by_max_id_with_relations(max_id)
 
         # if not user:
         #     # Этот случай может произойти, если пользователь удален после выдачи токена
@@ -64,7 +64,8 @@ class AuthService:
 
         # 3. Сбор специфичной информации по ролям
         if user.role == "student":
-            student_info = self.student_info_repository.get_by_id(user.student_info_id)
+            # student_info и group уже подгружены joinedload-ом в репозитории
+            student_info = user.student_info
             user_info["zach_number"] = student_info.zach_number
             group_name = student_info.group.group_name if student_info.group else None
             user_info["group_name"] = group_name
@@ -72,19 +73,19 @@ class AuthService:
 
 
         elif user.role == "teacher":
-            user_info["groups_sbj"]  = self.teacher_info_repository.get_by_id(user.teacher_info_id).groups_subjects
+            user_info["groups_sbj"]  = user.teacher_info.groups_subjects
             
             
         return user_info
     
-    def login_by_name_password(self, first_name: str, last_name: str, password: str) -> Dict[str, Any]:
+    async def login_by_name_password(self, first_name: str, last_name: str, password: str) -> Dict[str, Any]:
         """
         Аутентификация пользователя по имени, фамилии и паролю.
         Возвращает информацию о пользователе включая роль и MAX_id.
         """
         
         # 1. Поиск пользователя по имени, фамилии и паролю
-        user = self.user_repository.get_by_name_password(
+        user = await self.user_repository.get_by_name_password(
             first_name=first_name,
             last_name=last_name, 
             password=password
@@ -1,22 +1,243 @@
 # app/services/rating_service.py
 import asyncio
 import json
-from typing import Dict, Any
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional
 from uuid import uuid4
 from redis.asyncio import Redis
 from fastapi import status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.services.attendance_service import AttendanceService
 from app.repositories.user_repository import UserRepository
+from app.config.settings import settings
+from app.services.session_hub import session_events_channel
+from app.utils.json_codec import json_dumps
+from app.utils.qr_tokens import current_token, new_secret, verify_token
+
+
+# Режимы токенов (settings.qr_token_mode, запоминается в хэше сессии):
+# random — случайный токен в хэше, меняется фоновой ротацией; hmac — токен вычисляется
+# из секрета сессии и окна времени (app/utils/qr_tokens.py), ротация и pubsub не нужны.
+TOKEN_MODE_RANDOM = "random"
+TOKEN_MODE_HMAC = "hmac"
+
+# Индекс активных сессий: ZSET session_id -> время следующей ротации токена (unix time).
+# Ротация обходит только сессии, у которых подошёл срок, без KEYS по всей базе Redis.
+ACTIVE_SESSIONS_KEY = "qr:active_sessions"
+ROTATION_BATCH_SIZE = 500
+MIN_ROTATION_SLEEP = 0.05
+
+# Сроки сессий: ZSET session_id -> время автозакрытия (unix time). Просроченные сессии закрывает
+# и записывает в Postgres держатель аренды ротатора; запись убирается отсюда только после записи.
+SESSION_DEADLINES_KEY = "qr:session_deadlines"
+FLUSH_RETRY_DELAY = 60
+# Запас TTL ключей открытой сессии сверх срока и хранения: если автозакрытие не сработало,
+# Redis всё равно освободит память
+SESSION_TTL_GRACE = 24 * 60 * 60
+
+# Аренда ротатора: токены вращает ровно один процесс на кластер — держатель ключа.
+# Аренда продлевается каждым тиком; если держатель пропал, её подхватывает другой процесс.
+ROTATOR_LEASE_KEY = "qr:rotator_lease"
+
+# Взять или продлить аренду: KEYS[1] — ключ аренды, ARGV[1] — id процесса, ARGV[2] — срок в мс.
+ACQUIRE_LEASE_LUA = """
+local holder = redis.call('GET', KEYS[1])
+if holder == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not holder then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+RELEASE_LEASE_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Ротация пачки сессий одним скриптом: KEYS[1] — индекс, KEYS[2] — ключ аренды, KEYS[3..] — хэши сессий,
+# ARGV[1] — текущее время, ARGV[2] — время следующей ротации, ARGV[3] — id держателя аренды,
+# ARGV[4..] — новые токены в том же порядке, что и сессии.
+# Если аренда уже у другого процесса — ничего не делает. Сессию, которую уже перенесли на будущее,
+# не трогает, так что повторный тик не сменит токен дважды. Закрытые и удалённые сессии
+# убираются из индекса. Возвращает число обновлённых токенов.
+ROTATE_TOKENS_LUA = """
+if redis.call('GET', KEYS[2]) ~= ARGV[3] then
+    return 0
+end
+local rotated = 0
+for i = 3, #KEYS do
+    local key = KEYS[i]
+    local session_id = string.sub(key, 9)
+    local due = redis.call('ZSCORE', KEYS[1], session_id)
+    if due and tonumber(due) <= tonumber(ARGV[1]) then
+        local active = redis.call('HGET', key, 'active_status')
+        if active and tonumber(active) ~= 0 then
+            redis.call('HSET', key, 'current_token', ARGV[i + 1])
+            redis.call('PUBLISH', 'token_updates:' .. key, ARGV[i + 1])
+            redis.call('ZADD', KEYS[1], ARGV[2], session_id)
+            rotated = rotated + 1
+        else
+            redis.call('ZREM', KEYS[1], session_id)
+        end
+    end
+end
+return rotated
+"""
+
+# Закрытие сессии: KEYS[1] — хэш сессии, KEYS[2] — индекс ротации,
+# ARGV[1] — session_id, ARGV[2] — канал событий сессии, ARGV[3] — время закрытия.
+# Возвращает 1 — сессия закрыта этим вызовом, 0 — уже была закрыта, -1 — сессии нет.
+# Ручное закрытие и автозакрытие по сроку не могут закрыть одну сессию дважды.
+CLOSE_SESSION_LUA = """
+local active = redis.call('HGET', KEYS[1], 'active_status')
+if not active then
+    return -1
+end
+if tonumber(active) == 0 then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'active_status', 0, 'closed_at', ARGV[3])
+redis.call('ZREM', KEYS[2], ARGV[1])
+redis.call('PUBLISH', ARGV[2], '{"type":"closed"}')
+return 1
+"""
+
+# Отметка по QR одним скриптом: KEYS[1] — хэш сессии, KEYS[2] — SET отметившихся, KEYS[3] — ZSET времени отметок,
+# KEYS[4] — поток отметок для ленты преподавателя.
+# ARGV[1] — токен из QR, ARGV[2] — номер зачётки, ARGV[3] — время отметки, ARGV[4] — канал событий сессии,
+# ARGV[5..] — допустимые токены для сессий с токенами по HMAC (посчитаны в процессе).
+# Возвращает 1 — студент добавлен, 0 — уже был отмечен, -1 — нет сессии, -2 — сессия закрыта, -3 — неверный токен.
+SCAN_QR_LUA = """
+local active = redis.call('HGET', KEYS[1], 'active_status')
+if not active then
+    return -1
+end
+if tonumber(active) == 0 then
+    return -2
+end
+local valid = false
+if redis.call('HGET', KEYS[1], 'token_mode') == 'hmac' then
+    for i = 5, #ARGV do
+        if ARGV[i] == ARGV[1] then
+            valid = true
+        end
+    end
+else
+    valid = redis.call('HGET', KEYS[1], 'current_token') == ARGV[1]
+end
+if not valid then
+    return -3
+end
+local added = redis.call('SADD', KEYS[2], ARGV[2])
+if added == 1 then
+    redis.call('ZADD', KEYS[3], 'NX', ARGV[3], ARGV[2])
+    local id = redis.call('XADD', KEYS[4], 'MAXLEN', '~', 10000, '*', 'student_id', ARGV[2], 'scanned_at', ARGV[3])
+    redis.call('PUBLISH', ARGV[4], '{"type":"scan","id":"' .. id .. '"}')
+    -- ключи отметок живут столько же, сколько хэш сессии
+    local ttl = redis.call('PTTL', KEYS[1])
+    if ttl > 0 then
+        for i = 2, 4 do
+            redis.call('PEXPIRE', KEYS[i], ttl)
+        end
+    end
+end
+return added
+"""
+
+# Лента отметок сессии хранится потоком Redis (до ~10 000 записей): id записи — курсор для возобновления
+FEED_READ_COUNT = 500
+
+SCAN_ERRORS = {
+    -1: ("Сессия не найдена", status.HTTP_404_NOT_FOUND),
+    -2: ("Сессия закрыта", status.HTTP_400_BAD_REQUEST),
+    -3: ("Неверный токен", status.HTTP_403_FORBIDDEN),
+}
+
+# Режим токенов, секрет и интервал сессии не меняются после создания — кэшируются в процессе,
+# чтобы отметка по QR обходилась одним вызовом скрипта.
+_token_settings_cache: Dict[str, tuple] = {}
+TOKEN_SETTINGS_CACHE_SIZE = 10_000
+
+
+def students_key(session_id: str) -> str:
+    """SET номеров зачёток, отметившихся в сессии."""
+    return f"session:{session_id}:students"
+
+
+def scans_key(session_id: str) -> str:
+    """ZSET номер зачётки -> время отметки (unix time)."""
+    return f"session:{session_id}:scans"
+
+
+def feed_key(session_id: str) -> str:
+    """Поток отметок сессии (student_id, scanned_at) для ленты преподавателя."""
+    return f"session:{session_id}:feed"
+
+
+def session_keys(session_id: str) -> List[str]:
+    """Все ключи сессии: хэш, отметившиеся, время отметок, лента."""
+    return [f"session:{session_id}", students_key(session_id), scans_key(session_id), feed_key(session_id)]
+
+
+def session_deadline(date: str, lesson_start_time: str, now: float) -> float:
+    """
+    Время автозакрытия сессии: начало пары (date + lesson_start_time в часовом поясе расписания)
+    плюс qr_session_duration — в том числе для сессии, открытой до начала пары. От момента
+    создания сессия отсчитывается, только если времени пары нет или его не разобрать.
+    """
+    duration = settings.qr_session_duration
+    try:
+        start = datetime.strptime(f"{date} {lesson_start_time.replace('.', ':')}", "%Y-%m-%d %H:%M")
+    except (ValueError, AttributeError, TypeError):
+        return now + duration
+
+    tz = timezone(timedelta(hours=settings.lesson_utc_offset))
+    return start.replace(tzinfo=tz).timestamp() + duration
+
+
+async def read_scan_feed(redis: Redis, session_id: str, after: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Отметки сессии после курсора after (id записи потока, не включая её); без курсора — с начала.
+    Читается целиком пачками по FEED_READ_COUNT.
+    """
+    events = []
+    start = f"({after}" if after else "-"
+    while True:
+        entries = await redis.xrange(feed_key(session_id), min=start, max="+", count=FEED_READ_COUNT)
+        events += [
+            {
+                "type": "scan",
+                "id": entry_id,
+                "student_id": fields.get("student_id"),
+                "scanned_at": float(fields.get("scanned_at", 0)),
+            }
+            for entry_id, fields in entries
+        ]
+        if len(entries) < FEED_READ_COUNT:
+            return events
+        start = f"({entries[-1][0]}"
 
 
 class QRService:
-    def __init__(self, redis: Redis, db: Session):
+    def __init__(self, redis: Redis, db: Optional[AsyncSession]):
         self.redis = redis
         self._token_update_task: asyncio.Task | None = None
         self.db = db
         self.user_repository = UserRepository(db)
         self.attendance_service = AttendanceService(db)
+        self.worker_id = uuid4().hex
+        self._rotate_tokens = redis.register_script(ROTATE_TOKENS_LUA)
+        self._acquire_lease = redis.register_script(ACQUIRE_LEASE_LUA)
+        self._release_lease = redis.register_script(RELEASE_LEASE_LUA)
+        self._scan_qr = redis.register_script(SCAN_QR_LUA)
+        self._close_session = redis.register_script(CLOSE_SESSION_LUA)
 
 
     async def generate_qr_session(
@@ -26,23 +247,50 @@ class QRService:
         subject_type: str,
         date: str,
         lesson_start_time: str,
+        teacher_max_id: Optional[str] = None,
     ) -> Dict[str, Any]:
-        """Генерация сессии для QR в Redis с первым токеном."""
+        """
+        Генерация сессии для QR в Redis с первым токеном.
+        Сессия закроется сама по окончании пары (session_deadline), отметки запишутся от имени teacher_max_id.
+        """
         session_id = str(uuid4())
         session_key = f"session:{session_id}"
 
-        first_token = uuid4().hex
-
-        await self.redis.hset(session_key, mapping={
+        token_mode = settings.qr_token_mode
+        interval = settings.qr_token_interval
+        now = time.time()
+        deadline = session_deadline(date, lesson_start_time, now)
+        session_data = {
             "subject_name": subject_name,
             "subject_type": subject_type,
             "group_name": group_name,
             "date": date,
             "lesson_start_time": lesson_start_time,
-            "students": json.dumps([]),
-            "current_token": first_token,
-            "active_status": 1
-        })
+            "active_status": 1,
+            "token_mode": token_mode,
+            "token_interval": interval,
+            "expires_at": deadline,
+        }
+        if teacher_max_id:
+            session_data["teacher_max_id"] = teacher_max_id
+        if token_mode == TOKEN_MODE_HMAC:
+            session_data["token_secret"] = new_secret()
+            first_token, expires_at = current_token(session_data["token_secret"], session_id, interval)
+        else:
+            first_token = uuid4().hex
+            expires_at = now + interval
+            session_data["current_token"] = first_token
+
+        # Хэш сессии, запись в индексе ротации и срок — одной транзакцией.
+        # Сессии с токенами по HMAC в индекс не попадают: их токен меняется сам по часам.
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(session_key, mapping=session_data)
+            # пара уже закончилась — сессию закроет ближайший проход ротатора, ключи не должны истечь раньше
+            pipe.expireat(session_key, int(max(deadline, now) + settings.qr_closed_session_retention + SESSION_TTL_GRACE))
+            if token_mode != TOKEN_MODE_HMAC:
+                pipe.zadd(ACTIVE_SESSIONS_KEY, {session_id: expires_at})
+            pipe.zadd(SESSION_DEADLINES_KEY, {session_id: deadline})
+            await pipe.execute()
 
         return {
             "message": "Сессия посещаемости успешно создана",
@@ -53,84 +301,138 @@ class QRService:
             "date": date,
             "lesson_start_time": lesson_start_time,
             "current_token": first_token,
+            "token_expires_at": expires_at,
+            "expires_at": deadline,
             "active_status": 1
         }
 
 
     async def close_qr_session(self, max_id: str, session_id: str) -> Dict[str, Any]:
-        """Закрытие сессии: выставление active_status = 0"""
-        session_key = f"session:{session_id}"
-
-        exists = await self.redis.exists(session_key)
-        if not exists:
+        """Закрытие сессии: выставление active_status = 0 и запись отметок в Postgres"""
+        closed = await self._close_session(
+            keys=[f"session:{session_id}", ACTIVE_SESSIONS_KEY],
+            args=[session_id, session_events_channel(session_id), time.time()],
+        )
+        if closed == -1:
             return {"error": "Сессия не найдена"}
-        
-        
-        active_status = await self.redis.hget(session_key, "active_status")
-        if active_status and int(active_status) == 0:
+        if closed == 0:
             return {"error": f"Сессия {session_id} уже закрыта"}
-        
 
-        await self.redis.hset(session_key, "active_status", 0)
+        try:
+            await self._flush_session(session_id, max_id)
+        except Exception as e:
+            # Сессия уже закрыта; запись повторит планировщик автозакрытия
+            print(f"!!! ОШИБКА записи посещаемости сессии {session_id}, будет повтор: {e}")
+            await self.redis.zadd(SESSION_DEADLINES_KEY, {session_id: time.time() + FLUSH_RETRY_DELAY})
 
-        #Добавляем посещаемость в psql
-        data = await self.redis.hgetall(session_key)
+        return {"message": f"Сессия {session_id} успешно закрыта", "session_id": session_id}
 
-        group_name = data.get("group_name")
-        subject_name = data.get("subject_name")
-        subject_type = data.get("subject_type")
-        date_str = data.get("date")
 
-        zach_list_json = data.get("students", "[]")
-        zach_list = json.loads(zach_list_json)
+    async def _flush_session(
+        self,
+        session_id: str,
+        max_id: Optional[str] = None,
+        attendance_service: Optional[AttendanceService] = None,
+    ) -> None:
+        """
+        Запись отметок закрытой сессии в Postgres (все отметки — одной командой и одним commit),
+        затем снятие срока и хранение данных сессии ещё qr_closed_session_retention секунд.
+        Исключения (Postgres недоступен) пробрасываются — срок остаётся, запись повторится.
+        """
+        data = await self.redis.hgetall(f"session:{session_id}")
+        zach_list = await self._read_students(session_id, data.get("students"))
+        max_id = max_id or data.get("teacher_max_id")
 
-        for zach in zach_list:
-            result = await asyncio.to_thread(
-                self.attendance_service.mark_to_one,
+        if zach_list and max_id:
+            result = await (attendance_service or self.attendance_service).mark_many(
                 max_id,
-                group_name,
-                subject_name,
-                subject_type,
-                date_str,
-                zach,
+                data.get("group_name"),
+                data.get("subject_name"),
+                data.get("subject_type"),
+                data.get("date"),
+                zach_list,
                 True
             )
-            
-            # Проверяем результат на ошибку, возвращенную репозиторием
+            # Проверяем результат на ошибку, возвращенную репозиторием (повтор не поможет)
             if result.get("status") == "error":
-                print(f"!!! ОШИБКА записи посещаемости для {zach}: {result.get('detail')}")
-                # Если здесь возникает ошибка, цикл продолжит работу для других студентов,
-                # но ошибка будет залогирована.
-                
-        return {"message": f"Сессия {session_id} успешно закрыта", "session_id": session_id}
+                print(f"!!! ОШИБКА записи посещаемости сессии {session_id}: {result.get('detail')}")
+        elif zach_list:
+            print(f"!!! Сессия {session_id} без преподавателя: {len(zach_list)} отметок не записаны")
 
+        retention = settings.qr_closed_session_retention
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.zrem(SESSION_DEADLINES_KEY, session_id)
+            for key in session_keys(session_id):
+                if retention > 0:
+                    pipe.expire(key, retention)
+                else:
+                    pipe.delete(key)
+            await pipe.execute()
 
-    async def scan_qr(self, max_id: str, session_id: str, token: str) -> Dict[str, Any]:
-        """Проверка QR-кода: session_id + token"""
-        session_key = f"session:{session_id}"
 
-        exists = await self.redis.exists(session_key)
-        if not exists:
+    async def close_expired_sessions(self) -> int:
+        """
+        Автозакрытие сессий, у которых вышел срок, и запись их отметок в Postgres
+        (одна сессия БД на пачку). Сессии, запись которых не удалась, повторяются через FLUSH_RETRY_DELAY.
+        """
+        # локальный импорт: app.config.database сам импортирует этот модуль
+        from app.config.database import AsyncSessionLocal
+
+        now = time.time()
+        due = await self.redis.zrangebyscore(SESSION_DEADLINES_KEY, "-inf", now, start=0, num=ROTATION_BATCH_SIZE)
+        if not due:
+            return 0
+
+        closed = 0
+        async with AsyncSessionLocal() as db:
+            attendance_service = AttendanceService(db)
+            for session_id in due:
+                result = await self._close_session(
+                    keys=[f"session:{session_id}", ACTIVE_SESSIONS_KEY],
+                    args=[session_id, session_events_channel(session_id), now],
+                )
+                if result == -1:
+                    # данные сессии уже удалены — записывать нечего
+                    await self.redis.zrem(SESSION_DEADLINES_KEY, session_id)
+                    continue
+
+                try:
+                    await self._flush_session(session_id, attendance_service=attendance_service)
+                    closed += result
+                except Exception as e:
+                    await db.rollback()
+                    print(f"!!! ОШИБКА записи посещаемости сессии {session_id}, будет повтор: {e}")
+                    await self.redis.zadd(SESSION_DEADLINES_KEY, {session_id: now + FLUSH_RETRY_DELAY})
+        return closed
+
+
+    async def scan_qr(self, max_id: str, session_id: str, token: str) -> Dict[str, Any]:
+        """
+        Проверка QR-кода: session_id + token.
+        Проверка сессии и токена и добавление студента — атомарно, одним скриптом в Redis.
+        Новая отметка попадает и в ленту отметок сессии (поток + событие для WebSocket преподавателя).
+        """
+        token_settings = await self._token_settings(session_id)
+        if token_settings is None:
             return {"error": "Сессия не найдена", "status_code": status.HTTP_404_NOT_FOUND}
 
-        active = await self.redis.hget(session_key, "active_status")
-        if not active or int(active) == 0:
-            return {"error": "Сессия закрыта", "status_code": status.HTTP_400_BAD_REQUEST}
-
-        current_token = await self.redis.hget(session_key, "current_token")
-        if token != current_token:
-            return {"error": "Неверный токен", "status_code": status.HTTP_403_FORBIDDEN}
-        
-        # Получаем текущий список студентов
-        students_json = await self.redis.hget(session_key, "students")
-        students = json.loads(students_json) if students_json else []
-        
-
-        # Добавляем студента, если его там ещё нет
-        student_id = await asyncio.to_thread(self.user_repository.get_student_zach_number_by_max_id, max_id)
-        if student_id not in students:
-            students.append(student_id)
-            await self.redis.hset(session_key, "students", json.dumps(students))
+        # Токен по HMAC проверяется в процессе, скрипту передаётся только прошедший проверку
+        candidates = []
+        token_mode, secret, interval = token_settings
+        if token_mode == TOKEN_MODE_HMAC and verify_token(secret, session_id, token, interval):
+            candidates.append(token)
+
+        student_id = await self.user_repository.get_student_zach_number_by_max_id(max_id)
+        if student_id is None:
+            return {"error": "Студент не найден", "status_code": status.HTTP_404_NOT_FOUND}
+
+        result = await self._scan_qr(
+            keys=[f"session:{session_id}", students_key(session_id), scans_key(session_id), feed_key(session_id)],
+            args=[token, student_id, time.time(), session_events_channel(session_id), *candidates],
+        )
+        if result in SCAN_ERRORS:
+            error, status_code = SCAN_ERRORS[result]
+            return {"error": error, "status_code": status_code}
 
         # Если всё верно
         return {
@@ -139,18 +441,53 @@ class QRService:
             "token": token,
             "status_code": status.HTTP_200_OK
         }
+
+
+    async def _token_settings(self, session_id: str) -> Optional[tuple]:
+        """(режим, секрет, интервал) токенов сессии из кэша процесса или хэша сессии; None — сессии нет."""
+        cached = _token_settings_cache.get(session_id)
+        if cached:
+            return cached
+
+        active, token_mode, secret, interval = await self.redis.hmget(
+            f"session:{session_id}", "active_status", "token_mode", "token_secret", "token_interval"
+        )
+        if active is None:
+            return None
+
+        if len(_token_settings_cache) >= TOKEN_SETTINGS_CACHE_SIZE:
+            _token_settings_cache.clear()
+        # сессии, созданные до появления режимов, — со случайными токенами
+        cached = _token_settings_cache[session_id] = (
+            token_mode or TOKEN_MODE_RANDOM, secret, int(interval) if interval else None
+        )
+        return cached
+
+
+    async def _read_students(self, session_id: str, legacy_students: Optional[str] = None) -> List[str]:
+        """
+        Отметившиеся студенты в порядке отметки.
+        legacy_students — JSON-список из хэша сессий, созданных до перехода на SET/ZSET.
+        """
+        students = await self.redis.zrange(scans_key(session_id), 0, -1)
+        if legacy_students:
+            seen = set(students)
+            students += [s for s in json.loads(legacy_students) if s not in seen]
+        return students
     
 
     async def get_session_students(self, session_id: str) -> Dict[str, Any]:
         """Возвращает список студентов для сессии по session_id"""
         session_key = f"session:{session_id}"
 
-        exists = await self.redis.exists(session_key)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.exists(session_key)
+            pipe.hget(session_key, "students")
+            exists, legacy_students = await pipe.execute()
         if not exists:
             return {"error": "Сессия не найдена", "status_code": 404}
 
-        students_json = await self.redis.hget(session_key, "students")
-        students = json.loads(students_json) if students_json else []
+        students = await self._read_students(session_id, legacy_students)
 
         return {
             "session_id": session_id,
@@ -160,23 +497,127 @@ class QRService:
 
 
     
-    # фоновые задачи для Redis потом перенести в config/datebase.py
-    async def update_tokens_loop(self, interval: int = 10):
-        """Фоновая задача: обновление токенов всех активных сессий и публикация в канал Redis"""
+    async def rotate_due_tokens(self, interval: int = 10) -> int:
+        """
+        Один тик ротации: новые токены для сессий, у которых подошёл срок.
+        Две команды к Redis на пачку (ZRANGEBYSCORE и скрипт ротации) независимо от числа сессий.
+        Вызывается держателем аренды ротатора, без аренды скрипт ничего не меняет.
+        """
+        rotated = 0
         while True:
-            keys = await self.redis.keys("session:*")
+            now = time.time()
+            due = await self.redis.zrangebyscore(
+                ACTIVE_SESSIONS_KEY, "-inf", now, start=0, num=ROTATION_BATCH_SIZE
+            )
+            if not due:
+                return rotated
+
+            rotated += await self._rotate_tokens(
+                keys=[ACTIVE_SESSIONS_KEY, ROTATOR_LEASE_KEY, *(f"session:{session_id}" for session_id in due)],
+                args=[now, now + interval, self.worker_id, *(uuid4().hex for _ in due)],
+            )
+            if len(due) < ROTATION_BATCH_SIZE:
+                return rotated
+
+
+    async def index_active_sessions(self) -> int:
+        """
+        Добавляет в индекс ротации и в сроки активные сессии, созданные до их появления
+        (SCAN, без блокировки Redis). Уже проиндексированные сессии не трогаются.
+        """
+        indexed = 0
+        now = time.time()
+        batch = []
+        async for key in self.redis.scan_iter(match="session:*", count=ROTATION_BATCH_SIZE):
+            if key.count(":") != 1:
+                continue  # session:{id}:students и прочие служебные ключи сессии
+            batch.append(key)
+            if len(batch) >= ROTATION_BATCH_SIZE:
+                indexed += await self._index_sessions(batch, now)
+                batch = []
+        if batch:
+            indexed += await self._index_sessions(batch, now)
+        return indexed
+
+
+    async def _index_sessions(self, keys: list, now: float) -> int:
+        async with self.redis.pipeline(transaction=False) as pipe:
             for key in keys:
-                active = await self.redis.hget(key, "active_status")
-                if active and int(active):
-                    new_token = uuid4().hex
-                    await self.redis.hset(key, "current_token", new_token)
-                    
-                    # публикуем токен в канал Redis для WebSocket
-                    await self.redis.publish(f"token_updates:{key}", new_token)
-            await asyncio.sleep(interval)
+                pipe.hmget(key, "active_status", "token_mode", "expires_at")
+            fields = await pipe.execute()
+
+        rotated, deadlines = {}, {}
+        for key, (active_status, token_mode, expires_at) in zip(keys, fields):
+            if not active_status or not int(active_status):
+                continue
+            session_id = key.split(":", 1)[1]
+            if token_mode != TOKEN_MODE_HMAC:
+                rotated[session_id] = now
+            deadlines[session_id] = float(expires_at) if expires_at else now + settings.qr_session_duration
+        if not deadlines:
+            return 0
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if rotated:
+                pipe.zadd(ACTIVE_SESSIONS_KEY, rotated, nx=True)
+            pipe.zadd(SESSION_DEADLINES_KEY, deadlines, nx=True)
+            return sum(await pipe.execute())
+
+
+    async def hold_rotator_lease(self, lease_ms: int) -> bool:
+        """Берёт аренду ротатора или продлевает свою. False — ротатор сейчас другой процесс."""
+        return bool(await self._acquire_lease(keys=[ROTATOR_LEASE_KEY], args=[self.worker_id, lease_ms]))
+
+
+    async def release_rotator_lease(self):
+        """Освобождает аренду, если она у этого процесса, — замена подхватит её без ожидания срока."""
+        await self._release_lease(keys=[ROTATOR_LEASE_KEY], args=[self.worker_id])
+
+
+    # фоновые задачи для Redis потом перенести в config/datebase.py
+    async def update_tokens_loop(self, interval: int = 10):
+        """
+        Фоновая задача: обновление токенов активных сессий и публикация в канал Redis.
+        Запускается в каждом процессе, но токены вращает только держатель аренды ROTATOR_LEASE_KEY,
+        поэтому каждая сессия получает один новый токен за interval при любом числе воркеров.
+
+        Аренда выдаётся на 2/3 interval, все процессы обращаются к ней не реже чем раз в 1/3 срока,
+        так что после падения ротатора другой процесс перенимает его раньше, чем истечёт interval,
+        и просроченные сессии ротируются сразу (сроки хранятся в индексе Redis, а не в процессе).
+        Тот же держатель аренды закрывает сессии с вышедшим сроком (close_expired_sessions).
+        """
+        lease_ms = max(1000, interval * 2000 // 3)
+        max_sleep = lease_ms / 3000
+        leader = False
+        try:
+            while True:
+                delay = max_sleep
+                try:
+                    was_leader, leader = leader, await self.hold_rotator_lease(lease_ms)
+                    if leader:
+                        if not was_leader:
+                            await self.index_active_sessions()
+                        await self.rotate_due_tokens(interval)
+                        await self.close_expired_sessions()
+
+                        nearest = await self.redis.zrange(ACTIVE_SESSIONS_KEY, 0, 0, withscores=True)
+                        if nearest:
+                            delay = min(max_sleep, max(MIN_ROTATION_SLEEP, nearest[0][1] - time.time()))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # обрыв Redis не должен останавливать ротацию навсегда
+                    print(f"[ERROR] Ошибка тика ротации токенов: {e}")
+                await asyncio.sleep(delay)
+        finally:
+            if leader:
+                try:
+                    await self.release_rotator_lease()
+                except Exception as e:
+                    print(f"[WARN] Не удалось освободить аренду ротатора токенов: {e}")
 
 
-    def start_token_updater(self, interval: int = 10):
+    def start_token_updater(self, interval: int = settings.qr_token_interval):
         """Запуск фонового обновления токенов при старте приложения."""
         if not self._token_update_task:
             self._token_update_task = asyncio.create_task(self.update_tokens_loop(interval))
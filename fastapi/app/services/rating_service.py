@@ -1,48 +1,39 @@
 # app/services/rating_service.py
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.rating_repository import RatingRepository
 
 class RatingService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.rating_repository = RatingRepository(db)
 
-    def get_student_ratings(self, zach_number: str) -> Dict[str, Any]:
+    async def get_student_ratings(self, zach_number: str) -> Dict[str, Any]:
         """
         Получить все рейтинги студента по всем предметам,
         включая практику и курсовую работу.
         """
-        ratings = self.rating_repository.get_student_ratings(zach_number)
+        marks = await self.rating_repository.get_student_marks(zach_number)
+        grades = await self.rating_repository.get_student_grades(zach_number)
         result = {}
 
-        for rating in ratings:
-            student_data = next(
-                (s for s in rating.rating_json or [] if s.get("student_id") == zach_number),
-                None
-            )
-
-            if not student_data:
-                continue
+        # Обычный предмет с контрольными точками
+        for subject_name, subject_type, control_point, value in marks:
+            result.setdefault(subject_name, {"type": subject_type})[control_point] = value
 
-            # Обычный предмет с контрольными точками
-            if "rating" in student_data:
-                result[rating.subject_name] = {
-                    "type": rating.subject_type,
-                    **student_data["rating"]
-                }
-            # Курсовая работа или практика
-            elif "grade" in student_data:
-                result[rating.subject_name] = {
-                    "type": rating.subject_type,
-                    "grade": student_data["grade"]
+        # Курсовая работа или практика
+        for subject_name, subject_type, grade in grades:
+            if subject_name not in result:
+                result[subject_name] = {
+                    "type": subject_type,
+                    "grade": grade
                 }
 
         return result
 
-    def get_group_rating(self, group_name: str, subject_name: str) -> Dict[str, Any]:
+    async def get_group_rating(self, group_name: str, subject_name: str) -> Dict[str, Any]:
         """Получить рейтинг всей группы по предмету"""
-        rating = self.rating_repository.get_group_rating(group_name, subject_name)
+        rating = await self.rating_repository.get_group_rating(group_name, subject_name)
 
         if not rating:
             return {
@@ -51,13 +42,46 @@ class RatingService:
                 "ratings": []
             }
 
+        marks = await self.rating_repository.get_rating_marks(rating.id)
+        grades = await self.rating_repository.get_rating_grades(rating.id)
+
         return {
             "group_name": group_name,
             "subject_name": subject_name,
-            "ratings": rating.rating_json or []
+            "ratings": self._build_rating_json(marks, grades)
         }
 
-    def update_student_mark(
+    async def get_group_ratings_raw(self, group_name: str, subject_name: str) -> Optional[str]:
+        """ratings ведомости группы по предмету готовым JSON-текстом из Postgres; None — если ведомости нет."""
+        return await self.rating_repository.get_group_rating_json(group_name, subject_name)
+
+    async def get_group_rating_version(self, group_name: str, subject_name: str) -> Optional[Tuple[int, str]]:
+        """(id, версия оценок) ведомости рейтинга группы по предмету или None"""
+        return await self.rating_repository.get_group_rating_version(group_name, subject_name)
+
+    async def get_group_ratings_version(self, group_name: str) -> Optional[str]:
+        """Версия данных отчёта среднего балла группы или None, если группы нет"""
+        return await self.rating_repository.get_group_ratings_version(group_name)
+
+    async def get_group_average_ratings(self, group_name: str) -> List[Tuple[str, Optional[float]]]:
+        """Средний балл по всем КТ для каждого студента группы: [(zach_number, average | None), ...]"""
+        return await self.rating_repository.get_group_average_marks(group_name)
+
+    @staticmethod
+    def _build_rating_json(marks, grades) -> List[Dict[str, Any]]:
+        """
+        Собирает строки rating_mark/rating_grade в прежний формат ведомости:
+        [{"student_id": ..., "rating": {"kt1": ...}} | {"student_id": ..., "grade": ...}, ...]
+        """
+        students: Dict[str, Dict[str, Any]] = {}
+        for student_id, control_point, value in marks:
+            students.setdefault(student_id, {"student_id": student_id, "rating": {}})["rating"][control_point] = value
+        for student_id, grade in grades:
+            if student_id not in students:
+                students[student_id] = {"student_id": student_id, "grade": grade}
+        return [students[student_id] for student_id in sorted(students)]
+
+    async def update_student_mark(
         self,
         zach_number: str,
         subject_name: str,
@@ -69,23 +93,16 @@ class RatingService:
         Для обычных предметов — обновляется конкретная контрольная точка.
         Для курсовой работы или практики — обновляется grade.
         """
-        # Сначала проверяем, есть ли студент в рейтинге по предмету
-        student_rating = self.rating_repository.get_student_rating_by_subject(
+        # Проверяем, есть ли студент в рейтинге по предмету, и сразу получаем тип предмета
+        student_rating = await self.rating_repository.get_student_rating_by_subject(
             zach_number, subject_name
         )
 
         if student_rating is None:
             return False
 
-        # Получаем объект рейтинга для определения типа предмета
-        rating_obj = self.rating_repository.db.query(
-            self.rating_repository.model
-        ).filter(self.rating_repository.model.subject_name == subject_name).first()
-
-        if not rating_obj:
-            return False
-
-        subject_type = (rating_obj.subject_type or "").lower().strip()
+        subject_type, _ = student_rating
+        subject_type = (subject_type or "").lower().strip()
 
         # Курсовая работа или практика — обновляем grade
         if subject_type in ["практика", "курсовая работа"]:
@@ -102,7 +119,7 @@ class RatingService:
             else:
                 grade_value = str(mark).capitalize()
 
-            return self.rating_repository.update_student_grade(
+            return await self.rating_repository.update_student_grade(
                 zach_number, subject_name, grade_value
             )
 
@@ -116,6 +133,6 @@ class RatingService:
             if not (0 <= mark_int <= 100):
                 return False
 
-            return self.rating_repository.update_student_rating(
+            return await self.rating_repository.update_student_rating(
                 zach_number, subject_name, control_point, mark_int
             )
@@ -0,0 +1,341 @@
+# app/services/report_job_service.py
+"""
+Пакетные задания на ведомости: много групп/предметов одним запросом.
+
+Задание кладётся в Redis (хэш report_job:{id} + очередь report_jobs:queue), запрос сразу
+получает 202. Воркер (фоновая задача приложения или отдельный процесс
+`python -m app.services.report_job_service`) забирает задание из очереди, параллельно
+получает PDF через VedomostiService (тот же кэш и пул рендера, что и у одиночных ведомостей)
+и по мере готовности дописывает их в ZIP на диске. Результат отдаётся файлом потоком.
+
+Задание не теряется при падении воркера: BLMOVE переносит его из очереди в список
+report_jobs:processing:{worker_id}, откуда оно убирается только по завершении. Живой воркер
+продлевает ключ report_jobs:worker:{worker_id}; задания воркеров без этого ключа возвращаются
+в очередь при старте любого воркера и в простое.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+import uuid
+from contextlib import suppress
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import redis.asyncio as aioredis
+from fastapi import HTTPException, status
+
+from app.config.database import AsyncSessionLocal
+from app.config.settings import settings
+from app.services.vedomosti_service import VedomostiService
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = "report_jobs:queue"
+JOB_KEY = "report_job:{job_id}"
+PROCESSING_KEY = "report_jobs:processing:{worker_id}"
+WORKERS_KEY = "report_jobs:workers"
+WORKER_HEARTBEAT_KEY = "report_jobs:worker:{worker_id}"
+
+# Через сколько секунд без продления воркер считается упавшим, а его задания — брошенными
+WORKER_HEARTBEAT_TTL = 30
+
+# Сколько раз повторять ведомость, если пул рендера перегружен (503)
+RENDER_RETRIES = 5
+
+
+def _safe_name(value: Optional[str]) -> str:
+    """Часть имени файла внутри архива: без разделителей путей и служебных символов."""
+    return re.sub(r'[\\/:*?"<>|\s]+', "_", value or "").strip("_") or "-"
+
+
+def _archive_name(item: Dict[str, Any]) -> str:
+    parts = [item["kind"]]
+    if item.get("subject_type"):
+        parts.append(item["subject_type"])
+    if item.get("subject_name"):
+        parts.append(item["subject_name"])
+    return f"{_safe_name(item['group_name'])}/{'_'.join(_safe_name(p) for p in parts)}"
+
+
+def _archive_names(items: List[Dict[str, Any]]) -> List[str]:
+    """
+    Имена PDF в архиве по порядку ведомостей. Разные ведомости могут дать одно имя
+    (например, "ИТ 21" и "ИТ_21") — повторы получают суффикс _2, _3..., иначе zipfile
+    запишет одноимённые члены архива.
+    """
+    names, used = [], set()
+    for item in items:
+        base = name = _archive_name(item)
+        n = 1
+        while name in used:
+            n += 1
+            name = f"{base}_{n}"
+        used.add(name)
+        names.append(f"{name}.pdf")
+    return names
+
+
+class ReportJobService:
+    def __init__(self, redis: aioredis.Redis):
+        self.redis = redis
+        self.results_dir = Path(settings.report_jobs_dir)
+        self.worker_id = uuid.uuid4().hex
+        self.processing_key = PROCESSING_KEY.format(worker_id=self.worker_id)
+
+    def result_path(self, job_id: str) -> Path:
+        return self.results_dir / f"{job_id}.zip"
+
+    async def create_job(self, owner_max_id: str, items: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Сохранить задание и поставить его в очередь (повторяющиеся ведомости — один раз)."""
+        items = list({json.dumps(item, sort_keys=True): item for item in items}.values())
+        if len(items) > settings.report_job_max_items:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Слишком много ведомостей в задании (максимум {settings.report_job_max_items})"
+            )
+
+        job_id = uuid.uuid4().hex
+        key = JOB_KEY.format(job_id=job_id)
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "owner": owner_max_id,
+            "items": json.dumps(items, ensure_ascii=False),
+            "total": len(items),
+            "done": 0,
+            "failed": 0,
+            "errors": "[]",
+            "created_at": int(time.time()),
+        }
+
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=job)
+            pipe.expire(key, settings.report_job_ttl)
+            pipe.lpush(QUEUE_KEY, job_id)
+            await pipe.execute()
+
+        logger.info(f"Задание на ведомости {job_id}: {len(items)} шт., пользователь {owner_max_id}")
+        return self._public(job)
+
+    @staticmethod
+    def _public(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Статус задания для ответа API."""
+        return {
+            "job_id": job["id"],
+            "status": job["status"],
+            "total": int(job["total"]),
+            "done": int(job["done"]),
+            "failed": int(job["failed"]),
+            "errors": json.loads(job.get("errors") or "[]"),
+            "created_at": int(job["created_at"]),
+            "finished_at": int(job["finished_at"]) if job.get("finished_at") else None,
+        }
+
+    async def _load(self, job_id: str, owner_max_id: str) -> Dict[str, Any]:
+        job = await self.redis.hgetall(JOB_KEY.format(job_id=job_id))
+        # Чужое задание неотличимо от несуществующего
+        if not job or job.get("owner") != owner_max_id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Задание не найдено")
+        return job
+
+    async def get_job(self, job_id: str, owner_max_id: str) -> Dict[str, Any]:
+        return self._public(await self._load(job_id, owner_max_id))
+
+    async def get_result_path(self, job_id: str, owner_max_id: str) -> Path:
+        """Путь к готовому архиву; 409, пока задание не завершено."""
+        job = await self._load(job_id, owner_max_id)
+        if job["status"] != "done":
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=f"Задание ещё не готово (статус: {job['status']})"
+            )
+
+        path = self.result_path(job_id)
+        if not path.exists():
+            raise HTTPException(status_code=status.HTTP_410_GONE, detail="Архив задания удалён")
+        return path
+
+    # === Воркер ===
+
+    async def _render_item(self, owner_max_id: str, item: Dict[str, Any]) -> bytes:
+        """PDF одной ведомости в собственной сессии БД (ведомости задания рендерятся параллельно)."""
+        for attempt in range(RENDER_RETRIES + 1):
+            try:
+                async with AsyncSessionLocal() as db:
+                    return await VedomostiService(db).report_pdf(
+                        kind=item["kind"],
+                        teacher_max_id=owner_max_id,
+                        group_name=item["group_name"],
+                        subject_name=item.get("subject_name"),
+                        subject_type=item.get("subject_type")
+                    )
+            except HTTPException as e:
+                # Пул рендера занят одиночными запросами — задание подождёт, а не упадёт
+                if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE and attempt < RENDER_RETRIES:
+                    await asyncio.sleep(settings.pdf_retry_after)
+                    continue
+                raise
+
+    async def process_job(self, job_id: str) -> None:
+        key = JOB_KEY.format(job_id=job_id)
+        job = await self.redis.hgetall(key)
+        if not job:
+            logger.warning(f"Задание {job_id} истекло до начала обработки")
+            return
+
+        # задание могло быть прервано на середине и вернуться в очередь — счётчики заново
+        await self.redis.hset(key, mapping={"status": "running", "done": 0, "failed": 0})
+        items = json.loads(job["items"])
+        owner = job["owner"]
+
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self._cleanup_results()
+        tmp_path = self.results_dir / f".{job_id}.zip.tmp"
+
+        semaphore = asyncio.Semaphore(settings.report_job_concurrency)
+        write_lock = asyncio.Lock()
+        errors: List[str] = []
+
+        try:
+            # PDF уже сжаты — в архив без повторного сжатия
+            with zipfile.ZipFile(tmp_path, "w", compression=zipfile.ZIP_STORED) as archive:
+
+                async def handle(item: Dict[str, Any], name: str) -> None:
+                    try:
+                        async with semaphore:
+                            pdf = await self._render_item(owner, item)
+                        async with write_lock:
+                            await asyncio.to_thread(archive.writestr, name, pdf)
+                        await self.redis.hincrby(key, "done", 1)
+                    except Exception as e:
+                        detail = e.detail if isinstance(e, HTTPException) else str(e)
+                        logger.warning(f"Задание {job_id}: {name} не сформирована: {detail}")
+                        errors.append(f"{name}: {detail}")
+                        await self.redis.hincrby(key, "failed", 1)
+
+                await asyncio.gather(*(handle(item, name) for item, name in zip(items, _archive_names(items))))
+
+                if errors:
+                    archive.writestr("errors.txt", "\n".join(errors))
+
+            os.replace(tmp_path, self.result_path(job_id))
+        except BaseException:
+            # прерванное задание (ошибка, остановка воркера) не оставляет недописанный архив
+            with suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+
+        await self.redis.hset(key, mapping={
+            "status": "done" if len(errors) < len(items) else "failed",
+            "errors": json.dumps(errors, ensure_ascii=False),
+            "finished_at": int(time.time()),
+        })
+        logger.info(f"Задание {job_id} завершено: {len(items) - len(errors)} из {len(items)} ведомостей")
+
+    def _cleanup_results(self) -> None:
+        """Архивы старше срока жизни задания больше никто не запросит."""
+        deadline = time.time() - settings.report_job_ttl
+        for entry in os.scandir(self.results_dir):
+            try:
+                if entry.stat().st_mtime < deadline:
+                    os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    async def _heartbeat(self) -> None:
+        """Продление ключа живого воркера, пока работает run_worker."""
+        heartbeat_key = WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id)
+        while True:
+            try:
+                await self.redis.set(heartbeat_key, int(time.time()), ex=WORKER_HEARTBEAT_TTL)
+                await self.redis.sadd(WORKERS_KEY, self.worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Воркер пакетных ведомостей: не удалось продлить ключ: {e}")
+            await asyncio.sleep(WORKER_HEARTBEAT_TTL / 3)
+
+    async def _requeue(self, processing_key: str) -> int:
+        """Вернуть задания из списка обработки в очередь — следующими к выдаче."""
+        moved = 0
+        while (job_id := await self.redis.lmove(processing_key, QUEUE_KEY, "RIGHT", "RIGHT")) is not None:
+            await self.redis.hset(JOB_KEY.format(job_id=job_id), "status", "queued")
+            moved += 1
+        return moved
+
+    async def requeue_stale_jobs(self) -> int:
+        """Задания упавших воркеров (их ключ истёк) — обратно в очередь."""
+        moved = 0
+        for worker_id in await self.redis.smembers(WORKERS_KEY):
+            if worker_id == self.worker_id or await self.redis.exists(WORKER_HEARTBEAT_KEY.format(worker_id=worker_id)):
+                continue
+            # LMOVE атомарен: если брошенные задания разбирают два воркера сразу, каждое вернётся один раз
+            moved += await self._requeue(PROCESSING_KEY.format(worker_id=worker_id))
+            await self.redis.srem(WORKERS_KEY, worker_id)
+        if moved:
+            logger.warning(f"Возвращено в очередь заданий упавших воркеров: {moved}")
+        return moved
+
+    async def run_worker(self, poll_timeout: int = 5) -> None:
+        """Бесконечный цикл воркера: задания берутся из очереди по одному."""
+        logger.info(f"Воркер пакетных ведомостей {self.worker_id} запущен")
+        heartbeat = asyncio.create_task(self._heartbeat())
+        next_recovery = 0.0
+        try:
+            while True:
+                try:
+                    if time.monotonic() >= next_recovery:
+                        await self.requeue_stale_jobs()
+                        next_recovery = time.monotonic() + WORKER_HEARTBEAT_TTL
+                    # задание остаётся в списке обработки воркера, пока не завершено
+                    job_id = await self.redis.blmove(QUEUE_KEY, self.processing_key, poll_timeout, "RIGHT", "LEFT")
+                    if job_id is None:
+                        continue
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Воркер пакетных ведомостей: Redis недоступен: {e}")
+                    await asyncio.sleep(poll_timeout)
+                    continue
+
+                try:
+                    await self.process_job(job_id)
+                except asyncio.CancelledError:
+                    # остановка воркера: задание сразу в очередь, не дожидаясь истечения ключа
+                    with suppress(Exception):
+                        await self._requeue(self.processing_key)
+                    raise
+                except Exception as e:
+                    logger.error(f"Задание {job_id} прервано: {e}")
+                    await self.redis.hset(JOB_KEY.format(job_id=job_id), mapping={
+                        "status": "failed",
+                        "errors": json.dumps([str(e)], ensure_ascii=False),
+                        "finished_at": int(time.time()),
+                    })
+                await self.redis.lrem(self.processing_key, 1, job_id)
+        finally:
+            heartbeat.cancel()
+            with suppress(asyncio.CancelledError):
+                await heartbeat
+            # из WORKERS_KEY воркер уберёт requeue_stale_jobs другого воркера — вместе с заданиями,
+            # если вернуть их в очередь здесь не удалось
+            with suppress(Exception):
+                await self.redis.delete(WORKER_HEARTBEAT_KEY.format(worker_id=self.worker_id))
+
+
+if __name__ == "__main__":
+    # Отдельный процесс воркера: python -m app.services.report_job_service
+    async def main():
+        redis = aioredis.from_url(
+            f"redis://{settings.redis_host}:{settings.redis_port}/{settings.redis_db}",
+            password=settings.redis_password,
+            decode_responses=True,
+        )
+        await ReportJobService(redis).run_worker()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,133 @@
+# app/services/session_hub.py
+"""
+Общая на процесс подписка на события QR-сессий.
+
+Вместо отдельной подписки redis.pubsub() и опроса active_status на каждый WebSocket
+одна фоновая задача процесса слушает каналы token_updates:session:* и session_events:*
+и раскладывает события по очередям подключений своей сессии. Число команд к Redis
+не зависит от числа открытых сокетов.
+
+События — кортежи (тип, данные):
+    ("token", token)      — новый токен сессии (публикует ротатор);
+    ("closed", {...})     — сессия закрыта (публикует close_qr_session);
+    ("resync", None)      — подписка переподключилась, события могли потеряться: состояние
+                            сессии нужно перечитать из Redis.
+"""
+import asyncio
+from collections import defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+from redis.asyncio import Redis
+
+from app.utils.json_codec import json_loads
+
+TOKEN_CHANNEL_PREFIX = "token_updates:session:"
+SESSION_EVENTS_PREFIX = "session_events:"
+SUBSCRIBER_QUEUE_SIZE = 64
+RECONNECT_DELAY = 1.0
+
+Event = Tuple[str, Any]
+
+
+def session_events_channel(session_id: str) -> str:
+    """Канал событий сессии (JSON {"type": ..., ...}), кроме токенов."""
+    return f"{SESSION_EVENTS_PREFIX}{session_id}"
+
+
+class SessionHub:
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+
+    def subscribe(self, session_id: str) -> asyncio.Queue:
+        """Очередь событий сессии для одного подключения; после использования — unsubscribe."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers[session_id].add(queue)
+        return queue
+
+    def unsubscribe(self, session_id: str, queue: asyncio.Queue) -> None:
+        queues = self._subscribers.get(session_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[session_id]
+
+    async def wait_ready(self, timeout: float = 5.0) -> bool:
+        """Ждёт, пока подписка в Redis установлена (события, опубликованные раньше, не придут)."""
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    @property
+    def connections(self) -> int:
+        return sum(len(queues) for queues in self._subscribers.values())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+    def publish_local(self, session_id: str, event: Event) -> None:
+        """Раздача события подключениям сессии в этом процессе."""
+        for queue in tuple(self._subscribers.get(session_id, ())):
+            if queue.full():
+                # медленный клиент: старое событие теряет смысл раньше нового
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    def _broadcast(self, event: Event) -> None:
+        for session_id in tuple(self._subscribers):
+            self.publish_local(session_id, event)
+
+    async def _run(self) -> None:
+        """Фоновая задача: одна psubscribe на процесс, переподключение при обрыве."""
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.psubscribe(f"{TOKEN_CHANNEL_PREFIX}*", f"{SESSION_EVENTS_PREFIX}*")
+                self._ready.set()
+                # за время без подписки события могли потеряться
+                self._broadcast(("resync", None))
+
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self._dispatch(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[ERROR] Подписка на события QR-сессий прервана: {e}")
+            finally:
+                self._ready.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+            await asyncio.sleep(RECONNECT_DELAY)
+
+    def _dispatch(self, channel: str, data: str) -> None:
+        if channel.startswith(TOKEN_CHANNEL_PREFIX):
+            session_id = channel[len(TOKEN_CHANNEL_PREFIX):]
+            if session_id in self._subscribers:
+                self.publish_local(session_id, ("token", data))
+            return
+
+        session_id = channel[len(SESSION_EVENTS_PREFIX):]
+        if session_id not in self._subscribers:
+            return
+        try:
+            payload = json_loads(data)
+        except ValueError:
+            print(f"[WARN] Некорректное событие сессии {session_id}: {data!r}")
+            return
+        self.publish_local(session_id, (payload.get("type"), payload))
@@ -1,5 +1,5 @@
 from typing import Any, Dict, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from passlib.context import CryptContext
 from app.models.pydantic_models.pydantic_models import LoginRequest, LoginResponse
 from app.models.enums import Role
@@ -15,26 +15,26 @@ from app.repositories.group_timetable_repository import GroupTimetableRepository
 
 
 class TimetableService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.user_repository = UserRepository(db)
         self.student_info_repository = StudentInfoRepository(db)
         self.group_repository = GroupsRepository(db)
         self.teacher_timetable_repository = TeacherTimetableRepository(db)
         self.group_timetable_repository = GroupTimetableRepository(db)
     
-    def get_my_timetable_by_max_id(self, max_id: str):
-        user = self.user_repository.get_by_max_id(max_id)
+    async def get_my_timetable_by_max_id(self, max_id: str):
+        user = await self.user_repository.get_by_max_id(max_id)
 
         if user.role == "student":
             timetable = {}
             student_info_id = user.student_info_id
-            group_id = self.student_info_repository.get_by_id(student_info_id).group_id
-            timetable = self.group_timetable_repository.get_by_group_id(group_id).timetable
+            group_id = (await self.student_info_repository.get_by_id(student_info_id)).group_id
+            timetable = (await self.group_timetable_repository.get_by_group_id(group_id)).timetable
 
 
         elif user.role == "teacher":
             teacher_info_id = user.teacher_info_id
-            timetable = self.teacher_timetable_repository.get_by_teacher_info_id(teacher_info_id).timetable
+            timetable = (await self.teacher_timetable_repository.get_by_teacher_info_id(teacher_info_id)).timetable
     
         return timetable
             
@@ -0,0 +1,169 @@
+# app/services/vedomosti_export_service.py
+import logging
+from datetime import date
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import AsyncSessionLocal
+from app.repositories.attendance_repository import AttendanceRepository
+from app.repositories.rating_repository import RatingRepository
+from app.services.attendance_service import AttendanceService
+from app.services.rating_service import RatingService
+from app.utils.table_export import EXPORT_FORMATS, csv_stream, xlsx_stream
+
+logger = logging.getLogger(__name__)
+
+CONTROL_POINTS = [f"kt{i}" for i in range(1, 6)]
+
+
+class VedomostiExportService:
+    """
+    Выгрузка ведомостей в CSV/XLSX потоком: строки идут из серверного курсора БД
+    прямо в ответ, поэтому память не растёт с размером группы или семестра.
+
+    Проверки (ведомость/группа существует) выполняются в сессии запроса до начала ответа,
+    а сами строки читаются в отдельной сессии, которая живёт ровно столько, сколько идёт выгрузка.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.attendance_service = AttendanceService(db)
+        self.rating_service = RatingService(db)
+
+    @staticmethod
+    def _response(
+        export_format: str,
+        filename: str,
+        sheet_name: str,
+        header: Sequence[Any],
+        rows: AsyncIterator[Sequence[Any]]
+    ) -> StreamingResponse:
+        if export_format == "xlsx":
+            body = xlsx_stream(sheet_name, header, rows)
+        else:
+            body = csv_stream(header, rows)
+
+        return StreamingResponse(
+            body,
+            media_type=EXPORT_FORMATS[export_format],
+            headers={"Content-Disposition": f"attachment; filename={filename}.{export_format}"}
+        )
+
+    async def export_attendance(
+        self,
+        teacher_max_id: str,
+        group_name: str,
+        subject_type: str,
+        subject_name: str,
+        export_format: str
+    ) -> StreamingResponse:
+        """Посещаемость: строка на студента, столбец на каждую дату занятия (по сегодняшний день) и итоги."""
+        version = await self.attendance_service.get_ved_version(
+            max_id=teacher_max_id,
+            group_name=group_name,
+            subject_type=subject_type,
+            subject_name=subject_name
+        )
+        if version is None:
+            raise HTTPException(status_code=404, detail="Данные о посещаемости не найдены")
+
+        ved_id = version[0]
+        # Как и в PDF, будущие занятия не учитываются
+        today = date.today()
+        dates = await AttendanceRepository(self.db).get_ved_dates(ved_id, today)
+        logger.info(f"Выгрузка посещаемости {group_name}/{subject_name}: {len(dates)} дат, формат {export_format}")
+
+        def build_row(student_id: str, marks: Dict[date, bool]) -> List[Any]:
+            attended = sum(1 for present in marks.values() if present)
+            total = len(marks)
+            percent_missed = round(((total - attended) / total * 100) if total else 0, 2)
+            cells = [
+                "" if d not in marks else ("+" if marks[d] else "н")
+                for d in dates
+            ]
+            return [student_id, *cells, total, attended, percent_missed]
+
+        async def rows():
+            async with AsyncSessionLocal() as session:
+                result = await AttendanceRepository(session).stream_ved_marks(ved_id, today)
+                current, marks = None, {}
+                async for student_id, lesson_date, present in result:
+                    if student_id != current:
+                        if current is not None:
+                            yield build_row(current, marks)
+                        current, marks = student_id, {}
+                    marks[lesson_date] = present
+                if current is not None:
+                    yield build_row(current, marks)
+
+        header = [
+            "№ зачётки",
+            *(d.strftime("%d.%m.%Y") for d in dates),
+            "Всего пар",
+            "Посещено",
+            "Процент пропусков",
+        ]
+        return self._response(export_format, "attendance", f"{group_name} посещаемость", header, rows())
+
+    async def export_rating(self, group_name: str, subject_name: str, export_format: str) -> StreamingResponse:
+        """Рейтинг по предмету: КТ1–КТ5 и средний балл либо итоговая оценка (практика/курсовая)."""
+        version = await self.rating_service.get_group_rating_version(group_name, subject_name)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Данные о рейтинге не найдены")
+
+        rating_id = version[0]
+        is_detailed = await RatingRepository(self.db).has_rating_marks(rating_id)
+        logger.info(f"Выгрузка рейтинга {group_name}/{subject_name}, формат {export_format}")
+
+        def build_row(student_id: str, marks: Dict[str, int]) -> List[Any]:
+            values = [marks.get(cp) for cp in CONTROL_POINTS]
+            numeric = [v for v in values if v is not None]
+            average = round(sum(numeric) / len(numeric), 2) if numeric else None
+            return [student_id, *values, average]
+
+        async def detailed_rows():
+            async with AsyncSessionLocal() as session:
+                result = await RatingRepository(session).stream_rating_marks(rating_id)
+                current, marks = None, {}
+                async for student_id, control_point, value in result:
+                    if student_id != current:
+                        if current is not None:
+                            yield build_row(current, marks)
+                        current, marks = student_id, {}
+                    marks[control_point] = value
+                if current is not None:
+                    yield build_row(current, marks)
+
+        async def grade_rows():
+            async with AsyncSessionLocal() as session:
+                result = await RatingRepository(session).stream_rating_grades(rating_id)
+                async for student_id, grade in result:
+                    yield [student_id, grade]
+
+        if is_detailed:
+            header = ["№ зачётки", "КТ1", "КТ2", "КТ3", "КТ4", "КТ5", "Средний балл"]
+            rows = detailed_rows()
+        else:
+            header = ["№ зачётки", "Оценка"]
+            rows = grade_rows()
+
+        return self._response(export_format, "rating", f"{group_name} рейтинг", header, rows)
+
+    async def export_average(self, group_name: str, export_format: str) -> StreamingResponse:
+        """Средний балл по всем КТ всех предметов для каждого студента группы."""
+        if await self.rating_service.get_group_ratings_version(group_name) is None:
+            raise HTTPException(status_code=404, detail=f"В группе {group_name} не найдено студентов")
+
+        logger.info(f"Выгрузка среднего балла {group_name}, формат {export_format}")
+
+        async def rows():
+            async with AsyncSessionLocal() as session:
+                result = await RatingRepository(session).stream_group_average_marks(group_name)
+                async for zach_number, average in result:
+                    yield [zach_number, RatingRepository.round_average(average)]
+
+        header = ["№ зачётки", "Средний балл"]
+        return self._response(export_format, "average_rating", f"{group_name} средний балл", header, rows())
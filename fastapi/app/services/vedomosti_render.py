@@ -0,0 +1,212 @@
+# app/services/vedomosti_render.py
+"""
+Сборка PDF ведомостей по уже полученным данным.
+
+Функции не обращаются к БД и принимают только простые данные (dict/list/str/числа),
+поэтому выполняются в отдельном процессе пула (app/utils/pdf_executor.py)
+и не блокируют event loop приложения.
+"""
+import io
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, Tuple
+
+from reportlab.lib.pagesizes import A4, portrait
+from reportlab.lib.units import cm
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer
+
+from app.utils.attendance_matrix import AttendanceMatrix
+from app.utils.pdf_render_context import PdfRenderContext, get_render_context
+
+logger = logging.getLogger(__name__)
+
+
+def _setup_document():
+    """Настройка базового документа в памяти"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        pagesize=portrait(A4),
+        leftMargin=2 * cm,
+        rightMargin=2 * cm,
+        topMargin=2 * cm,
+        bottomMargin=2 * cm,
+    )
+
+    # Шрифт, стили и шапка создаются один раз на процесс
+    ctx = get_render_context()
+
+    return doc, ctx, buffer
+
+
+def _create_footer(ctx: PdfRenderContext, today: date):
+    """Создание подвала документа"""
+    date_str = today.strftime("%d.%m.%Y")
+
+    footer_table = Table(
+        [
+            [
+                f"Дата: {date_str}",
+                "Ответственный преподаватель: _____________________________ __________"
+            ],
+            ["", "                                        (ФИО)                   (Подпись)"]
+        ],
+        colWidths=[8*cm, 10*cm],
+        hAlign='LEFT'
+    )
+
+    footer_table.setStyle(ctx.footer_style)
+
+    return footer_table
+
+
+def _title(elements: list, ctx: PdfRenderContext, group_name: str, title: str) -> None:
+    elements.append(Paragraph(f"Группа: {group_name}", ctx.style_header))
+    elements.append(Spacer(1, 12))
+
+    elements.append(Paragraph(title, ctx.style_header))
+    elements.append(Spacer(1, 20))
+
+
+def _build(doc, ctx: PdfRenderContext, buffer, elements: list, today: date) -> bytes:
+    elements.append(Spacer(1, 80))
+
+    # === ПОДВАЛ ===
+    elements.append(_create_footer(ctx, today))
+
+    # === СОЗДАНИЕ PDF ===
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def render_attendance(payload: Dict[str, Any]) -> bytes:
+    """
+    Ведомость посещаемости.
+    payload: group_name, subject_name, matrix (AttendanceMatrix.to_payload(), даты уже по today), today (iso)
+    """
+    today = date.fromisoformat(payload["today"])
+    matrix = AttendanceMatrix.from_payload(payload.get("matrix") or {})
+
+    doc, ctx, buffer = _setup_document()
+    elements = ctx.header()
+    _title(elements, ctx, payload["group_name"], f"Ведомость посещаемости по предмету «{payload['subject_name']}»")
+
+    # === ТАБЛИЦА ПОСЕЩАЕМОСТИ ===
+    table_data = [["№ зачётки", "Всего пар", "Посещено", "Процент пропусков"]]
+
+    if not matrix.students:
+        logger.warning("Нет данных посещаемости для отображения")
+        table_data.append(["Нет данных", "—", "—", "—"])
+    else:
+        # Итоги — подсчёт битов по студенту, даты не разбираются
+        for student_id, total, attended in matrix.totals():
+            missed = total - attended
+            percent_missed = round((missed / total * 100) if total else 0, 2)
+
+            table_data.append([
+                student_id,
+                total,
+                attended,
+                f"{percent_missed} %",
+            ])
+
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(ctx.table_style)
+    elements.append(table)
+
+    return _build(doc, ctx, buffer, elements, today)
+
+
+def render_rating(payload: Dict[str, Any]) -> bytes:
+    """
+    Ведомость рейтинга по предмету.
+    payload: group_name, subject_name, ratings ([{"student_id", "rating": {...}} | {"student_id", "grade"}]), today (iso)
+    """
+    today = date.fromisoformat(payload["today"])
+    ratings = payload.get("ratings") or []
+
+    doc, ctx, buffer = _setup_document()
+    elements = ctx.header(with_ministry=True)
+    _title(elements, ctx, payload["group_name"], f"Ведомость по предмету «{payload['subject_name']}»")
+
+    # === ТАБЛИЦА РЕЙТИНГА ===
+    if not ratings:
+        elements.append(Paragraph("Нет данных для отображения", ctx.styles["Normal"]))
+        logger.warning("Нет данных рейтинга для отображения")
+    else:
+        # Определяем тип данных (с КТ или просто оценки)
+        is_detailed = any("rating" in entry for entry in ratings)
+
+        if is_detailed:
+            table_data = [["№ зачётки", "КТ1", "КТ2", "КТ3", "КТ4", "КТ5", "Средний балл"]]
+            for entry in ratings:
+                if "rating" in entry:
+                    r = entry["rating"]
+                    kt_values = [r.get(f"kt{i}", "—") for i in range(1, 6)]
+                    numeric_values = [v for v in kt_values if isinstance(v, (int, float))]
+                    avg = round(sum(numeric_values) / len(numeric_values), 2) if numeric_values else "—"
+                    table_data.append([
+                        entry.get("student_id", "—"),
+                        *kt_values,
+                        avg
+                    ])
+        else:
+            table_data = [["№ зачётки", "Оценка"]]
+            for entry in ratings:
+                table_data.append([
+                    entry.get("student_id", "—"),
+                    entry.get("grade", "—")
+                ])
+
+        table = Table(table_data, repeatRows=1)
+        table.setStyle(ctx.table_style)
+        elements.append(table)
+
+    return _build(doc, ctx, buffer, elements, today)
+
+
+def render_average(payload: Dict[str, Any]) -> bytes:
+    """
+    Средний балл студентов группы по всем предметам.
+    payload: group_name, averages ([[zach_number, average | None], ...]), today (iso)
+    """
+    today = date.fromisoformat(payload["today"])
+
+    doc, ctx, buffer = _setup_document()
+    elements = ctx.header()
+    _title(elements, ctx, payload["group_name"], "Средний балл по всем предметам студентов группы")
+
+    # === ТАБЛИЦА СРЕДНИХ БАЛЛОВ ===
+    table_data = [["№ зачётки", "Средний балл"]]
+    for zach_number, avg_rating in payload["averages"]:
+        table_data.append([zach_number, avg_rating if avg_rating is not None else "—"])
+
+    table = Table(table_data, repeatRows=1)
+    table.setStyle(ctx.table_style)
+    elements.append(table)
+
+    return _build(doc, ctx, buffer, elements, today)
+
+
+RENDERERS = {
+    "attendance": render_attendance,
+    "rating": render_rating,
+    "average": render_average,
+}
+
+
+def render_report(kind: str, payload: Dict[str, Any], submitted_at: float) -> Tuple[bytes, float, float]:
+    """
+    Точка входа процесса пула: (pdf, ожидание в очереди, время рендера) — время в секундах.
+    submitted_at — time.time() в момент постановки задачи, чтобы отделить очередь от рендера.
+    """
+    started_at = time.time()
+    render_start = time.perf_counter()
+    pdf = RENDERERS[kind](payload)
+    return pdf, max(started_at - submitted_at, 0.0), time.perf_counter() - render_start
+
+
+def warm_up() -> None:
+    """Инициализатор процесса пула: шрифт и стили готовы до первой ведомости."""
+    get_render_context()
@@ -0,0 +1,144 @@
+# app/utils/attendance_matrix.py
+"""
+Матрица посещаемости ведомости: общая для всех студентов ось дат и по два битсета на студента.
+
+Бит i относится к dates[i]: в recorded он установлен, если отметка за эту дату есть,
+в present — если студент присутствовал. Итоги по студенту — подсчёт битов (int.bit_count),
+без разбора дат и обхода словарей для каждого студента.
+
+Компактная форма для передачи (to_compact, encoding = "bitset-v1"):
+    {"encoding": "bitset-v1", "start": iso, "days": [0, 7, ...], "students": [zach, ...], "stride": N,
+     "present": base64, "recorded": base64}
+Ось дат — первая дата и смещения в днях от неё (dates[i] = start + days[i]).
+present/recorded — склеенные битсеты студентов по stride = ceil(len(dates) / 8) байт на студента
+в порядке students. Дата dates[i] студента s: бит (i % 8) байта s * stride + i // 8 (младший бит первым).
+"""
+import base64
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+COMPACT_ENCODING = "bitset-v1"
+
+
+@dataclass
+class AttendanceMatrix:
+    dates: List[date] = field(default_factory=list)
+    students: List[str] = field(default_factory=list)
+    present: List[int] = field(default_factory=list)
+    recorded: List[int] = field(default_factory=list)
+
+    @classmethod
+    def from_marks(
+        cls,
+        marks: Iterable[Tuple[str, date, bool]],
+        until: Optional[date] = None
+    ) -> "AttendanceMatrix":
+        """
+        Сборка из строк attendance_mark (student_id, lesson_date, present).
+        Даты позже until отбрасываются — как и в PDF-ведомости, будущие занятия не учитываются.
+        """
+        rows = [m for m in marks if until is None or m[1] <= until]
+
+        # Ось дат строится и сортируется один раз на ведомость
+        dates = sorted({lesson_date for _, lesson_date, _ in rows})
+        position = {lesson_date: i for i, lesson_date in enumerate(dates)}
+
+        matrix = cls(dates=dates)
+        index: Dict[str, int] = {}
+        for student_id, lesson_date, is_present in rows:
+            i = index.get(student_id)
+            if i is None:
+                i = index[student_id] = len(matrix.students)
+                matrix.students.append(student_id)
+                matrix.present.append(0)
+                matrix.recorded.append(0)
+            bit = 1 << position[lesson_date]
+            matrix.recorded[i] |= bit
+            if is_present:
+                matrix.present[i] |= bit
+        return matrix
+
+    def totals(self) -> List[Tuple[str, int, int]]:
+        """(student_id, всего отмеченных занятий, посещено) для каждого студента."""
+        return [
+            (student_id, recorded.bit_count(), (present & recorded).bit_count())
+            for student_id, present, recorded in zip(self.students, self.present, self.recorded)
+        ]
+
+    def to_payload(self) -> Dict[str, list]:
+        """Простые данные для процесса пула рендера (ось дат — ISO-строки)."""
+        return {
+            "dates": [d.isoformat() for d in self.dates],
+            "students": [list(row) for row in zip(self.students, self.present, self.recorded)],
+        }
+
+    @classmethod
+    def from_payload(cls, payload: Dict[str, list]) -> "AttendanceMatrix":
+        students = payload.get("students") or []
+        return cls(
+            dates=[date.fromisoformat(d) for d in payload.get("dates") or []],
+            students=[row[0] for row in students],
+            present=[row[1] for row in students],
+            recorded=[row[2] for row in students],
+        )
+
+    @property
+    def stride(self) -> int:
+        """Байт на студента в компактной форме."""
+        return (len(self.dates) + 7) // 8
+
+    def _pack(self, bitsets: List[int]) -> str:
+        stride = self.stride
+        return base64.b64encode(b"".join(bits.to_bytes(stride, "little") for bits in bitsets)).decode("ascii")
+
+    def to_compact(self) -> Dict[str, Any]:
+        """Компактная форма: одна ось дат и упакованные битсеты вместо словаря дат у каждого студента."""
+        start = self.dates[0] if self.dates else None
+        return {
+            "encoding": COMPACT_ENCODING,
+            "start": start.isoformat() if start else None,
+            "days": [(d - start).days for d in self.dates],
+            "students": list(self.students),
+            "stride": self.stride,
+            "present": self._pack(self.present),
+            "recorded": self._pack(self.recorded),
+        }
+
+    @classmethod
+    def from_compact(cls, data: Dict[str, Any]) -> "AttendanceMatrix":
+        if data.get("encoding") != COMPACT_ENCODING:
+            raise ValueError(f"Неизвестная кодировка матрицы посещаемости: {data.get('encoding')}")
+
+        stride = data["stride"]
+        present = base64.b64decode(data["present"])
+        recorded = base64.b64decode(data["recorded"])
+
+        def unpack(blob: bytes) -> List[int]:
+            return [
+                int.from_bytes(blob[i * stride:(i + 1) * stride], "little")
+                for i in range(len(data["students"]))
+            ]
+
+        start = date.fromisoformat(data["start"]) if data.get("start") else None
+        return cls(
+            dates=[start + timedelta(days=days) for days in data["days"]],
+            students=list(data["students"]),
+            present=unpack(present),
+            recorded=unpack(recorded),
+        )
+
+    def to_attendance_json(self) -> List[Dict[str, Any]]:
+        """Прежний формат ведомости: [{"student_id": ..., "attendance": {"YYYY-MM-DD": bool}}, ...]"""
+        iso_dates = [d.isoformat() for d in self.dates]
+        return [
+            {
+                "student_id": student_id,
+                "attendance": {
+                    iso: bool(present >> i & 1)
+                    for i, iso in enumerate(iso_dates)
+                    if recorded >> i & 1
+                },
+            }
+            for student_id, present, recorded in zip(self.students, self.present, self.recorded)
+        ]
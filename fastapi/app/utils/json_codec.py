@@ -0,0 +1,45 @@
+# app/utils/json_codec.py
+"""
+JSON-кодек приложения: engine SQLAlchemy (JSON/JSONB-колонки) и ответы API.
+
+По умолчанию orjson; без него — стандартный json с теми же правилами,
+поэтому остальной код от выбора кодека не зависит.
+"""
+import json
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # orjson в requirements.txt, но приложение работает и без него
+    orjson = None
+
+# Ключи-числа (dict с int-ключами) сериализуются строками, как в стандартном json
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS if orjson is not None else 0
+
+
+def json_dumps_bytes(obj: Any) -> bytes:
+    """Сериализация в UTF-8 (ensure_ascii=False, без пробелов)."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=_ORJSON_OPTIONS)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def json_dumps(obj: Any) -> str:
+    """json_serializer для engine: SQLAlchemy ожидает str."""
+    return json_dumps_bytes(obj).decode("utf-8")
+
+
+def json_loads(data: str | bytes) -> Any:
+    """json_deserializer для engine."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONResponse(JSONResponse):
+    """Ответ API по умолчанию (FastAPI(default_response_class=...)) с тем же кодеком."""
+
+    def render(self, content: Any) -> bytes:
+        return json_dumps_bytes(content)
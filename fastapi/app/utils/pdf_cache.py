@@ -0,0 +1,116 @@
+# app/utils/pdf_cache.py
+import asyncio
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Optional
+
+from app.config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Меняется при изменении вёрстки ведомостей — старые PDF перестают попадать в кэш
+RENDER_VERSION = "1"
+
+
+def cache_key(*parts) -> str:
+    """Ключ (он же ETag) по содержимому: тип отчёта, группа, предмет, версия данных, дата."""
+    raw = "|".join(str(part) for part in (RENDER_VERSION, *parts))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class PdfCache:
+    """
+    Дисковый LRU-кэш готовых PDF с ограничением по суммарному размеру.
+    Файлы общие для всех воркеров на хосте; «свежесть» — mtime, который обновляется при чтении.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._approx_bytes: Optional[int] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.pdf"
+
+    def _get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # LRU: недавно прочитанные вытесняются последними
+        except FileNotFoundError:
+            pass
+        return data
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(".pdf"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _put(self, key: str, data: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # запись во временный файл + rename: читатели не увидят недописанный PDF
+        tmp_path = self.directory / f".{key}.{uuid.uuid4().hex}.tmp"
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self._path(key))
+
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = sum(size for _, size, _ in self._entries())
+            else:
+                self._approx_bytes += len(data)
+
+            if self._approx_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Удаляет самые давно использованные файлы, пока кэш не станет меньше 90% бюджета."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._approx_bytes = total
+
+    async def get(self, key: str) -> Optional[bytes]:
+        if not self.enabled:
+            return None
+        try:
+            return await asyncio.to_thread(self._get, key)
+        except OSError as e:
+            logger.warning(f"Кэш PDF недоступен на чтение: {e}")
+            return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        if not self.enabled:
+            return
+        try:
+            await asyncio.to_thread(self._put, key, data)
+        except OSError as e:
+            logger.warning(f"Кэш PDF недоступен на запись: {e}")
+
+
+pdf_cache = PdfCache(settings.pdf_cache_dir, settings.pdf_cache_max_bytes)
@@ -0,0 +1,152 @@
+# app/utils/pdf_executor.py
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException, status
+
+from app.config.settings import settings
+from app.services.vedomosti_render import render_report, warm_up
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PdfRenderResult:
+    pdf: bytes
+    queue_wait: float  # секунды от постановки в пул до начала рендера
+    render_time: float  # секунды рендера в процессе пула
+
+    @property
+    def server_timing(self) -> str:
+        """Значение заголовка Server-Timing (миллисекунды)."""
+        return f"queue;dur={self.queue_wait * 1000:.1f}, render;dur={self.render_time * 1000:.1f}"
+
+
+class PdfRenderMetrics:
+    """Счётчики рендера ведомостей в процессе приложения: ожидание в очереди отдельно от рендера."""
+
+    WINDOW = 500  # последние N рендеров для перцентилей
+
+    def __init__(self):
+        self.rendered = 0
+        self.rejected = 0
+        self.failed = 0
+        self.cache_hits = 0  # PDF отдан из кэша без рендера
+        self.not_modified = 0  # 304 по If-None-Match
+        self.in_flight = 0  # ведомости, которые сейчас рендерятся или ждут свободного процесса
+        self._queue_waits = deque(maxlen=self.WINDOW)
+        self._render_times = deque(maxlen=self.WINDOW)
+
+    def observe(self, queue_wait: float, render_time: float) -> None:
+        self.rendered += 1
+        self._queue_waits.append(queue_wait)
+        self._render_times.append(render_time)
+
+    @staticmethod
+    def _summary(values) -> Dict[str, float]:
+        if not values:
+            return {"p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+        ordered = sorted(values)
+        pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+        return {
+            "p50_ms": round(pick(0.50) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "rendered": self.rendered,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "cache_hits": self.cache_hits,
+            "not_modified": self.not_modified,
+            "in_flight": self.in_flight,
+            "max_in_flight": settings.pdf_max_in_flight,
+            "workers": settings.pdf_render_workers,
+            "queue_wait": self._summary(self._queue_waits),
+            "render": self._summary(self._render_times),
+        }
+
+
+metrics = PdfRenderMetrics()
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_semaphore: Optional[asyncio.Semaphore] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    """Пул создаётся лениво при первой ведомости; spawn — чтобы не копировать в дочерние процессы соединения с БД/Redis."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=settings.pdf_render_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=warm_up,
+                )
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(settings.pdf_max_in_flight)
+    return _semaphore
+
+
+async def render_pdf(kind: str, payload: Dict[str, Any]) -> PdfRenderResult:
+    """
+    Рендер ведомости в процессе пула. Если уже pdf_max_in_flight ведомостей в работе,
+    запрос сразу получает 503 с Retry-After, а не копится в очереди.
+    """
+    semaphore = _get_semaphore()
+    if semaphore.locked():
+        metrics.rejected += 1
+        logger.warning(f"Рендер ведомостей перегружен ({settings.pdf_max_in_flight} в работе), запрос отклонён")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервер занят формированием ведомостей, повторите запрос позже",
+            headers={"Retry-After": str(settings.pdf_retry_after)},
+        )
+
+    async with semaphore:
+        metrics.in_flight += 1
+        loop = asyncio.get_running_loop()
+        try:
+            pdf, queue_wait, render_time = await loop.run_in_executor(
+                _get_executor(), render_report, kind, payload, time.time()
+            )
+        except BrokenProcessPool:
+            # Процесс пула аварийно завершился — следующий запрос получит новый пул
+            metrics.failed += 1
+            shutdown_executor()
+            raise
+        except Exception:
+            metrics.failed += 1
+            raise
+        finally:
+            metrics.in_flight -= 1
+
+    metrics.observe(queue_wait, render_time)
+    logger.info(f"Ведомость {kind}: очередь {queue_wait * 1000:.1f} мс, рендер {render_time * 1000:.1f} мс")
+    return PdfRenderResult(pdf, queue_wait, render_time)
+
+
+def shutdown_executor() -> None:
+    """Остановка пула при завершении приложения."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,109 @@
+# app/utils/pdf_render_context.py
+import os
+import threading
+from typing import List, Optional
+
+from reportlab.lib import colors
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.platypus import Paragraph, Spacer, TableStyle
+
+FONT_NAME = "DejaVuSans"
+
+FONT_PATH_CANDIDATES = [
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/local/share/fonts/DejaVuSans.ttf",
+    "C:/Windows/Fonts/DejaVuSans.ttf",
+    "DejaVuSans.ttf",
+]
+
+MINISTRY_NAME = "МИНИСТЕРСТВО НАУКИ И ВЫСШЕГО ОБРАЗОВАНИЯ<br/>РОССИЙСКОЙ ФЕДЕРАЦИИ"
+
+UNIVERSITY_NAME = """ФЕДЕРАЛЬНОЕ ГОСУДАРСТВЕННОЕ БЮДЖЕТНОЕ<br/>
+            ОБРАЗОВАТЕЛЬНОЕ УЧРЕЖДЕНИЕ ВЫСШЕГО ОБРАЗОВАНИЯ<br/>
+            «ВОРОНЕЖСКИЙ ГОСУДАРСТВЕННЫЙ УНИВЕРСИТЕТ<br/>
+            ИНЖЕНЕРНЫХ ТЕХНОЛОГИЙ»"""
+
+FACULTY_NAME = "Факультет УИТС"
+
+
+class PdfRenderContext:
+    """
+    Ресурсы ReportLab, общие для всех ведомостей: зарегистрированный шрифт, стили
+    и неизменная шапка документа. Создаётся один раз на процесс через get_render_context().
+    """
+
+    def __init__(self):
+        # === НАСТРОЙКИ ШРИФТА ===
+        self.font_path = next((p for p in FONT_PATH_CANDIDATES if os.path.exists(p)), None)
+        if not self.font_path:
+            raise FileNotFoundError("⚠️ Не найден шрифт DejaVuSans.ttf — установите его или поместите рядом со скриптом.")
+
+        # TTF разбирается один раз, дальше шрифт берётся из реестра pdfmetrics по имени
+        pdfmetrics.registerFont(TTFont(FONT_NAME, self.font_path))
+
+        self.styles = getSampleStyleSheet()
+        self.styles["Normal"].fontName = FONT_NAME
+
+        self.style_header = ParagraphStyle(
+            "header",
+            fontName=FONT_NAME,
+            fontSize=12,
+            leading=14,
+            alignment=1,  # CENTER
+        )
+
+        # Таблицы данных во всех ведомостях оформлены одинаково
+        self.table_style = TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), FONT_NAME),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+            ("TOPPADDING", (0, 0), (-1, -1), 4),
+            ("LEFTPADDING", (0, 0), (-1, -1), 4),
+            ("RIGHTPADDING", (0, 0), (-1, -1), 4),
+        ])
+
+        self.footer_style = TableStyle([
+            ("FONTNAME", (0, 0), (-1, -1), FONT_NAME),
+            ("FONTSIZE", (0, 0), (-1, -1), 10),
+            ("ALIGN", (0, 0), (0, 0), "LEFT"),
+            ("ALIGN", (1, 0), (1, 0), "RIGHT"),
+            ("TOPPADDING", (0, 0), (-1, -1), 4),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 4),
+        ])
+
+        # === ТИТУЛЬНАЯ ЧАСТЬ ===
+        # Готовые flowables переиспользуются между ведомостями (рендер в процессе идёт последовательно)
+        self.ministry_header = [
+            Paragraph(MINISTRY_NAME, self.style_header),
+            Spacer(1, 8),
+        ]
+        self.university_header = [
+            Paragraph(UNIVERSITY_NAME, self.style_header),
+            Spacer(1, 12),
+            Paragraph(FACULTY_NAME, self.style_header),
+            Spacer(1, 6),
+        ]
+
+    def header(self, with_ministry: bool = False) -> List:
+        """Шапка ведомости: (министерство), университет, факультет."""
+        if with_ministry:
+            return [*self.ministry_header, *self.university_header]
+        return list(self.university_header)
+
+
+_context: Optional[PdfRenderContext] = None
+_context_lock = threading.Lock()
+
+
+def get_render_context() -> PdfRenderContext:
+    """Ленивая инициализация контекста рендеринга — один на процесс."""
+    global _context
+    if _context is None:
+        with _context_lock:
+            if _context is None:
+                _context = PdfRenderContext()
+    return _context
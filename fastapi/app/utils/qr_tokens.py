@@ -0,0 +1,49 @@
+# app/utils/qr_tokens.py
+"""
+Токены QR-сессии, вычисляемые из времени (режим qr_token_mode = "hmac").
+
+Время делится на окна по interval секунд от эпохи; токен окна — HMAC-SHA256 секрета сессии
+от "session_id:номер окна", усечённый до 32 hex-символов (длина прежнего uuid4().hex).
+Любой воркер, прочитав секрет, получает тот же токен без записи в Redis, а смена токена —
+просто смена окна по часам, без фоновой ротации и pubsub.
+"""
+import hashlib
+import hmac
+import secrets
+import time
+from typing import Optional, Tuple
+
+TOKEN_LENGTH = 32
+
+
+def new_secret() -> str:
+    """Секрет сессии (hex), хранится в хэше сессии и наружу не отдаётся."""
+    return secrets.token_hex(32)
+
+
+def token_window(interval: int, now: Optional[float] = None) -> int:
+    return int((time.time() if now is None else now) // interval)
+
+
+def window_token(secret: str, session_id: str, window: int) -> str:
+    digest = hmac.new(bytes.fromhex(secret), f"{session_id}:{window}".encode(), hashlib.sha256)
+    return digest.hexdigest()[:TOKEN_LENGTH]
+
+
+def current_token(secret: str, session_id: str, interval: int, now: Optional[float] = None) -> Tuple[str, float]:
+    """Токен текущего окна и время (unix), когда он сменится."""
+    window = token_window(interval, now)
+    return window_token(secret, session_id, window), (window + 1) * interval
+
+
+def verify_token(secret: str, session_id: str, token: str, interval: int, now: Optional[float] = None) -> bool:
+    """
+    Токен текущего или предыдущего окна: QR, отсканированный перед самой сменой окна,
+    ещё принимается, поэтому токен действует от interval до 2 * interval секунд.
+    """
+    window = token_window(interval, now)
+    candidate = token.encode()
+    return any(
+        hmac.compare_digest(candidate, window_token(secret, session_id, w).encode())
+        for w in (window, window - 1)
+    )
@@ -0,0 +1,27 @@
+# app/utils/raw_json.py
+"""
+Ответы, тело которых уже собрано в Postgres как JSON-текст: текст не разбирается в Python
+и не сериализуется FastAPI повторно, а вклеивается в ответ как есть.
+"""
+from typing import Any
+
+from fastapi.responses import Response
+
+from app.utils.json_codec import json_dumps
+
+
+class RawJSON(str):
+    """Готовый JSON-текст, который вставляется в объект без экранирования."""
+
+
+def raw_json_object(**fields: Any) -> bytes:
+    """JSON-объект из полей: RawJSON вставляется как есть, остальное — через json_dumps."""
+    parts = [
+        f"{json_dumps(name)}:{value if isinstance(value, RawJSON) else json_dumps(value)}"
+        for name, value in fields.items()
+    ]
+    return ("{" + ",".join(parts) + "}").encode("utf-8")
+
+
+class RawJSONResponse(Response):
+    media_type = "application/json"
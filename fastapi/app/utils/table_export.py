@@ -0,0 +1,161 @@
+# app/utils/table_export.py
+"""
+Потоковая запись таблиц ведомостей в CSV и XLSX.
+
+Строки приходят асинхронным итератором прямо из серверного курсора БД и отдаются
+клиенту пачками по мере формирования — файл целиком в памяти не собирается.
+XLSX пишется без сторонних библиотек: это zip с несколькими XML-частями,
+лист (sheet1.xml) сжимается и отдаётся потоком.
+"""
+import csv
+import io
+import re
+import zipfile
+from typing import Any, AsyncIterator, List, Sequence
+from xml.sax.saxutils import escape
+
+# Размер пачки, после которого накопленные байты уходят клиенту
+FLUSH_BYTES = 64 * 1024
+
+CSV_MEDIA_TYPE = "text/csv"  # charset=utf-8 добавляет Starlette
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+EXPORT_FORMATS = {
+    "csv": CSV_MEDIA_TYPE,
+    "xlsx": XLSX_MEDIA_TYPE,
+}
+
+
+async def csv_stream(header: Sequence[Any], rows: AsyncIterator[Sequence[Any]]) -> AsyncIterator[bytes]:
+    """
+    CSV с разделителем «;» и BOM — так файл без настройки открывается в русском Excel.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=";")
+    buffer.write("\ufeff")  # BOM
+    writer.writerow(header)
+
+    async for row in rows:
+        writer.writerow(["" if value is None else value for value in row])
+        if buffer.tell() >= FLUSH_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue().encode("utf-8")
+
+
+# === XLSX ===
+
+_CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>
+<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>
+<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>
+</Types>"""
+
+_ROOT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>
+</Relationships>"""
+
+_WORKBOOK = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">
+<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>
+</workbook>"""
+
+_WORKBOOK_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>
+<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+# Минимальные стили: один шрифт, без заливки и рамок (стиль 1 — жирный для шапки)
+_STYLES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">
+<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font><font><b/><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" state="frozen"/></sheetView></sheetViews>'
+    '<sheetData>'
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+
+# Символы, недопустимые в XML 1.0
+_ILLEGAL_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Несдвигаемый поток для ZipFile: накапливает записанные байты до следующей отдачи клиенту."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _cell(value: Any, style: int = 0) -> str:
+    style_attr = f' s="{style}"' if style else ""
+    if value is None:
+        return f"<c{style_attr}/>"
+    if isinstance(value, bool):
+        return f'<c t="b"{style_attr}><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f"<c{style_attr}><v>{value}</v></c>"
+    text = escape(_ILLEGAL_XML.sub("", str(value)))
+    return f'<c t="inlineStr"{style_attr}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def _row(values: Sequence[Any], style: int = 0) -> str:
+    return "<row>" + "".join(_cell(value, style) for value in values) + "</row>"
+
+
+async def xlsx_stream(
+    sheet_name: str,
+    header: Sequence[Any],
+    rows: AsyncIterator[Sequence[Any]]
+) -> AsyncIterator[bytes]:
+    """Книга XLSX с одним листом: шапка (жирная, закреплена) и строки по мере поступления."""
+    sink = _ChunkSink()
+    # Поток несдвигаемый — zipfile пишет размеры записей в data descriptor после данных
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr("[Content_Types].xml", _CONTENT_TYPES)
+        workbook.writestr("_rels/.rels", _ROOT_RELS)
+        # имя листа в Excel — до 31 символа, без []:*?/\
+        safe_name = escape(re.sub(r"[\[\]:*?/\\]", " ", sheet_name)[:31] or "Лист1", {'"': "&quot;"})
+        workbook.writestr("xl/workbook.xml", _WORKBOOK.format(sheet_name=safe_name))
+        workbook.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS)
+        workbook.writestr("xl/styles.xml", _STYLES)
+
+        with workbook.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((_SHEET_HEAD + _row(header, style=1)).encode("utf-8"))
+            async for row in rows:
+                sheet.write(_row(row).encode("utf-8"))
+                if sink.size >= FLUSH_BYTES:
+                    yield sink.drain()
+            sheet.write(_SHEET_TAIL.encode("utf-8"))
+
+    yield sink.drain()
@@ -1,7 +1,10 @@
+import asyncio
+from contextlib import suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config.settings import settings
-from app.config.database import engine, Base
+from app.config.database import close_redis, get_redis, run_migrations
+from app.utils.pdf_executor import shutdown_executor
 from app.controllers.auth_controller import auth_router
 from app.controllers.attendance_controller import attendance_router
 from app.controllers.rating_controller import rating_router
@@ -13,10 +16,13 @@ from app.controllers.qr_controller import qr_router
 from app.controllers.ws import ws_router
 from app.controllers.vedomosti_controller import vedomosti_router
 from app.controllers.library_controller import library_router
+from app.controllers.report_controller import report_router
+from app.services.report_job_service import ReportJobService
+from app.utils.json_codec import FastJSONResponse
 
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Apply database migrations (alembic upgrade head)
+run_migrations()
 
 # Create FastAPI app
 app = FastAPI(
@@ -24,7 +30,8 @@ app = FastAPI(
     description="FastAPI version of VSUET system",
     version="1.0.0",
     docs_url="/docs",  # Явно указываем URL для документации
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    default_response_class=FastJSONResponse  # orjson вместо стандартного json
 )
 
 # Add CORS middleware with comprehensive settings
@@ -49,6 +56,39 @@ app.include_router(qr_router)
 app.include_router(ws_router)
 app.include_router(vedomosti_router)
 app.include_router(library_router)
+app.include_router(report_router)
+
+
+_report_worker_task: asyncio.Task | None = None
+
+
+@app.on_event("startup")
+async def start_report_worker():
+    """Воркер пакетных заданий на ведомости (/api/reports/jobs)"""
+    global _report_worker_task
+    if settings.report_worker_enabled:
+        _report_worker_task = asyncio.create_task(ReportJobService(await get_redis()).run_worker())
+
+
+@app.on_event("shutdown")
+async def stop_report_worker():
+    """Остановка воркера до закрытия Redis: прерванное задание возвращается в очередь"""
+    if _report_worker_task is not None:
+        _report_worker_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await _report_worker_task
+
+
+@app.on_event("shutdown")
+async def shutdown_redis():
+    """Остановка ротатора токенов QR (с освобождением аренды) и закрытие Redis"""
+    await close_redis()
+
+
+@app.on_event("shutdown")
+def shutdown_pdf_executor():
+    """Остановка пула процессов рендера ведомостей"""
+    shutdown_executor()
 
 
 @app.get("/")
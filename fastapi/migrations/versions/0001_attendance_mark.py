@@ -0,0 +1,54 @@
+"""attendance_mark: посещаемость по ячейкам вместо JSONB-документа
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 12:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: на свежей БД таблицу уже создаёт db/postgres/initdb/init.sql
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_mark (
+            attendance_id INTEGER NOT NULL REFERENCES attendance(id) ON DELETE CASCADE,
+            student_id VARCHAR(255) NOT NULL,
+            lesson_date DATE NOT NULL,
+            present BOOLEAN NOT NULL,
+            PRIMARY KEY (attendance_id, student_id, lesson_date)
+        )
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_attendance_mark_student_attendance
+            ON attendance_mark (student_id, attendance_id) INCLUDE (lesson_date, present)
+    """)
+
+    # Разворачиваем attendance_json: [{"student_id", "attendance": {date: bool}}] -> строки
+    op.execute("""
+        INSERT INTO attendance_mark (attendance_id, student_id, lesson_date, present)
+        SELECT a.id, s.value->>'student_id', d.key::date, d.value::boolean
+        FROM attendance a
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(a.attendance_json) = 'array' THEN a.attendance_json ELSE '[]'::jsonb END
+        ) AS s(value)
+        CROSS JOIN LATERAL jsonb_each_text(s.value->'attendance') AS d(key, value)
+        WHERE s.value->>'student_id' IS NOT NULL
+          AND d.key ~ '^\\d{4}-\\d{2}-\\d{2}$'
+          AND d.value IN ('true', 'false')
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('attendance_mark')
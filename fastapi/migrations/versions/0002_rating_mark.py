@@ -0,0 +1,79 @@
+"""rating_mark/rating_grade: рейтинг по контрольным точкам вместо JSONB-документа
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 14:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # IF NOT EXISTS: на свежей БД таблицы уже создаёт db/postgres/initdb/init.sql
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS rating_mark (
+            rating_id INTEGER NOT NULL REFERENCES rating(id) ON DELETE CASCADE,
+            student_id VARCHAR(255) NOT NULL,
+            control_point VARCHAR(50) NOT NULL,
+            value INTEGER NOT NULL,
+            PRIMARY KEY (rating_id, student_id, control_point)
+        )
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_rating_mark_student_rating
+            ON rating_mark (student_id, rating_id) INCLUDE (control_point, value)
+    """)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS rating_grade (
+            rating_id INTEGER NOT NULL REFERENCES rating(id) ON DELETE CASCADE,
+            student_id VARCHAR(255) NOT NULL,
+            grade VARCHAR(50) NOT NULL,
+            PRIMARY KEY (rating_id, student_id)
+        )
+    """)
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_rating_grade_student_rating
+            ON rating_grade (student_id, rating_id) INCLUDE (grade)
+    """)
+
+    # rating_json: [{"student_id", "rating": {"kt1": 90, ...}} | {"student_id", "grade": "Хорошо"}]
+    op.execute("""
+        INSERT INTO rating_mark (rating_id, student_id, control_point, value)
+        SELECT r.id, s.value->>'student_id', k.key, round((k.value #>> '{}')::numeric)::integer
+        FROM rating r
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(r.rating_json) = 'array' THEN r.rating_json ELSE '[]'::jsonb END
+        ) AS s(value)
+        CROSS JOIN LATERAL jsonb_each(
+            CASE WHEN jsonb_typeof(s.value->'rating') = 'object' THEN s.value->'rating' ELSE '{}'::jsonb END
+        ) AS k(key, value)
+        WHERE s.value->>'student_id' IS NOT NULL
+          AND jsonb_typeof(k.value) = 'number'
+        ON CONFLICT DO NOTHING
+    """)
+    op.execute("""
+        INSERT INTO rating_grade (rating_id, student_id, grade)
+        SELECT r.id, s.value->>'student_id', s.value->>'grade'
+        FROM rating r
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(r.rating_json) = 'array' THEN r.rating_json ELSE '[]'::jsonb END
+        ) AS s(value)
+        WHERE s.value->>'student_id' IS NOT NULL
+          AND s.value->>'grade' IS NOT NULL
+        ON CONFLICT DO NOTHING
+    """)
+
+
+def downgrade() -> None:
+    op.drop_table('rating_grade')
+    op.drop_table('rating_mark')
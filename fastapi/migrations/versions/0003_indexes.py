@@ -0,0 +1,55 @@
+"""Индексы под запросы репозиториев
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 15:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (имя, таблица, определение) — те же индексы объявлены в app/models/tables.py и init.sql
+INDEXES = [
+    ("ix_users_max_id", "users", "(max_id) INCLUDE (teacher_info_id, student_info_id)"),
+    ("ix_users_student_info_id", "users", "(student_info_id)"),
+    ("ix_users_last_name_first_name", "users", "(last_name, first_name)"),
+    ("ix_attendance_group_teacher_subject", "attendance", "(group_id, teacher_id, subject_name, subject_type)"),
+    ("ix_rating_group_subject", "rating", "(group_id, subject_name)"),
+    ("ix_student_info_group_id", "student_info", "(group_id)"),
+    ("ix_group_timetable_group_id", "group_timetable", "(group_id)"),
+]
+
+
+def upgrade() -> None:
+    # CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, definition in INDEXES:
+            # Прерванный CREATE INDEX CONCURRENTLY оставляет невалидный индекс — пересоздаём его
+            op.execute(f"""
+                DO $$
+                BEGIN
+                    IF EXISTS (
+                        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                        WHERE c.relname = '{name}' AND NOT i.indisvalid
+                    ) THEN
+                        EXECUTE 'DROP INDEX {name}';
+                    END IF;
+                END $$
+            """)
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
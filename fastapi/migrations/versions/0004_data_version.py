@@ -0,0 +1,30 @@
+"""data_version у ведомостей посещаемости и рейтинга (ключ кэша PDF)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 17:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Увеличивается при каждом изменении отметок/оценок ведомости.
+    # DEFAULT-константа: в Postgres 11+ колонка добавляется без перезаписи таблицы
+    op.execute("ALTER TABLE attendance ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE rating ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
+
+
+def downgrade() -> None:
+    op.drop_column('rating', 'data_version')
+    op.drop_column('attendance', 'data_version')
@@ -0,0 +1,38 @@
+"""updated_at у отметок и оценок вместо data_version ведомостей
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 21:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+MARK_TABLES = ["attendance_mark", "rating_mark", "rating_grade"]
+
+
+def upgrade() -> None:
+    # Версия ведомости считается при чтении по её строкам (count + сумма updated_at),
+    # поэтому запись ячейки больше не обновляет строку самой ведомости.
+    # DEFAULT now() стабилен в пределах команды: колонка добавляется без перезаписи таблицы
+    for table in MARK_TABLES:
+        op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now()")
+    op.execute("ALTER TABLE attendance DROP COLUMN IF EXISTS data_version")
+    op.execute("ALTER TABLE rating DROP COLUMN IF EXISTS data_version")
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE attendance ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
+    op.execute("ALTER TABLE rating ADD COLUMN IF NOT EXISTS data_version BIGINT NOT NULL DEFAULT 0")
+    for table in reversed(MARK_TABLES):
+        op.drop_column(table, 'updated_at')
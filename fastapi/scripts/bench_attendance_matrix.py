@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Замер подсчёта итогов ведомости посещаемости (по умолчанию 60 студентов × 120 дат).
+
+Сравниваются прежний путь — attendance_json со строковыми датами, fromisoformat и сравнение
+с сегодняшней датой для каждого ключа каждого студента — и AttendanceMatrix: ось дат строится
+один раз, итоги считаются подсчётом битов. Заодно проверяется, что итоги совпадают.
+БД не нужна: данные синтетические, половина дат — в будущем.
+
+Запуск из каталога fastapi:
+    python scripts/bench_attendance_matrix.py [--students 60] [--dates 120] [--runs 200]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.attendance_matrix import AttendanceMatrix
+
+
+def synthetic_marks(students: int, dates: int, today: date) -> list:
+    """Строки attendance_mark: (student_id, lesson_date, present), часть отметок пропущена."""
+    lesson_dates = [today - timedelta(days=7 * (dates // 2 - i)) for i in range(dates)]
+    return [
+        (f"zach{s:04d}", d, random.random() < 0.8)
+        for s in range(students)
+        for d in lesson_dates
+        if random.random() < 0.95
+    ]
+
+
+def legacy_totals(marks: list, today: date) -> list:
+    """Прежний расчёт: attendance_json, затем разбор и фильтр дат по каждому студенту."""
+    students = {}
+    for student_id, lesson_date, present in marks:
+        students.setdefault(student_id, {})[lesson_date.isoformat()] = present
+    attendance_json = [{"student_id": s, "attendance": a} for s, a in students.items()]
+
+    totals = []
+    for entry in attendance_json:
+        attendance = entry["attendance"]
+        filtered_dates = [d for d in attendance if datetime.fromisoformat(d).date() <= today]
+        attended = sum(1 for d in filtered_dates if attendance.get(d) is True)
+        totals.append((entry["student_id"], len(filtered_dates), attended))
+    return totals
+
+
+def matrix_totals(marks: list, today: date) -> list:
+    return AttendanceMatrix.from_marks(marks, until=today).totals()
+
+
+def timed(runs: int, func) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    print(f"{name:<40} median {statistics.median(timings):8.3f} ms   max {max(timings):8.3f} ms")
+
+
+def main(students: int, dates: int, runs: int) -> None:
+    today = date.today()
+    marks = synthetic_marks(students, dates, today)
+
+    assert legacy_totals(marks, today) == matrix_totals(marks, today), "итоги не совпадают"
+
+    print(f"{students} студентов × {dates} дат, {len(marks)} отметок, {runs} прогонов")
+    report("attendance_json + fromisoformat", timed(runs, lambda: legacy_totals(marks, today)))
+    report("AttendanceMatrix (битсеты)", timed(runs, lambda: matrix_totals(marks, today)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--dates", type=int, default=120)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    main(args.students, args.dates, args.runs)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Замер времени отчёта среднего балла (/api/vedomosti/average/{group_name}).
+
+В транзакции создаётся синтетическая группа (по умолчанию 30 студентов × 15 предметов × 5 КТ),
+отчёт строится несколько раз, после чего транзакция откатывается — БД не меняется.
+Для сравнения замеряется и прежний расчёт: get_student_ratings отдельно для каждого студента.
+
+Запуск из каталога fastapi:
+    python scripts/bench_average_report.py [--students 30] [--subjects 15] [--runs 20]
+"""
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import func, insert, select
+
+from app.config.database import AsyncSessionLocal
+from app.models.tables import Groups, Rating, RatingMark, StudentInfo
+from app.services.rating_service import RatingService
+from app.services.vedomosti_service import VedomostiService
+
+GROUP_NAME = "BENCH-AVG"
+
+
+async def next_id(db, model) -> int:
+    # сид-данные вставляются с явными id, поэтому последовательности могут отставать — берём max(id) + 1
+    return (await db.scalar(select(func.coalesce(func.max(model.id), 0)))) + 1
+
+
+async def seed(db, students: int, subjects: int) -> list:
+    group_id = await next_id(db, Groups)
+    await db.execute(insert(Groups).values(id=group_id, group_name=GROUP_NAME))
+
+    student_id = await next_id(db, StudentInfo)
+    zach_numbers = [f"bench{i:04d}" for i in range(students)]
+    await db.execute(insert(StudentInfo), [
+        {"id": student_id + i, "zach_number": z, "group_id": group_id} for i, z in enumerate(zach_numbers)
+    ])
+
+    rating_id = await next_id(db, Rating)
+    rating_ids = [rating_id + i for i in range(subjects)]
+    await db.execute(insert(Rating), [
+        {"id": rating_ids[i], "subject_name": f"Предмет {i}", "subject_type": "экзамен", "group_id": group_id}
+        for i in range(subjects)
+    ])
+    await db.execute(insert(RatingMark), [
+        {"rating_id": rating_id, "student_id": z, "control_point": f"kt{kt}", "value": random.randint(0, 100)}
+        for rating_id in rating_ids
+        for z in zach_numbers
+        for kt in range(1, 6)
+    ])
+    return zach_numbers
+
+
+async def timed(runs: int, func) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    print(f"{name:<40} median {statistics.median(timings):8.2f} ms   max {max(timings):8.2f} ms")
+
+
+async def main(students: int, subjects: int, runs: int) -> None:
+    async with AsyncSessionLocal() as db:
+        try:
+            zach_numbers = await seed(db, students, subjects)
+            rating_service = RatingService(db)
+            vedomosti_service = VedomostiService(db)
+
+            async def per_student():
+                for zach_number in zach_numbers:
+                    await rating_service.get_student_ratings(zach_number)
+
+            print(f"Группа: {students} студентов × {subjects} предметов, прогонов: {runs}")
+            report("средние: один агрегатный запрос", await timed(runs, lambda: rating_service.get_group_average_ratings(GROUP_NAME)))
+            report("средние: запрос на каждого студента", await timed(runs, per_student))
+            report("PDF-отчёт целиком", await timed(runs, lambda: vedomosti_service.generate_average_rating_report(GROUP_NAME)))
+        finally:
+            await db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=30)
+    parser.add_argument("--subjects", type=int, default=15)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.subjects, args.runs))
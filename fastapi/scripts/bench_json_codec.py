@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Микро-замер JSON-кодека (app/utils/json_codec.py) против стандартного json
+на ведомостях из БД: исходные attendance.attendance_json и rating.rating_json (сид init_db.py).
+
+Замеряются разбор и сериализация (как в engine SQLAlchemy) и рендер ответа
+(starlette JSONResponse против FastJSONResponse). Заодно проверяется, что результаты совпадают.
+
+Запуск из каталога fastapi:
+    python scripts/bench_json_codec.py [--runs 50]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import Text, select
+from starlette.responses import JSONResponse
+
+from app.config.database import AsyncSessionLocal
+from app.models.tables import Attendance, Rating
+from app.utils.json_codec import FastJSONResponse, json_dumps, json_loads, orjson
+
+
+async def load_documents() -> list:
+    """Колонки как текст — разбор замеряется отдельно от драйвера."""
+    async with AsyncSessionLocal() as db:
+        attendance = (await db.execute(select(Attendance.attendance_json.cast(Text)))).scalars().all()
+        rating = (await db.execute(select(Rating.rating_json.cast(Text)))).scalars().all()
+    return [doc for doc in [*attendance, *rating] if doc]
+
+
+def timed(runs: int, func) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    print(f"{name:<36} median {statistics.median(timings):8.3f} ms   max {max(timings):8.3f} ms")
+
+
+def main(runs: int) -> None:
+    texts = asyncio.run(load_documents())
+    values = [json.loads(text) for text in texts]
+
+    assert [json_loads(text) for text in texts] == values, "разбор различается"
+    assert [json.loads(json_dumps(value)) for value in values] == values, "сериализация различается"
+
+    print(f"Документов: {len(texts)}, {sum(len(t.encode()) for t in texts):,} байт, прогонов: {runs}")
+    print(f"Кодек: {'orjson ' + orjson.__version__ if orjson else 'стандартный json (orjson не установлен)'}")
+    report("разбор: json.loads", timed(runs, lambda: [json.loads(t) for t in texts]))
+    report("разбор: json_codec", timed(runs, lambda: [json_loads(t) for t in texts]))
+    report("сериализация: json.dumps", timed(runs, lambda: [json.dumps(v) for v in values]))
+    report("сериализация: json_codec", timed(runs, lambda: [json_dumps(v) for v in values]))
+    report("ответ: JSONResponse", timed(runs, lambda: JSONResponse(values).body))
+    report("ответ: FastJSONResponse", timed(runs, lambda: FastJSONResponse(values).body))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    main(args.runs)
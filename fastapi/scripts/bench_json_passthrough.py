@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Замер чтения больших ведомостей: прежний путь (строки → dict/list в Python → сериализация FastAPI)
+против JSON, собранного в Postgres и вклеенного в ответ текстом
+(GET /api/attendance/teacher/... и GET /api/rating/vedomost/...).
+
+В транзакции создаётся синтетическая группа (по умолчанию 60 студентов × 120 дат посещаемости,
+5 КТ рейтинга) для первого преподавателя из users, после чего транзакция откатывается — БД не меняется.
+Заодно проверяется, что оба пути отдают одинаковые данные.
+
+Запуск из каталога fastapi:
+    python scripts/bench_json_passthrough.py [--students 60] [--dates 120] [--runs 50]
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import func, insert, select
+
+from app.config.database import AsyncSessionLocal
+from app.models.tables import Attendance, AttendanceMark, Groups, Rating, RatingMark, StudentInfo, User
+from app.services.attendance_service import AttendanceService
+from app.services.rating_service import RatingService
+from app.utils.raw_json import RawJSON, RawJSONResponse, raw_json_object
+
+GROUP_NAME = "BENCH-JSON"
+SUBJECT_NAME = "Предмет"
+SUBJECT_TYPE = "лекция"
+
+
+async def next_id(db, model) -> int:
+    # сид-данные вставляются с явными id, поэтому последовательности могут отставать — берём max(id) + 1
+    return (await db.scalar(select(func.coalesce(func.max(model.id), 0)))) + 1
+
+
+async def seed(db, students: int, dates: int) -> str:
+    """Группа, ведомости посещаемости и рейтинга; возвращает max_id преподавателя."""
+    max_id, teacher_info_id = (
+        await db.execute(
+            select(User.max_id, User.teacher_info_id)
+            .where(User.teacher_info_id.isnot(None))
+            .order_by(User.id)
+            .limit(1)
+        )
+    ).one()
+
+    group_id = await next_id(db, Groups)
+    await db.execute(insert(Groups).values(id=group_id, group_name=GROUP_NAME))
+
+    student_id = await next_id(db, StudentInfo)
+    zach_numbers = [f"bench{i:04d}" for i in range(students)]
+    await db.execute(insert(StudentInfo), [
+        {"id": student_id + i, "zach_number": z, "group_id": group_id} for i, z in enumerate(zach_numbers)
+    ])
+
+    attendance_id = await next_id(db, Attendance)
+    await db.execute(insert(Attendance).values(
+        id=attendance_id, subject_name=SUBJECT_NAME, subject_type=SUBJECT_TYPE,
+        teacher_id=teacher_info_id, group_id=group_id
+    ))
+    start = date(2025, 9, 1)
+    await db.execute(insert(AttendanceMark), [
+        {"attendance_id": attendance_id, "student_id": z, "lesson_date": start + timedelta(days=i), "present": random.random() < 0.8}
+        for z in zach_numbers
+        for i in range(dates)
+    ])
+
+    rating_id = await next_id(db, Rating)
+    await db.execute(insert(Rating).values(id=rating_id, subject_name=SUBJECT_NAME, subject_type="экзамен", group_id=group_id))
+    await db.execute(insert(RatingMark), [
+        {"rating_id": rating_id, "student_id": z, "control_point": f"kt{kt}", "value": random.randint(0, 100)}
+        for z in zach_numbers
+        for kt in range(1, 6)
+    ])
+    return max_id
+
+
+async def timed(runs: int, func) -> list:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(name: str, timings: list) -> None:
+    print(f"{name:<44} median {statistics.median(timings):8.2f} ms   max {max(timings):8.2f} ms")
+
+
+async def main(students: int, dates: int, runs: int) -> None:
+    async with AsyncSessionLocal() as db:
+        try:
+            max_id = await seed(db, students, dates)
+            attendance_service = AttendanceService(db)
+            rating_service = RatingService(db)
+
+            # Как FastAPI отдаёт dict из эндпоинта: jsonable_encoder + JSONResponse
+            async def attendance_python():
+                data = await attendance_service.get_teacher_attendance(max_id, GROUP_NAME, SUBJECT_TYPE, SUBJECT_NAME)
+                return JSONResponse(jsonable_encoder(data)).body
+
+            async def attendance_raw():
+                raw = await attendance_service.get_teacher_attendance_raw(max_id, GROUP_NAME, SUBJECT_TYPE, SUBJECT_NAME)
+                return RawJSONResponse(content=raw).body
+
+            async def rating_python():
+                data = await rating_service.get_group_rating(GROUP_NAME, SUBJECT_NAME)
+                data["requested_by"] = max_id
+                return JSONResponse(jsonable_encoder(data)).body
+
+            async def rating_raw():
+                raw = await rating_service.get_group_ratings_raw(GROUP_NAME, SUBJECT_NAME)
+                return RawJSONResponse(content=raw_json_object(
+                    group_name=GROUP_NAME, subject_name=SUBJECT_NAME, ratings=RawJSON(raw), requested_by=max_id
+                )).body
+
+            assert json.loads(await attendance_python()) == json.loads(await attendance_raw()), "посещаемость различается"
+            assert json.loads(await rating_python()) == json.loads(await rating_raw()), "рейтинг различается"
+
+            print(f"Ведомость: {students} студентов × {dates} дат, прогонов: {runs}")
+            print(f"Размер ответа посещаемости: {len(await attendance_raw()):,} байт")
+            report("посещаемость: dict в Python + сериализация", await timed(runs, attendance_python))
+            report("посещаемость: JSON из Postgres", await timed(runs, attendance_raw))
+            report("рейтинг: dict в Python + сериализация", await timed(runs, rating_python))
+            report("рейтинг: JSON из Postgres", await timed(runs, rating_raw))
+        finally:
+            await db.rollback()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--students", type=int, default=60)
+    parser.add_argument("--dates", type=int, default=120)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(main(args.students, args.dates, args.runs))
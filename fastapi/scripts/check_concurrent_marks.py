@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Проверка параллельной записи отметок в одну ведомость.
+
+Создаётся синтетическая группа (--students студентов) с ведомостью посещаемости первого преподавателя
+из users и ведомостью рейтинга. Затем --requests параллельных вызовов
+AttendanceRepository.mark_attendance_to_one (каждый — своя сессия БД и своя ячейка студент × дата,
+как отдельные HTTP-запросы) и столько же RatingRepository.update_student_rating (ячейка студент × КТ).
+После записи проверяется, что в ведомостях есть все ячейки с записанными значениями (нет потерянных
+обновлений), и что p99 задержки вызова не больше --max-p99-ms. Синтетические данные удаляются в конце.
+
+Запуск из каталога fastapi:
+    python scripts/check_concurrent_marks.py [--requests 200] [--students 40] [--max-p99-ms 1000]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import delete, func, insert, select
+
+from app.config.database import AsyncSessionLocal, async_engine
+from app.models.tables import Attendance, AttendanceMark, Groups, Rating, RatingMark, StudentInfo, User
+from app.repositories.attendance_repository import AttendanceRepository
+from app.repositories.rating_repository import RatingRepository
+
+GROUP_NAME = "CHECK-MARKS"
+SUBJECT_NAME = "Предмет"
+SUBJECT_TYPE = "лекция"
+CONTROL_POINTS = ["kt1", "kt2", "kt3", "kt4", "kt5"]
+START_DATE = date(2025, 9, 1)
+
+
+async def next_id(db, model) -> int:
+    # сид-данные вставляются с явными id, поэтому последовательности могут отставать — берём max(id) + 1
+    return (await db.scalar(select(func.coalesce(func.max(model.id), 0)))) + 1
+
+
+async def seed(students: int) -> dict:
+    """Группа, студенты и пустые ведомости посещаемости и рейтинга (с commit — записи идут из других сессий)."""
+    async with AsyncSessionLocal() as db:
+        teacher_info_id = await db.scalar(
+            select(User.teacher_info_id).where(User.teacher_info_id.isnot(None)).order_by(User.id).limit(1)
+        )
+
+        group_id = await next_id(db, Groups)
+        await db.execute(insert(Groups).values(id=group_id, group_name=GROUP_NAME))
+
+        student_id = await next_id(db, StudentInfo)
+        zach_numbers = [f"check{i:04d}" for i in range(students)]
+        await db.execute(insert(StudentInfo), [
+            {"id": student_id + i, "zach_number": z, "group_id": group_id} for i, z in enumerate(zach_numbers)
+        ])
+
+        attendance_id = await next_id(db, Attendance)
+        await db.execute(insert(Attendance).values(
+            id=attendance_id, subject_name=SUBJECT_NAME, subject_type=SUBJECT_TYPE,
+            teacher_id=teacher_info_id, group_id=group_id
+        ))
+        rating_id = await next_id(db, Rating)
+        await db.execute(insert(Rating).values(
+            id=rating_id, subject_name=SUBJECT_NAME, subject_type="экзамен", teacher_id=teacher_info_id, group_id=group_id
+        ))
+        await db.commit()
+
+    return {
+        "teacher_info_id": teacher_info_id,
+        "group_id": group_id,
+        "zach_numbers": zach_numbers,
+        "attendance_id": attendance_id,
+        "rating_id": rating_id,
+    }
+
+
+async def cleanup() -> None:
+    async with AsyncSessionLocal() as db:
+        group_id = await db.scalar(select(Groups.id).where(Groups.group_name == GROUP_NAME))
+        if group_id is None:
+            return
+        # отметки и оценки удаляются каскадом вместе с ведомостями
+        await db.execute(delete(Attendance).where(Attendance.group_id == group_id))
+        await db.execute(delete(Rating).where(Rating.group_id == group_id))
+        await db.execute(delete(StudentInfo).where(StudentInfo.group_id == group_id))
+        await db.execute(delete(Groups).where(Groups.id == group_id))
+        await db.commit()
+
+
+async def timed_call(func) -> float:
+    start = time.perf_counter()
+    await func()
+    return (time.perf_counter() - start) * 1000
+
+
+def p99(timings: list) -> float:
+    return statistics.quantiles(timings, n=100, method="inclusive")[98]
+
+
+def report(name: str, timings: list, max_p99_ms: float) -> bool:
+    ok = p99(timings) <= max_p99_ms
+    print(f"{name:<32} median {statistics.median(timings):8.2f} ms   p99 {p99(timings):8.2f} ms   "
+          f"max {max(timings):8.2f} ms — {'OK' if ok else f'ОШИБКА: p99 больше {max_p99_ms} ms'}")
+    return ok
+
+
+async def check_attendance(ved: dict, requests: int, max_p99_ms: float) -> bool:
+    students = ved["zach_numbers"]
+    # своя ячейка на каждый запрос: студент × дата, статус чередуется
+    cells = {
+        (students[i % len(students)], START_DATE + timedelta(days=i // len(students))): i % 3 != 0
+        for i in range(requests)
+    }
+
+    async def mark(zach: str, lesson_date: date, present: bool):
+        async with AsyncSessionLocal() as db:
+            result = await AttendanceRepository(db).mark_attendance_to_one(
+                ved["teacher_info_id"], ved["group_id"], SUBJECT_NAME, SUBJECT_TYPE,
+                lesson_date.isoformat(), zach, present
+            )
+        assert "error" not in result, result
+
+    timings = await asyncio.gather(*(
+        timed_call(lambda z=z, d=d, p=p: mark(z, d, p)) for (z, d), p in cells.items()
+    ))
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(AttendanceMark.student_id, AttendanceMark.lesson_date, AttendanceMark.present)
+            .where(AttendanceMark.attendance_id == ved["attendance_id"])
+        )).all()
+    stored = {(row.student_id, row.lesson_date): row.present for row in rows}
+
+    lost = [cell for cell, present in cells.items() if stored.get(cell) != present]
+    print(f"Посещаемость: запросов {requests}, ячеек в ведомости {len(stored)}, потеряно {len(lost)}"
+          f" — {'OK' if not lost else 'ОШИБКА'}")
+    return report("mark_attendance_to_one", timings, max_p99_ms) and not lost
+
+
+async def check_rating(ved: dict, requests: int, max_p99_ms: float) -> bool:
+    students = ved["zach_numbers"]
+    # своя ячейка на каждый запрос: студент × контрольная точка
+    cells = {
+        (students[i // len(CONTROL_POINTS) % len(students)], CONTROL_POINTS[i % len(CONTROL_POINTS)]): i % 101
+        for i in range(min(requests, len(students) * len(CONTROL_POINTS)))
+    }
+
+    async def update(zach: str, control_point: str, value: int):
+        async with AsyncSessionLocal() as db:
+            assert await RatingRepository(db).update_student_rating(zach, SUBJECT_NAME, control_point, value)
+
+    timings = await asyncio.gather(*(
+        timed_call(lambda z=z, kt=kt, v=v: update(z, kt, v)) for (z, kt), v in cells.items()
+    ))
+
+    async with AsyncSessionLocal() as db:
+        rows = (await db.execute(
+            select(RatingMark.student_id, RatingMark.control_point, RatingMark.value)
+            .where(RatingMark.rating_id == ved["rating_id"])
+        )).all()
+    stored = {(row.student_id, row.control_point): row.value for row in rows}
+
+    lost = [cell for cell, value in cells.items() if stored.get(cell) != value]
+    print(f"Рейтинг: запросов {len(cells)}, ячеек в ведомости {len(stored)}, потеряно {len(lost)}"
+          f" — {'OK' if not lost else 'ОШИБКА'}")
+    return report("update_student_rating", timings, max_p99_ms) and not lost
+
+
+async def main(requests: int, students: int, max_p99_ms: float) -> int:
+    # остатки прерванного прогона
+    await cleanup()
+    try:
+        ved = await seed(students)
+        print(f"Ведомость: {students} студентов, параллельных запросов: {requests}")
+        ok = await check_attendance(ved, requests, max_p99_ms)
+        ok = await check_rating(ved, requests, max_p99_ms) and ok
+    finally:
+        await cleanup()
+        await async_engine.dispose()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--students", type=int, default=40)
+    parser.add_argument("--max-p99-ms", type=float, default=1000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.requests, args.students, args.max_p99_ms)))
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Проверка единственного ротатора токенов QR при нескольких воркерах.
+
+В одном процессе запускаются --workers циклов QRService.update_tokens_loop (как в разных процессах
+uvicorn — у каждого свой worker_id) и создаются --sessions сессий. По подписке на token_updates:*
+считается, сколько раз сменился токен каждой сессии: за --ticks интервалов должно быть ровно
+по одной ротации на сессию за интервал, а не по одной от каждого воркера. Затем ротатор-держатель
+аренды останавливается без освобождения аренды (как упавший процесс), и проверяется, что ротацию
+перенимает другой воркер без пропуска интервала.
+
+По умолчанию используется Redis из настроек (отдельная БД не выделяется: создаются и удаляются
+только тестовые сессии, ключи qr:* общие с приложением — не запускать на рабочем Redis).
+С --fake — fakeredis в памяти (нужны пакеты fakeredis и lupa).
+
+Запуск из каталога fastapi:
+    python scripts/check_qr_rotation_leader.py [--workers 4] [--sessions 20] [--interval 1] [--ticks 5] [--fake]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import redis.asyncio as aioredis
+
+from app.config.settings import settings
+from app.services.qr_service import ACTIVE_SESSIONS_KEY, ROTATOR_LEASE_KEY, QRService
+
+
+def upcoming_lesson(minutes_ahead: int = 5) -> tuple:
+    """
+    (date, lesson_start_time) пары, начинающейся через несколько минут в часовом поясе расписания:
+    сессия закрывается по окончании пары, и сессии проверки не должны закрыться во время прогона.
+    """
+    start = datetime.now(timezone(timedelta(hours=settings.lesson_utc_offset))) + timedelta(minutes=minutes_ahead)
+    return start.strftime("%Y-%m-%d"), start.strftime("%H:%M")
+
+
+def connect(fake: bool) -> aioredis.Redis:
+    if fake:
+        import fakeredis
+        return fakeredis.FakeAsyncRedis(decode_responses=True)
+    return aioredis.from_url(
+        f"redis://{settings.redis_host}:{settings.redis_port}/{settings.redis_db}",
+        password=settings.redis_password,
+        decode_responses=True,
+    )
+
+
+async def count_rotations(redis: aioredis.Redis, seconds: float) -> Counter:
+    """Число опубликованных токенов по сессиям за seconds секунд."""
+    counts = Counter()
+    pubsub = redis.pubsub()
+    await pubsub.psubscribe("token_updates:session:*")
+    deadline = time.monotonic() + seconds
+    while (left := deadline - time.monotonic()) > 0:
+        message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=min(left, 0.5))
+        if message:
+            counts[message["channel"].split(":", 2)[2]] += 1
+    await pubsub.punsubscribe()
+    await pubsub.aclose()
+    return counts
+
+
+def check(title: str, counts: Counter, session_ids: list, ticks: int) -> bool:
+    per_session = [counts.get(session_id, 0) for session_id in session_ids]
+    # на границах окна наблюдения допускается ±1 ротация
+    ok = all(abs(n - ticks) <= 1 for n in per_session)
+    print(f"{title}: ротаций на сессию min {min(per_session)}, max {max(per_session)}, "
+          f"ожидалось {ticks} ± 1 — {'OK' if ok else 'ОШИБКА'}")
+    return ok
+
+
+async def main(workers: int, sessions: int, interval: int, ticks: int, fake: bool) -> int:
+    # первый срок ротации новой сессии generate_qr_session берёт из настроек
+    settings.qr_token_interval = interval
+    redis = connect(fake)
+    services = [QRService(redis, None) for _ in range(workers)]
+    tasks = {service.worker_id: asyncio.create_task(service.update_tokens_loop(interval)) for service in services}
+
+    session_ids = []
+    lesson_date, lesson_start = upcoming_lesson()
+    try:
+        for i in range(sessions):
+            info = await services[i % workers].generate_qr_session(
+                "CHECK-QR", "Предмет", "лекция", lesson_date, lesson_start
+            )
+            session_ids.append(info["session_id"])
+
+        # первый срок ротации — через interval после создания
+        await asyncio.sleep(interval / 2)
+        ok = check(f"{workers} воркеров", await count_rotations(redis, ticks * interval), session_ids, ticks)
+
+        leader = await redis.get(ROTATOR_LEASE_KEY)
+        print(f"Ротатор: {leader}, останавливается без освобождения аренды")
+        # подмена release — аренда остаётся висеть до истечения срока, как после падения процесса
+        next(s for s in services if s.worker_id == leader).release_rotator_lease = lambda: asyncio.sleep(0)
+        tasks[leader].cancel()
+        ok &= check("после отказа ротатора", await count_rotations(redis, ticks * interval), session_ids, ticks)
+        print(f"Новый ротатор: {await redis.get(ROTATOR_LEASE_KEY)}")
+    finally:
+        for task in tasks.values():
+            task.cancel()
+        await asyncio.gather(*tasks.values(), return_exceptions=True)
+        if session_ids:
+            await redis.delete(*(f"session:{session_id}" for session_id in session_ids))
+            await redis.zrem(ACTIVE_SESSIONS_KEY, *session_ids)
+        await redis.aclose()
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--interval", type=int, default=1)
+    parser.add_argument("--ticks", type=int, default=5)
+    parser.add_argument("--fake", action="store_true")
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.workers, args.sessions, args.interval, args.ticks, args.fake)))
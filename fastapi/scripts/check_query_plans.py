@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Проверка планов запросов репозиториев (app/repositories).
+
+В транзакции создаётся синтетический объём данных (по умолчанию 200 групп × 25 студентов,
+по 8 предметов с ведомостями посещаемости на 10 дат и рейтинга — ~400 тыс. строк attendance_mark),
+таблицы анализируются (ANALYZE), после чего каждый метод чтения репозиториев вызывается на этих
+данных, его SQL перехватывается и прогоняется через EXPLAIN с настройками планировщика по умолчанию.
+Без подходящего индекса планировщик выбирает на таком объёме Seq Scan — это ошибка для таблиц
+от --min-rows строк. Для малых таблиц (группы, преподаватели — сотни строк) последовательное
+чтение дешевле индекса и только выводится. В конце транзакция откатывается (вместе со
+статистикой ANALYZE) — БД не меняется.
+
+Запуск из каталога fastapi (после alembic upgrade head):
+    python scripts/check_query_plans.py [--groups 200] [--students 25] [--subjects 8] [--dates 10] [--min-rows 1000]
+
+Код выхода 1, если хотя бы один запрос читает большую таблицу последовательным сканированием.
+"""
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.dialects import postgresql
+
+from app.config.database import AsyncSessionLocal
+from app.models.tables import (
+    Attendance, Groups, GroupTimetable, Rating, StudentInfo, TeacherInfo, TeacherTimetable, User
+)
+from app.repositories.attendance_repository import AttendanceRepository
+from app.repositories.group_timetable_repository import GroupTimetableRepository
+from app.repositories.groups_repository import GroupsRepository
+from app.repositories.rating_repository import RatingRepository
+from app.repositories.student_info_repository import StudentInfoRepository
+from app.repositories.teacher_info_repository import TeacherInfoRepository
+from app.repositories.teacher_timetable_repository import TeacherTimetableRepository
+from app.repositories.user_repository import UserRepository
+
+
+GROUP_PREFIX = "PLAN-"
+SEEDED_TABLES = [
+    "groups", "group_timetable", "student_info", "teacher_info", "users",
+    "attendance", "attendance_mark", "rating", "rating_mark", "rating_grade",
+]
+
+
+async def next_id(db, model) -> int:
+    # сид-данные вставляются с явными id, поэтому последовательности могут отставать — берём max(id) + 1
+    return (await db.scalar(select(func.coalesce(func.max(model.id), 0)))) + 1
+
+
+async def seed(db, groups: int, students: int, subjects: int, dates: int) -> None:
+    """Синтетический объём данных одной транзакцией (generate_series), затем ANALYZE."""
+    n = groups * students
+    g0 = await next_id(db, Groups) - 1
+    gt0 = await next_id(db, GroupTimetable) - 1
+    s0 = await next_id(db, StudentInfo) - 1
+    t0 = await next_id(db, TeacherInfo) - 1
+    u0 = await next_id(db, User) - 1
+    a0 = await next_id(db, Attendance) - 1
+    r0 = await next_id(db, Rating) - 1
+    # номер группы студента i (1..n); ведомость предмета k группы g — (g - 1) * subjects + k
+    group_of = f"{g0} + 1 + (i - 1) / {students}"
+    ved_of = f"(i - 1) / {students} * {subjects} + k"
+
+    statements = [
+        f"INSERT INTO teacher_info (id) SELECT {t0} + i FROM generate_series(1, {groups}) i",
+        f"INSERT INTO groups (id, group_name) SELECT {g0} + i, '{GROUP_PREFIX}' || i FROM generate_series(1, {groups}) i",
+        f"""INSERT INTO group_timetable (id, group_id, timetable)
+            SELECT {gt0} + i, {g0} + i, '{{}}'::jsonb FROM generate_series(1, {groups}) i""",
+        f"""INSERT INTO student_info (id, zach_number, group_id)
+            SELECT {s0} + i, 'plan' || i, {group_of} FROM generate_series(1, {n}) i""",
+        f"""INSERT INTO users (id, first_name, last_name, max_id, role, student_info_id, created_at)
+            SELECT {u0} + i, 'Имя' || i, 'Фамилия' || i, 'plan-s' || i, 'student', {s0} + i, now()
+            FROM generate_series(1, {n}) i""",
+        f"""INSERT INTO users (id, first_name, last_name, max_id, role, teacher_info_id, created_at)
+            SELECT {u0 + n} + i, 'Имя' || i, 'Преподаватель' || i, 'plan-t' || i, 'teacher', {t0} + i, now()
+            FROM generate_series(1, {groups}) i""",
+        f"""INSERT INTO attendance (id, subject_name, subject_type, teacher_id, group_id, created_at)
+            SELECT {a0} + (g - 1) * {subjects} + k, 'Предмет ' || k, 'лекция', {t0} + g, {g0} + g, now()
+            FROM generate_series(1, {groups}) g, generate_series(1, {subjects}) k""",
+        f"""INSERT INTO attendance_mark (attendance_id, student_id, lesson_date, present)
+            SELECT {a0} + {ved_of}, 'plan' || i, date '2025-09-01' + d, random() < 0.8
+            FROM generate_series(1, {n}) i, generate_series(1, {subjects}) k, generate_series(0, {dates - 1}) d""",
+        f"""INSERT INTO rating (id, subject_name, subject_type, teacher_id, group_id, created_at)
+            SELECT {r0} + (g - 1) * {subjects} + k, 'Предмет ' || k, 'экзамен', {t0} + g, {g0} + g, now()
+            FROM generate_series(1, {groups}) g, generate_series(1, {subjects}) k""",
+        f"""INSERT INTO rating_mark (rating_id, student_id, control_point, value)
+            SELECT {r0} + {ved_of}, 'plan' || i, 'kt' || kt, (random() * 100)::int
+            FROM generate_series(1, {n}) i, generate_series(1, {subjects}) k, generate_series(1, 5) kt""",
+        f"""INSERT INTO rating_grade (rating_id, student_id, grade)
+            SELECT {r0} + {ved_of}, 'plan' || i, 'Отлично'
+            FROM generate_series(1, {n}) i, generate_series(1, {subjects}) k""",
+    ]
+    connection = await db.connection()
+    for sql in statements:
+        await connection.exec_driver_sql(sql)
+    # ANALYZE в транзакции: статистика видна планировщику здесь и откатывается вместе с данными
+    await connection.exec_driver_sql(f"ANALYZE {', '.join(SEEDED_TABLES)}")
+
+
+async def large_tables(db, min_rows: int) -> set:
+    """Таблицы, в которых по статистике не меньше min_rows строк."""
+    result = await db.execute(
+        text(
+            "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE n.nspname = 'public' AND c.relkind = 'r' AND c.reltuples >= :min_rows"
+        ),
+        {"min_rows": min_rows},
+    )
+    return set(result.scalars().all())
+
+
+async def load_samples(db):
+    """Значения параметров для запросов — из синтетических данных seed (группа в середине диапазона)."""
+    group_name = f"{GROUP_PREFIX}{await db.scalar(select(func.count()).where(Groups.group_name.like(f'{GROUP_PREFIX}%'))) // 2}"
+    student = (await db.execute(
+        select(User.max_id, StudentInfo.id, StudentInfo.zach_number, StudentInfo.group_id)
+        .join(StudentInfo, User.student_info_id == StudentInfo.id)
+        .join(Groups, Groups.id == StudentInfo.group_id)
+        .where(Groups.group_name == group_name)
+        .limit(1)
+    )).first()
+    attendance = (await db.execute(
+        select(Attendance.id, Attendance.teacher_id, Attendance.group_id, Attendance.subject_name, Attendance.subject_type)
+        .where(Attendance.group_id == student.group_id)
+        .limit(1)
+    )).first()
+    teacher = (await db.execute(
+        select(User.max_id, User.teacher_info_id)
+        .where(User.teacher_info_id == attendance.teacher_id)
+        .limit(1)
+    )).first()
+    rating = (await db.execute(
+        select(Rating.id, Rating.subject_name)
+        .where(Rating.group_id == student.group_id)
+        .limit(1)
+    )).first()
+
+    return student, teacher, attendance, rating, group_name
+
+
+def repository_calls(db, student, teacher, attendance, rating, group_name):
+    """(название, корутина) для каждого метода чтения репозиториев, используемого сервисами."""
+    users = UserRepository(db)
+    students = StudentInfoRepository(db)
+    groups = GroupsRepository(db)
+    teachers = TeacherInfoRepository(db)
+    attendances = AttendanceRepository(db)
+    ratings = RatingRepository(db)
+
+    return [
+        ("UserRepository.get_by_max_id", lambda: users.get_by_max_id(student.max_id)),
+        ("UserRepository.get_by_max_id_with_relations", lambda: users.get_by_max_id_with_relations(student.max_id)),
+        ("UserRepository.get_by_max_id_teacher_info_id", lambda: users.get_by_max_id_teacher_info_id(teacher.max_id)),
+        ("UserRepository.get_by_max_id_student_info_id", lambda: users.get_by_max_id_student_info_id(student.max_id)),
+        ("UserRepository.get_student_zach_number_by_max_id", lambda: users.get_student_zach_number_by_max_id(student.max_id)),
+        ("UserRepository.get_student_zach_group_by_max_id", lambda: users.get_student_zach_group_by_max_id(student.max_id)),
+        ("UserRepository.get_by_name_password", lambda: users.get_by_name_password("Иван", "Петров", "x")),
+        ("StudentInfoRepository.get_by_id", lambda: students.get_by_id(student.id)),
+        ("StudentInfoRepository.get_by_zach_number", lambda: students.get_by_zach_number(student.zach_number)),
+        ("StudentInfoRepository.get_by_group_id", lambda: students.get_by_group_id(student.group_id)),
+        ("StudentInfoRepository.get_student_name_by_zach_number", lambda: students.get_student_name_by_zach_number(student.zach_number)),
+        ("GroupsRepository.get_by_group_name", lambda: groups.get_by_group_name(group_name)),
+        ("GroupsRepository.get_students_by_group_name", lambda: groups.get_students_by_group_name(group_name)),
+        ("GroupTimetableRepository.get_by_group_id", lambda: GroupTimetableRepository(db).get_by_group_id(student.group_id)),
+        ("TeacherTimetableRepository.get_by_teacher_info_id", lambda: TeacherTimetableRepository(db).get_by_teacher_info_id(teacher.teacher_info_id)),
+        ("TeacherInfoRepository.get_by_id", lambda: teachers.get_by_id(teacher.teacher_info_id)),
+        ("AttendanceRepository.get_student_attendance", lambda: attendances.get_student_attendance(
+            student.group_id, student.zach_number, attendance.subject_type, attendance.subject_name)),
+        ("AttendanceRepository.get_student_subjects", lambda: attendances.get_student_subjects(student.zach_number)),
+        ("AttendanceRepository.get_ved_for_teacher", lambda: attendances.get_ved_for_teacher(
+            attendance.group_id, attendance.teacher_id, attendance.subject_name, attendance.subject_type)),
+        ("AttendanceRepository.get_ved_marks", lambda: attendances.get_ved_marks(attendance.id)),
+        ("AttendanceRepository.get_ved_id", lambda: attendances.get_ved_id(
+            attendance.teacher_id, attendance.group_id, attendance.subject_name, attendance.subject_type)),
+        ("RatingRepository.get_student_marks", lambda: ratings.get_student_marks(student.zach_number)),
+        ("RatingRepository.get_student_grades", lambda: ratings.get_student_grades(student.zach_number)),
+        ("RatingRepository.get_group_rating", lambda: ratings.get_group_rating(group_name, rating.subject_name)),
+        ("RatingRepository.get_rating_marks", lambda: ratings.get_rating_marks(rating.id)),
+        ("RatingRepository.get_rating_grades", lambda: ratings.get_rating_grades(rating.id)),
+        ("RatingRepository.get_student_rating_by_subject", lambda: ratings.get_student_rating_by_subject(
+            student.zach_number, rating.subject_name)),
+    ]
+
+
+def seq_scans(plan: dict) -> list:
+    """Таблицы, которые план читает через Seq Scan."""
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name"))
+    for child in plan.get("Plans", []):
+        found.extend(seq_scans(child))
+    return found
+
+
+async def main(groups: int, students: int, subjects: int, dates: int, min_rows: int) -> int:
+    async with AsyncSessionLocal() as db:
+        try:
+            await seed(db, groups, students, subjects, dates)
+            large = await large_tables(db, min_rows)
+            samples = await load_samples(db)
+
+            captured = []
+
+            @event.listens_for(db.sync_session, "do_orm_execute")
+            def capture(orm_execute_state):
+                captured.append(orm_execute_state.statement)
+
+            statements = []
+            for name, call in repository_calls(db, *samples):
+                captured.clear()
+                await call()
+                statements.extend((name, stmt) for stmt in captured)
+
+            event.remove(db.sync_session, "do_orm_execute", capture)
+
+            # настройки планировщика по умолчанию: Seq Scan в плане — значит, индекс не подходит
+            failed = 0
+            connection = await db.connection()
+            for name, stmt in statements:
+                sql = str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+                result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")
+                plan = result.scalar()
+                plan = json.loads(plan) if isinstance(plan, str) else plan
+                tables = set(seq_scans(plan[0]["Plan"]))
+                if tables & large:
+                    failed += 1
+                    print(f"❌ {name}: Seq Scan по {', '.join(sorted(tables & large))}")
+                elif tables:
+                    print(f"✅ {name} (Seq Scan по малой таблице: {', '.join(sorted(tables))})")
+                else:
+                    print(f"✅ {name}")
+        finally:
+            await db.rollback()
+
+    print(f"\nДанные: {groups} групп × {students} студентов × {subjects} предметов, {dates} дат; "
+          f"большие таблицы (от {min_rows} строк): {', '.join(sorted(large))}")
+    print(f"Запросов: {len(statements)}, без индекса: {failed}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, default=200)
+    parser.add_argument("--students", type=int, default=25)
+    parser.add_argument("--subjects", type=int, default=8)
+    parser.add_argument("--dates", type=int, default=10)
+    parser.add_argument("--min-rows", type=int, default=1000)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.groups, args.students, args.subjects, args.dates, args.min_rows)))
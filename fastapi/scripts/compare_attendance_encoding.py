@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Размер ведомостей посещаемости в прежнем формате attendance_json и в компактной форме bitset-v1
+(AttendanceMatrix.to_compact, GET /api/attendance/teacher/...?encoding=bitset) на данных БД.
+
+Для каждой ведомости проверяется, что компактная форма без потерь раскодируется
+обратно в тот же attendance_json.
+
+Запуск из каталога fastapi (на БД, заполненной db/fill_db/init_db.py):
+    python scripts/compare_attendance_encoding.py
+"""
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import select
+
+from app.config.database import AsyncSessionLocal
+from app.models.tables import Attendance
+from app.repositories.attendance_repository import AttendanceRepository
+from app.services.attendance_service import AttendanceService
+from app.utils.attendance_matrix import AttendanceMatrix
+
+
+def json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+async def main() -> None:
+    async with AsyncSessionLocal() as db:
+        repository = AttendanceRepository(db)
+        ids = (await db.execute(select(Attendance.id).order_by(Attendance.id))).scalars().all()
+
+        json_total = compact_total = 0
+        for attendance_id in ids:
+            marks = await repository.get_ved_marks(attendance_id)
+            attendance_json = AttendanceService._build_attendance_json(marks)
+            compact = AttendanceMatrix.from_marks(marks).to_compact()
+
+            decoded = AttendanceMatrix.from_compact(json.loads(json.dumps(compact)))
+            assert decoded.to_attendance_json() == attendance_json, f"ведомость {attendance_id}: расхождение"
+
+            json_total += json_size(attendance_json)
+            compact_total += json_size(compact)
+
+    print(f"Ведомостей: {len(ids)}")
+    print(f"attendance_json: {json_total:>12,} байт")
+    print(f"bitset-v1:       {compact_total:>12,} байт")
+    if compact_total:
+        print(f"Сжатие:          {json_total / compact_total:>12.1f}×")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
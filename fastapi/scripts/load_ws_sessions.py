@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Нагрузочная проверка WebSocket сессии QR (/ws/api/session/{session_id}): сколько команд в секунду
+получает Redis при разном числе открытых сокетов одной сессии.
+
+Скрипт создаёт сессию прямо в Redis (QRService.generate_qr_session), открывает к запущенному
+приложению по очереди --connections сокетов и за --seconds секунд удержания считает прирост
+total_commands_processed из INFO stats и число подписок (PUBSUB NUMPAT / NUMSUB).
+С общей подпиской процесса (app/services/session_hub.py) команд в секунду не прибавляется
+с ростом числа сокетов — остаются только ротация токенов и аренда ротатора.
+
+Нужен настоящий Redis (INFO), тот же, что у приложения. Запуск из каталога fastapi:
+    python scripts/load_ws_sessions.py --url ws://localhost:8080 [--connections 10,100,300] [--seconds 10]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import redis.asyncio as aioredis
+import websockets
+
+from app.config.settings import settings
+from app.services.qr_service import ACTIVE_SESSIONS_KEY, QRService
+
+
+async def total_commands(redis: aioredis.Redis) -> int:
+    return (await redis.info("stats"))["total_commands_processed"]
+
+
+async def hold(url: str, count: int, seconds: float) -> tuple:
+    """Открывает count сокетов, держит их seconds секунд; (получено сообщений, сокетов закрыто сервером)."""
+    sockets = []
+    for _ in range(count):
+        ws = await websockets.connect(url, open_timeout=30)
+        await ws.recv()  # текущий токен при подключении
+        sockets.append(ws)
+
+    received = 0
+    closed = 0
+
+    async def drain(ws):
+        nonlocal received, closed
+        try:
+            async for _ in ws:
+                received += 1
+        except websockets.ConnectionClosed:
+            pass
+        closed += 1  # цикл заканчивается сам, только если сервер закрыл сокет
+
+    readers = [asyncio.create_task(drain(ws)) for ws in sockets]
+    await asyncio.sleep(seconds)
+    for reader in readers:
+        reader.cancel()
+    await asyncio.gather(*(ws.close() for ws in sockets), return_exceptions=True)
+    return received, closed
+
+
+async def main(url: str, connections: list, seconds: float) -> None:
+    redis = aioredis.from_url(
+        f"redis://{settings.redis_host}:{settings.redis_port}/{settings.redis_db}",
+        password=settings.redis_password,
+        decode_responses=True,
+    )
+    # пара начинается через несколько минут: ротатор приложения не закроет сессию во время замера
+    start = datetime.now(timezone(timedelta(hours=settings.lesson_utc_offset))) + timedelta(minutes=5)
+    session = await QRService(redis, None).generate_qr_session(
+        "LOAD-WS", "Предмет", "лекция", start.strftime("%Y-%m-%d"), start.strftime("%H:%M")
+    )
+    session_id = session["session_id"]
+    ws_url = f"{url.rstrip('/')}/ws/api/session/{session_id}"
+    print(f"Сессия {session_id}, удержание {seconds} с на замер")
+
+    try:
+        for count in connections:
+            # замер идёт, пока сокеты открыты: подключение в интервал не попадает
+            sockets_task = asyncio.create_task(hold(ws_url, count, seconds + 2))
+            await asyncio.sleep(1 + count / 200)
+            before, started = await total_commands(redis), time.monotonic()
+            await asyncio.sleep(seconds)
+            after, elapsed = await total_commands(redis), time.monotonic() - started
+            numpat = await redis.pubsub_numpat()
+            numsub = (await redis.pubsub_numsub(f"token_updates:session:{session_id}"))[0][1]
+            received, closed = await sockets_task
+
+            ops = (after - before - 1) / elapsed  # без самого INFO
+            print(f"сокетов {count:>5}: Redis {ops:8.1f} команд/с, подписок по шаблону {numpat}, "
+                  f"на канал сессии {numsub}, сообщений получено {received}, закрыто сервером {closed}")
+    finally:
+        await redis.delete(f"session:{session_id}")
+        await redis.zrem(ACTIVE_SESSIONS_KEY, session_id)
+        await redis.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="ws://localhost:8080")
+    parser.add_argument("--connections", default="10,100,300")
+    parser.add_argument("--seconds", type=float, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.url, [int(n) for n in args.connections.split(",")], args.seconds))
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.config.settings import settings
+from app.services.qr_service import session_deadline
+
+DURATION = 95 * 60
+MSK = timezone(timedelta(hours=3))
+
+
+@pytest.fixture(autouse=True)
+def lesson_settings(monkeypatch):
+    monkeypatch.setattr(settings, "qr_session_duration", DURATION)
+    monkeypatch.setattr(settings, "lesson_utc_offset", 3)
+
+
+def lesson_start(hour: int, minute: int) -> float:
+    return datetime(2025, 9, 5, hour, minute, tzinfo=MSK).timestamp()
+
+
+def test_lesson_already_ended():
+    # сессия по прошедшей паре закрывается ближайшим проходом ротатора
+    now = lesson_start(12, 0)
+    assert session_deadline("2025-09-05", "08:00", now) == lesson_start(8, 0) + DURATION
+
+
+def test_session_opened_early():
+    # открыта за полчаса до пары — закрывается по окончании пары, а не через duration от создания
+    now = lesson_start(7, 30)
+    assert session_deadline("2025-09-05", "08.00", now) == lesson_start(8, 0) + DURATION
+
+
+@pytest.mark.parametrize("date, start", [("2025-09-05", None), ("2025-09-05", "8 утра"), ("завтра", "08:00")])
+def test_unparsable_time_falls_back_to_now(date, start):
+    now = lesson_start(10, 0)
+    assert session_deadline(date, start, now) == now + DURATION